@@ -0,0 +1,359 @@
+"""
+Print accounting database
+Records every batch and file (printer, pages, timing, outcome) in an
+embedded SQLite store for monthly reports and throughput analysis
+"""
+
+import csv
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from core.pdfinfo import count_pages
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    printer TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    total INTEGER NOT NULL,
+    success INTEGER,
+    errors INTEGER
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    printer TEXT NOT NULL,
+    pages INTEGER,
+    bytes INTEGER,
+    submitted REAL NOT NULL,
+    submit_ms REAL,
+    attempts INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    error TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS jobs_submitted ON jobs(submitted);
+CREATE INDEX IF NOT EXISTS jobs_printer ON jobs(printer, submitted);
+CREATE INDEX IF NOT EXISTS jobs_batch ON jobs(batch_id, seq);
+
+-- Files and pages per printer and day
+CREATE VIEW IF NOT EXISTS printer_daily AS
+SELECT date(submitted, 'unixepoch', 'localtime') AS day,
+       printer,
+       COUNT(*) AS files,
+       SUM(CASE WHEN outcome = 'done' THEN pages ELSE 0 END) AS pages,
+       SUM(CASE WHEN outcome = 'done' THEN bytes ELSE 0 END) AS bytes,
+       SUM(outcome = 'error') AS failures,
+       AVG(submit_ms) AS avg_submit_ms
+FROM jobs
+GROUP BY day, printer;
+
+-- Most frequent errors per printer
+CREATE VIEW IF NOT EXISTS failure_hotspots AS
+SELECT printer,
+       error,
+       COUNT(*) AS occurrences,
+       datetime(MAX(submitted), 'unixepoch', 'localtime') AS last_seen
+FROM jobs
+WHERE outcome = 'error'
+GROUP BY printer, error
+ORDER BY occurrences DESC;
+
+-- Duration and rate of each finished batch
+CREATE VIEW IF NOT EXISTS batch_summary AS
+SELECT b.batch_id,
+       datetime(b.started, 'unixepoch', 'localtime') AS started,
+       b.printer,
+       b.total,
+       b.success,
+       b.errors,
+       b.finished - b.started AS duration_s,
+       (SELECT SUM(pages) FROM jobs j WHERE j.batch_id = b.batch_id AND j.outcome = 'done') AS pages
+FROM batches b
+WHERE b.finished IS NOT NULL;
+"""
+
+# Tables and views that may be exported
+EXPORTABLE = ("jobs", "batches", "printer_daily", "failure_hotspots", "batch_summary")
+
+_CLOSE = object()
+
+_INSERT_JOB = (
+    "INSERT INTO jobs (batch_id, seq, path, printer, pages, bytes, submitted, "
+    "submit_ms, attempts, outcome, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+@dataclass
+class JobRecord:
+    """Outcome of one file in a batch"""
+    batch_id: str
+    seq: int
+    path: str
+    printer: str
+    pages: int | None     # None: counted by the writer thread for printed files
+    bytes: int | None
+    submitted: float      # Unix time of the final attempt
+    submit_ms: float | None  # Time spent in the print command (None: never submitted)
+    attempts: int
+    outcome: str          # "done" or "error"
+    error: str = ""
+
+
+def _job_params(record: JobRecord) -> tuple:
+    """Row values of a job; the page count of a printed file is read here"""
+    pages = record.pages
+    if pages is None and record.outcome == "done":
+        pages = count_pages(record.path)
+    return (record.batch_id, record.seq, record.path, record.printer, pages,
+            record.bytes, record.submitted, record.submit_ms, record.attempts,
+            record.outcome, record.error)
+
+
+def _migrate(db: sqlite3.Connection):
+    """
+    Bring a database created by an older version up to date.
+
+    submit_ms used to be NOT NULL, with 0 stored for files that failed
+    before reaching the print command; those become NULL.
+    """
+    columns = {row[1]: row for row in db.execute("PRAGMA table_info(jobs)")}
+    if "submit_ms" not in columns or not columns["submit_ms"][3]:
+        return
+    with db:
+        for (name,) in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'view'").fetchall():
+            db.execute(f"DROP VIEW {name}")
+        for name in ("jobs_submitted", "jobs_printer", "jobs_batch"):
+            db.execute(f"DROP INDEX IF EXISTS {name}")
+        db.execute("ALTER TABLE jobs RENAME TO jobs_old")
+    db.executescript(_SCHEMA)
+    with db:
+        db.execute("INSERT INTO jobs SELECT * FROM jobs_old")
+        db.execute("DROP TABLE jobs_old")
+        db.execute("UPDATE jobs SET submit_ms = NULL WHERE outcome = 'error' AND submit_ms = 0")
+
+
+class AccountingStore:
+    """
+    Embedded analytics store for print runs.
+
+    Writes are queued and committed by a background thread in batches,
+    so recording a file never blocks the print worker on disk I/O. Page
+    counts of printed files are filled in by that thread as well.
+
+    Args:
+        db_path: SQLite database file
+        flush_interval: Maximum seconds a record waits before commit
+        batch_size: Commit as soon as this many records are queued
+    """
+
+    def __init__(self, db_path: str, flush_interval: float = 1.0, batch_size: int = 500):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+
+        db = self._connect()
+        _migrate(db)
+        db.executescript(_SCHEMA)
+        db.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="accounting-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=10)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # Recording (any thread)
+
+    def begin_batch(self, printer: str, total: int, source: str = "") -> str:
+        """Register a new batch and return its id"""
+        batch_id = uuid.uuid4().hex
+        self._queue.put((
+            "INSERT INTO batches (batch_id, started, printer, source, total) VALUES (?, ?, ?, ?, ?)",
+            (batch_id, time.time(), printer, source, total)
+        ))
+        return batch_id
+
+    def record_job(self, record: JobRecord):
+        """Queue the outcome of one file"""
+        self._queue.put(record)
+
+    def end_batch(self, batch_id: str, success: int, errors: int):
+        """Mark a batch as finished"""
+        self._queue.put((
+            "UPDATE batches SET finished = ?, success = ?, errors = ? WHERE batch_id = ?",
+            (time.time(), success, errors, batch_id)
+        ))
+
+    def flush(self):
+        """Block until every queued record is committed"""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        """Commit pending records and stop the writer thread"""
+        self._queue.put(_CLOSE)
+        self._writer.join()
+
+    def _write_loop(self):
+        db = self._connect()
+        pending = []
+        waiters = []
+        closing = False
+
+        while not closing:
+            # Wait for the first record, then collect more until the
+            # batch is full or the flush interval has passed
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _CLOSE:
+                    closing = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                pending.append(item)
+                if len(pending) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if pending:
+                try:
+                    with db:
+                        for item in pending:
+                            if isinstance(item, JobRecord):
+                                db.execute(_INSERT_JOB, _job_params(item))
+                            else:
+                                db.execute(*item)
+                except sqlite3.Error:
+                    pass  # Accounting must never break printing
+                pending = []
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+        db.close()
+
+    # Queries (caller's thread)
+
+    def query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Run a read-only query on a separate connection"""
+        db = self._connect()
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def throughput(self, since: float | None = None, printer: str | None = None) -> list[tuple]:
+        """Rows of (day, printer, files, pages, bytes, failures, avg_submit_ms)"""
+        sql = "SELECT * FROM printer_daily WHERE 1 = 1"
+        params = []
+        if since is not None:
+            sql += " AND day >= date(?, 'unixepoch', 'localtime')"
+            params.append(since)
+        if printer:
+            sql += " AND printer = ?"
+            params.append(printer)
+        return self.query(sql + " ORDER BY day, printer", tuple(params))
+
+    def failure_hotspots(self, limit: int = 20) -> list[tuple]:
+        """Rows of (printer, error, occurrences, last_seen)"""
+        return self.query("SELECT * FROM failure_hotspots LIMIT ?", (limit,))
+
+    def submit_latency_percentile(self, percentile: float = 95.0, printer: str | None = None,
+                                  since: float | None = None) -> float | None:
+        """
+        Percentile of the time spent submitting a file, in milliseconds.
+
+        Uses the nearest-rank method directly in SQL, so only one row is
+        read regardless of history size. Files that never reached the
+        print command (submit_ms NULL) are left out.
+        """
+        where = "WHERE submit_ms IS NOT NULL"
+        params = []
+        if printer:
+            where += " AND printer = ?"
+            params.append(printer)
+        if since is not None:
+            where += " AND submitted >= ?"
+            params.append(since)
+
+        count = self.query(f"SELECT COUNT(*) FROM jobs {where}", tuple(params))[0][0]
+        if count == 0:
+            return None
+        rank = max(1, -(-int(percentile * count) // 100))  # ceil(p/100 * n)
+        rows = self.query(
+            f"SELECT submit_ms FROM jobs {where} ORDER BY submit_ms LIMIT 1 OFFSET ?",
+            tuple(params) + (rank - 1,)
+        )
+        return rows[0][0] if rows else None
+
+    def export_csv(self, path: str, table: str = "jobs"):
+        """Write a table or view to a CSV file (streamed, not loaded in memory)"""
+        if table not in EXPORTABLE:
+            raise ValueError(f"Bilinmeyen tablo: {table}")
+        db = self._connect()
+        try:
+            cursor = db.execute(f"SELECT * FROM {table}")
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow([c[0] for c in cursor.description])
+                while True:
+                    rows = cursor.fetchmany(5000)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+        finally:
+            db.close()
+
+    def export_parquet(self, path: str, table: str = "jobs"):
+        """
+        Write a table or view to a Parquet file.
+
+        Raises:
+            RuntimeError: If pyarrow is not installed
+        """
+        if table not in EXPORTABLE:
+            raise ValueError(f"Bilinmeyen tablo: {table}")
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet dışa aktarımı için pyarrow kurulu olmalı (pip install pyarrow)")
+
+        db = self._connect()
+        try:
+            cursor = db.execute(f"SELECT * FROM {table}")
+            columns = [c[0] for c in cursor.description]
+            # Build column-wise chunks; types are unified at the end because
+            # an early chunk may contain only NULLs for a column
+            chunks = []
+            while True:
+                rows = cursor.fetchmany(50000)
+                if not rows:
+                    break
+                chunks.append(pa.table({c: list(v) for c, v in zip(columns, zip(*rows))}))
+            if chunks:
+                result = pa.concat_tables(chunks, promote_options="default")
+            else:
+                result = pa.table({c: [] for c in columns})
+            pq.write_table(result, path)
+        finally:
+            db.close()
@@ -0,0 +1,622 @@
+"""
+Remote print agent and controller for distributed printing
+
+An agent runs next to the printers of a site. It accepts batches over
+HTTP, stores the documents and a job queue durably on disk (SQLite), prints
+them in order with core.printer and reports per-file status. A controller
+fans batches out over several agents and collects their status.
+
+Protocol (JSON over HTTP):
+    GET  /health               -> {"ok": true, "pending": n}
+    POST /batches              <- {"files": [{"name", "data" (base64), "options"}]}
+                               -> {"batch_id": "..."}
+    GET  /batches/<batch_id>   -> {"batch_id", "files": [{"seq", "name", "status", "error"}]}
+
+If the agent is started with a token, every request must carry it in the
+"X-Agent-Token" header. Requests must state their Content-Length and may
+not exceed the agent's size limit (413 otherwise). A received document is
+deleted as soon as it has been printed or has failed; its status stays
+queryable.
+"""
+
+import base64
+import hmac
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable, Iterator
+
+from core.options import JobOptions
+from core.printer import print_pdf, PrintResult
+
+
+DEFAULT_PORT = 8631
+
+# Largest accepted POST body (base64 inflates documents by a third)
+MAX_REQUEST_BYTES = 256 * 1024 * 1024
+
+# Upload size the controller aims for, well below the agents' limit
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+
+# Bytes of JSON around each document (name, options); an upper bound
+_FILE_OVERHEAD = 1024
+
+# Documents are read and encoded in slices; a multiple of 3 keeps the
+# base64 of consecutive slices concatenable
+_UPLOAD_CHUNK = 3 * 64 * 1024
+
+# Per-file status values
+STATUS_PENDING = "pending"
+STATUS_PRINTING = "printing"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL REFERENCES batches(batch_id),
+    seq INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    options TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_status ON files(status, id);
+CREATE INDEX IF NOT EXISTS files_batch ON files(batch_id, seq);
+"""
+
+
+# Wire names of JobOptions fields -> JobOptions.from_mapping keys
+_OPTION_KEYS = {
+    "printer": "printer",
+    "copies": "copies",
+    "collate": "collate",
+    "duplex": "duplex",
+    "number_up": "nup",
+    "page_ranges": "pages",
+    "media": "media",
+    "tray": "tray",
+}
+
+
+def parse_options(raw) -> JobOptions:
+    """
+    Validate the options of a received file (asdict(JobOptions) as JSON).
+
+    Raises:
+        ValueError: If the options are not an object, have unknown keys or
+            invalid values
+    """
+    if raw is None:
+        return JobOptions()
+    if not isinstance(raw, dict):
+        raise ValueError("Seçenekler bir nesne olmalı")
+    unknown = set(raw) - set(_OPTION_KEYS)
+    if unknown:
+        raise ValueError(f"Bilinmeyen seçenek: {', '.join(sorted(unknown))}")
+    return JobOptions.from_mapping({_OPTION_KEYS[key]: value for key, value in raw.items()})
+
+
+def _remove_document(path: str):
+    """Delete a printed document and its batch folder once that is empty"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass  # Other files of the batch are still queued
+
+
+class JobQueue:
+    """
+    Durable FIFO of files to print, stored in SQLite.
+
+    Files that were being printed when the agent stopped are put back to
+    pending on start-up, so a crash never loses queued work. Documents of
+    finished files are deleted (their path is cleared in the table), so
+    the spool folder only holds work that is still to be printed.
+    """
+
+    def __init__(self, spool_dir: str):
+        self.spool_dir = spool_dir
+        os.makedirs(os.path.join(spool_dir, "files"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(spool_dir, "queue.db"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        with self._db:
+            self._db.execute(
+                "UPDATE files SET status = ? WHERE status = ?",
+                (STATUS_PENDING, STATUS_PRINTING)
+            )
+        self._purge_finished()
+
+    def _purge_finished(self):
+        """Delete documents left behind by a crash between finish() and removal"""
+        rows = self._db.execute(
+            "SELECT id, path FROM files WHERE status IN (?, ?) AND path != ''",
+            (STATUS_DONE, STATUS_ERROR)
+        ).fetchall()
+        for _, path in rows:
+            _remove_document(path)
+        with self._db:
+            self._db.executemany("UPDATE files SET path = '' WHERE id = ?", [(r[0],) for r in rows])
+
+    def add_batch(self, files: list[dict]) -> str:
+        """
+        Store the documents of a batch and queue them.
+
+        Args:
+            files: Dicts with "name", "data" (bytes) and "options" (JobOptions)
+
+        Returns:
+            New batch id
+        """
+        batch_id = uuid.uuid4().hex
+        batch_dir = os.path.join(self.spool_dir, "files", batch_id)
+        os.makedirs(batch_dir)
+
+        rows = []
+        now = time.time()
+        for seq, item in enumerate(files):
+            # Keep the original name visible in the spooler, but never
+            # trust it as a path
+            name = os.path.basename(item["name"]) or f"{seq}.pdf"
+            path = os.path.join(batch_dir, f"{seq:06d}_{name}")
+            with open(path, "wb") as f:
+                f.write(item["data"])
+                f.flush()
+                os.fsync(f.fileno())
+            rows.append((batch_id, seq, name, path, json.dumps(asdict(item["options"])),
+                         STATUS_PENDING, now))
+
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO batches VALUES (?, ?)", (batch_id, now))
+            self._db.executemany(
+                "INSERT INTO files (batch_id, seq, name, path, options, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return batch_id
+
+    def next_pending(self) -> tuple[int, str, JobOptions] | None:
+        """Claim the oldest pending file, or return None if the queue is empty"""
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT id, path, options FROM files WHERE status = ? ORDER BY id LIMIT 1",
+                (STATUS_PENDING,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE files SET status = ?, updated = ? WHERE id = ?",
+                (STATUS_PRINTING, time.time(), row[0])
+            )
+        return row[0], row[1], JobOptions(**json.loads(row[2]))
+
+    def finish(self, file_id: int, result: PrintResult):
+        """Record the outcome of a claimed file and delete its document"""
+        status = STATUS_DONE if result.success else STATUS_ERROR
+        with self._lock:
+            row = self._db.execute("SELECT path FROM files WHERE id = ?", (file_id,)).fetchone()
+            with self._db:
+                self._db.execute(
+                    "UPDATE files SET status = ?, error = ?, updated = ? WHERE id = ?",
+                    (status, result.error_message, time.time(), file_id)
+                )
+            if row and row[0]:
+                _remove_document(row[0])
+                with self._db:
+                    self._db.execute("UPDATE files SET path = '' WHERE id = ?", (file_id,))
+
+    def batch_status(self, batch_id: str) -> list[dict] | None:
+        """Per-file status of a batch, or None if it is unknown"""
+        with self._lock:
+            if not self._db.execute("SELECT 1 FROM batches WHERE batch_id = ?", (batch_id,)).fetchone():
+                return None
+            rows = self._db.execute(
+                "SELECT seq, name, status, error FROM files WHERE batch_id = ? ORDER BY seq",
+                (batch_id,)
+            ).fetchall()
+        return [{"seq": r[0], "name": r[1], "status": r[2], "error": r[3]} for r in rows]
+
+    def pending_count(self) -> int:
+        """Number of files not yet printed"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM files WHERE status IN (?, ?)",
+                (STATUS_PENDING, STATUS_PRINTING)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class PrintAgent:
+    """
+    HTTP print agent serving one site.
+
+    Args:
+        spool_dir: Folder for the durable queue and received documents
+        host: Interface to bind (default: localhost only)
+        port: TCP port, 0 picks a free one
+        token: Shared secret required from controllers (optional)
+        printer: Function used to print one file; defaults to core.printer.print_pdf
+        max_request_bytes: Largest batch upload accepted
+    """
+
+    def __init__(self, spool_dir: str, host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+                 token: str | None = None,
+                 printer: Callable[[str, JobOptions], PrintResult] = print_pdf,
+                 max_request_bytes: int = MAX_REQUEST_BYTES):
+        self.queue = JobQueue(spool_dir)
+        self.token = token
+        self.printer = printer
+        self.max_request_bytes = max_request_bytes
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def url(self) -> str:
+        """Base URL the agent is reachable at"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Start serving and printing in background threads"""
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="agent-http", daemon=True),
+            threading.Thread(target=self._print_loop, name="agent-printer", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def serve_forever(self):
+        """Run until interrupted (used by the command line agent mode)"""
+        self.start()
+        try:
+            while not self._stopping.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Stop serving; the file being printed is allowed to finish"""
+        self._stopping.set()
+        self._wakeup.set()
+        self._server.shutdown()
+        self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self.queue.close()
+
+    def _print_loop(self):
+        """Print queued files one by one, in arrival order"""
+        while not self._stopping.is_set():
+            job = self.queue.next_pending()
+            if job is None:
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                continue
+
+            file_id, path, options = job
+            try:
+                result = self.printer(path, options)
+            except Exception as e:
+                result = PrintResult(False, str(e))
+            self.queue.finish(file_id, result)
+
+    def _make_handler(self):
+        agent = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass  # Keep the console quiet
+
+            def _send(self, code: int, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _authorised(self) -> bool:
+                if not agent.token:
+                    return True
+                supplied = self.headers.get("X-Agent-Token", "")
+                if hmac.compare_digest(supplied.encode(), agent.token.encode()):
+                    return True
+                self._send(401, {"error": "Yetkisiz"})
+                return False
+
+            def do_GET(self):
+                if not self._authorised():
+                    return
+                if self.path == "/health":
+                    self._send(200, {"ok": True, "pending": agent.queue.pending_count()})
+                elif self.path.startswith("/batches/"):
+                    files = agent.queue.batch_status(self.path[len("/batches/"):])
+                    if files is None:
+                        self._send(404, {"error": "Bilinmeyen toplu iş"})
+                    else:
+                        self._send(200, {"batch_id": self.path[len("/batches/"):], "files": files})
+                else:
+                    self._send(404, {"error": "Bulunamadı"})
+
+            def do_POST(self):
+                if not self._authorised():
+                    return
+                if self.path != "/batches":
+                    self._send(404, {"error": "Bulunamadı"})
+                    return
+                try:
+                    length = int(self.headers["Content-Length"])
+                except (KeyError, TypeError, ValueError):
+                    self._send(411, {"error": "Content-Length gerekli"})
+                    return
+                if length > agent.max_request_bytes:
+                    # Refuse before reading anything; the connection is dropped
+                    self.close_connection = True
+                    self._send(413, {"error": f"İstek çok büyük (en fazla {agent.max_request_bytes} bayt)"})
+                    return
+                try:
+                    payload = json.loads(self.rfile.read(length))
+                    if not isinstance(payload, dict) or not isinstance(payload.get("files"), list):
+                        raise ValueError("\"files\" listesi eksik")
+                    files = []
+                    for item in payload["files"]:
+                        if not isinstance(item, dict):
+                            raise ValueError("Dosya girdisi bir nesne olmalı")
+                        files.append({
+                            "name": str(item["name"]),
+                            "data": base64.b64decode(item["data"], validate=True),
+                            "options": parse_options(item.get("options")),
+                        })
+                        del item["data"]  # Drop the base64 copy as soon as it is decoded
+                except (ValueError, KeyError, TypeError) as e:
+                    self._send(400, {"error": f"Geçersiz istek: {e}"})
+                    return
+
+                batch_id = agent.queue.add_batch(files)
+                agent._wakeup.set()
+                self._send(201, {"batch_id": batch_id})
+
+        return Handler
+
+
+class AgentError(Exception):
+    """Raised when an agent cannot be reached or rejects a request"""
+
+
+def _encoded_size(nbytes: int) -> int:
+    """Length of the base64 encoding of `nbytes` bytes"""
+    return 4 * -(-nbytes // 3)
+
+
+def split_uploads(pdf_paths: list[str], max_bytes: int = MAX_UPLOAD_BYTES) -> list[list[str]]:
+    """
+    Split files, in order, into uploads whose request bodies stay within `max_bytes`.
+
+    A file that is larger on its own still gets an upload of its own
+    (the agent decides whether it accepts it).
+
+    Raises:
+        OSError: If a file cannot be read
+    """
+    uploads: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for path in pdf_paths:
+        nbytes = _encoded_size(os.path.getsize(path)) + _FILE_OVERHEAD
+        if current and size + nbytes > max_bytes:
+            uploads.append(current)
+            current, size = [], 0
+        current.append(path)
+        size += nbytes
+    if current:
+        uploads.append(current)
+    return uploads
+
+
+def _upload_body(pdf_paths: list[str], options: JobOptions) -> tuple[int, Iterator[bytes]]:
+    """
+    Request body of a batch upload, as its length and a generator.
+
+    Documents are read and base64-encoded slice by slice while the body
+    is sent, so a large batch is never held in memory (let alone twice).
+
+    Raises:
+        OSError: If a file cannot be read, or changes size while it is sent
+    """
+    parts = []
+    for n, path in enumerate(pdf_paths):
+        # The file's object up to the opening quote of its data
+        head = json.dumps({"name": os.path.basename(path), "options": asdict(options)})
+        head = ('{"files": [' if n == 0 else ", ") + head[:-1] + ', "data": "'
+        parts.append((head.encode("utf-8"), path, os.path.getsize(path)))
+    tail, end = b'"}', b"]}" if parts else b'{"files": []}'
+    length = sum(len(head) + _encoded_size(size) + len(tail) for head, _, size in parts) + len(end)
+
+    def generate() -> Iterator[bytes]:
+        for head, path, size in parts:
+            yield head
+            with open(path, "rb") as f:
+                remaining = size
+                while remaining:
+                    chunk = f.read(min(_UPLOAD_CHUNK, remaining))
+                    if not chunk:
+                        raise OSError(f"Dosya gönderilirken değişti: {path}")
+                    remaining -= len(chunk)
+                    yield base64.b64encode(chunk)
+            yield tail
+        yield end
+
+    return length, generate()
+
+
+class AgentClient:
+    """Minimal client for one print agent"""
+
+    def __init__(self, url: str, token: str | None = None, timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: dict | None = None,
+                 body: tuple[int, Iterable[bytes]] | None = None) -> dict:
+        """Send a request; `body` is a streamed (length, chunks) alternative to `payload`"""
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        if body is not None:
+            length, data = body
+        request = urllib.request.Request(self.url + path, data=data, method=method)
+        request.add_header("Content-Type", "application/json")
+        if body is not None:
+            request.add_header("Content-Length", str(length))
+        if self.token:
+            request.add_header("X-Agent-Token", self.token)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise AgentError(f"{self.url}: {message}") from e
+        except (urllib.error.URLError, OSError) as e:
+            raise AgentError(f"{self.url}: bağlanılamadı ({e})") from e
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def submit(self, pdf_paths: list[str], options: JobOptions | None = None) -> str:
+        """
+        Upload files as one batch (streamed, see split_uploads for its size) and return its id.
+
+        Raises:
+            AgentError: If the agent is unreachable, rejects the batch or a
+                file cannot be read
+        """
+        try:
+            body = _upload_body(pdf_paths, options or JobOptions())
+        except OSError as e:
+            raise AgentError(f"{self.url}: {e}") from e
+        return self._request("POST", "/batches", body=body)["batch_id"]
+
+    def status(self, batch_id: str) -> list[dict]:
+        return self._request("GET", f"/batches/{batch_id}")["files"]
+
+
+class Controller:
+    """
+    Distributes print work over several agents.
+
+    Each call to submit() sends a batch to a single agent so that the
+    pages of one batch come out of one site in order. Batches go to the
+    agent with the fewest pending files; unreachable agents are skipped.
+    Batches larger than `max_upload_bytes` are sent as several uploads
+    (see split_uploads), all to the same agent while it accepts them.
+    """
+
+    def __init__(self, agents: list[AgentClient], max_upload_bytes: int = MAX_UPLOAD_BYTES):
+        if not agents:
+            raise ValueError("En az bir ajan gerekli")
+        self.agents = agents
+        self.max_upload_bytes = max_upload_bytes
+
+    def uploads(self, pdf_paths: list[str]) -> list[list[str]]:
+        """Split a batch into uploads of at most max_upload_bytes"""
+        return split_uploads(pdf_paths, self.max_upload_bytes)
+
+    def submit(self, pdf_paths: list[str], options: JobOptions | None = None,
+               prefer: AgentClient | None = None) -> tuple[AgentClient, str]:
+        """
+        Send one upload to the least loaded reachable agent.
+
+        Args:
+            pdf_paths: Files of the upload (see uploads())
+            options: Options for every file
+            prefer: Agent to try first, e.g. the one that took the
+                previous upload of the same batch
+
+        Returns:
+            Tuple of (agent, batch_id)
+
+        Raises:
+            AgentError: If no agent accepts the batch
+        """
+        loads = []
+        for agent in self.agents:
+            try:
+                loads.append((agent.health()["pending"], agent))
+            except AgentError:
+                continue
+        if not loads:
+            raise AgentError("Ulaşılabilir ajan yok")
+
+        loads.sort(key=lambda item: (item[1] is not prefer, item[0]))
+        last_error = None
+        for _, agent in loads:
+            try:
+                return agent, agent.submit(pdf_paths, options)
+            except AgentError as e:
+                last_error = e
+        raise last_error
+
+    def fan_out(self, batches: list[list[str]],
+                options: JobOptions | None = None) -> list[tuple[AgentClient, str]]:
+        """
+        Submit several batches, spreading them over the agents.
+
+        Returns:
+            One (agent, batch_id) handle per upload, in order
+        """
+        handles = []
+        for paths in batches:
+            agent = None
+            for upload in self.uploads(paths):
+                agent, batch_id = self.submit(upload, options, prefer=agent)
+                handles.append((agent, batch_id))
+        return handles
+
+    def wait(self, handles: list[tuple[AgentClient, str]], poll_interval: float = 1.0,
+             timeout: float | None = None) -> list[list[dict]]:
+        """
+        Wait until every file of the given batches is done or failed.
+
+        Returns:
+            Per-batch file status lists, in the order of `handles`
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            statuses = [agent.status(batch_id) for agent, batch_id in handles]
+            finished = all(
+                f["status"] in (STATUS_DONE, STATUS_ERROR) for files in statuses for f in files
+            )
+            if finished:
+                return statuses
+            if deadline is not None and time.monotonic() >= deadline:
+                raise AgentError("Toplu işler zamanında tamamlanmadı")
+            time.sleep(poll_interval)
@@ -0,0 +1,369 @@
+"""
+Supervised backend host process
+
+Print backends (ShellExecute through ctypes, external viewers, future
+native IPP or PDF code) run in a separate process. A hang or crash there
+no longer takes down the application and the batch state it holds: the
+host is restarted and the batch continues with the next file.
+
+Messages travel over a multiprocessing pipe as a 5-byte header
+(type, sequence number) followed by an optional UTF-8 JSON body:
+
+    CALL       parent -> host   {"op": ..., ...arguments}
+    ACCEPTED   host -> parent   Call received, about to run
+    RESULT     host -> parent   {"result": ...} or {"error": "..."}
+    HEARTBEAT  host -> parent   Sent every heartbeat interval
+    SHUTDOWN   parent -> host   Exit cleanly
+
+A watchdog restarts the host when it dies, stops sending heartbeats or
+exceeds the call timeout. Between calls a watchdog thread keeps reading
+the heartbeats, so a host that hangs while idle is replaced before the
+next call is sent. Calls the host had not accepted yet are replayed on
+the new host. A print call that was accepted but never answered may
+already have reached the spooler, so it is reported as failed instead
+of being printed a second time.
+"""
+
+import json
+import multiprocessing
+import os
+import struct
+import threading
+import time
+from dataclasses import asdict
+
+from core.config import Settings, get_settings, set_settings
+from core.options import JobOptions
+from core.printer import backend_active_jobs, configure_backend, print_pdfs, PrintResult
+
+
+MSG_CALL = 1
+MSG_ACCEPTED = 2
+MSG_RESULT = 3
+MSG_HEARTBEAT = 4
+MSG_SHUTDOWN = 5
+
+_HEADER = struct.Struct("!BI")
+
+# Restarts allowed while a single call is being delivered
+MAX_RESTARTS_PER_CALL = 2
+
+BACKEND_LOST_MESSAGE = (
+    "Yazdırma arka ucu yanıt vermedi ve yeniden başlatıldı; iş yazıcıya "
+    "ulaşmış olabilir. Tekrar yazdırmadan önce yazıcı kuyruğunu kontrol edin."
+)
+
+
+class BackendHostError(Exception):
+    """The backend host could not complete a call"""
+
+
+def encode(kind: int, seq: int, body: dict | None = None) -> bytes:
+    """Encode one protocol message"""
+    payload = json.dumps(body, separators=(",", ":")).encode("utf-8") if body is not None else b""
+    return _HEADER.pack(kind, seq) + payload
+
+
+def decode(data: bytes) -> tuple[int, int, dict | None]:
+    """Decode one protocol message into (type, sequence, body)"""
+    kind, seq = _HEADER.unpack_from(data)
+    body = json.loads(data[_HEADER.size:]) if len(data) > _HEADER.size else None
+    return kind, seq, body
+
+
+# Operations the host can run, by name. Idempotent operations may be
+# replayed after a crash even if the host had already accepted them.
+def _op_print(body: dict) -> dict:
+    options = JobOptions(**body["options"]) if body.get("options") else None
+    return asdict(print_pdfs(body["paths"], options))
+
+
+def _op_active_jobs(body: dict) -> list[str] | None:
+    jobs = backend_active_jobs()
+    return None if jobs is None else sorted(jobs)
+
+
+def _op_test_crash(body: dict) -> str:
+    """Test hook: kill the host the first time it is called with `marker`"""
+    if not os.path.exists(body["marker"]):
+        open(body["marker"], "w").close()
+        os._exit(1)
+    return "ok"
+
+
+def _op_test_hang(body: dict) -> None:
+    """Test hook: never return (the host still sends heartbeats)"""
+    while True:
+        time.sleep(60)
+
+
+_OPS = {
+    "print": _op_print,
+    "active_jobs": _op_active_jobs,
+    "_test_crash": _op_test_crash,
+    "_test_crash_idempotent": _op_test_crash,
+    "_test_hang": _op_test_hang,
+}
+_IDEMPOTENT_OPS = {"active_jobs", "_test_crash_idempotent"}
+
+
+def _host_main(conn, heartbeat_interval: float, settings_values: dict | None):
+    """Entry point of the host process"""
+    # Use the parent's settings (including command line overrides), so
+    # the same backend is installed here
+    if settings_values is not None:
+        set_settings(Settings(**settings_values))
+    configure_backend(get_settings())
+
+    send_lock = threading.Lock()
+
+    def send(data: bytes):
+        with send_lock:
+            conn.send_bytes(data)
+
+    def heartbeat():
+        while True:
+            time.sleep(heartbeat_interval)
+            try:
+                send(encode(MSG_HEARTBEAT, 0))
+            except (OSError, ValueError):
+                # Parent is gone; don't linger as an orphan
+                os._exit(0)
+
+    threading.Thread(target=heartbeat, name="backend-heartbeat", daemon=True).start()
+
+    while True:
+        try:
+            kind, seq, body = decode(conn.recv_bytes())
+        except (EOFError, OSError):
+            return
+        if kind == MSG_SHUTDOWN:
+            return
+        if kind != MSG_CALL:
+            continue
+
+        send(encode(MSG_ACCEPTED, seq))
+        try:
+            reply = {"result": _OPS[body["op"]](body)}
+        except Exception as e:
+            reply = {"error": str(e) or type(e).__name__}
+        try:
+            send(encode(MSG_RESULT, seq, reply))
+        except (OSError, ValueError):
+            return
+
+
+class BackendHost:
+    """
+    Runs print backends in a supervised child process.
+
+    Calls are serialized; the host handles one backend call at a time.
+
+    Args:
+        heartbeat_interval: Seconds between heartbeats sent by the host
+        heartbeat_timeout: Restart the host after this long without a heartbeat
+        call_timeout: Restart the host if one file takes longer than this
+        settings: Settings for the host process (default: its environment)
+    """
+
+    def __init__(self, heartbeat_interval: float = 1.0, heartbeat_timeout: float = 10.0,
+                 call_timeout: float = 120.0, settings: Settings | None = None):
+        self.settings = settings
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.call_timeout = call_timeout
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._seq = 0
+        self._last_heartbeat = 0.0
+        self._accepted = False  # Host acknowledged the current call
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "BackendHost | None":
+        """Host configured from settings, or None if isolation is disabled"""
+        if not settings.backend_isolation:
+            return None
+        return cls(call_timeout=settings.backend_call_timeout, settings=settings)
+
+    @property
+    def alive(self) -> bool:
+        """True while the host process is running"""
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        """Start the host process (done automatically on the first call)"""
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._process = self._ctx.Process(
+            target=_host_main,
+            args=(child_conn, self.heartbeat_interval,
+                  asdict(self.settings) if self.settings else None),
+            name="pdfbp-backend",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._last_heartbeat = time.monotonic()
+        self._stopped.clear()
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch_idle, name="backend-watchdog",
+                                              daemon=True)
+            self._watchdog.start()
+
+    def stop(self):
+        """Shut the host down"""
+        self._stopped.set()
+        with self._lock:
+            if self._process is None:
+                return
+            try:
+                self._conn.send_bytes(encode(MSG_SHUTDOWN, 0))
+            except (OSError, ValueError):
+                pass
+            self._process.join(2)
+            self._kill()
+
+    def _kill(self):
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join(5)
+        self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def _restart(self):
+        self._kill()
+        self.restarts += 1
+        self.start()
+
+    def _check(self):
+        """
+        Read what the host sent since the last call and make sure it is alive.
+
+        Raises:
+            _HostLost: If the host died or stopped sending heartbeats
+        """
+        try:
+            while self._conn.poll(0):
+                # Heartbeats, or the reply to a call that was given up on
+                self._conn.recv_bytes()
+                self._last_heartbeat = time.monotonic()
+        except (EOFError, OSError):
+            raise _HostLost()
+        if not self._process.is_alive():
+            raise _HostLost()
+        if time.monotonic() - self._last_heartbeat > self.heartbeat_timeout:
+            raise _HostLost()
+
+    def _watch_idle(self):
+        """Watchdog thread: check the host while no call is running"""
+        while not self._stopped.wait(self.heartbeat_interval):
+            if not self._lock.acquire(blocking=False):
+                continue  # A call is running; _wait() watches the host
+            try:
+                if self._process is not None and not self._stopped.is_set():
+                    try:
+                        self._check()
+                    except _HostLost:
+                        self._restart()
+            finally:
+                self._lock.release()
+
+    def _call(self, op: str, body: dict, timeout: float):
+        """
+        Run an operation in the host and return its result.
+
+        Raises:
+            BackendHostError: If the host failed while running a call that
+                cannot be replayed, or kept failing
+        """
+        with self._lock:
+            if self._process is None:
+                self.start()
+            else:
+                try:
+                    self._check()
+                except _HostLost:
+                    self._restart()  # Nothing was sent yet
+
+            restarts = 0
+            while True:
+                self._seq = (self._seq + 1) & 0xFFFFFFFF
+                self._accepted = False
+                try:
+                    try:
+                        self._conn.send_bytes(encode(MSG_CALL, self._seq, {"op": op, **body}))
+                    except (OSError, ValueError):
+                        raise _HostLost()
+                    reply = self._wait(self._seq, timeout)
+                except _HostLost:
+                    self._restart()
+                    restarts += 1
+                    if self._accepted and op not in _IDEMPOTENT_OPS:
+                        raise BackendHostError(BACKEND_LOST_MESSAGE)
+                    if restarts > MAX_RESTARTS_PER_CALL:
+                        raise BackendHostError("Yazdırma arka ucu sürekli çöküyor")
+                    continue  # Never started (or safe to repeat): replay
+
+                if "error" in reply:
+                    raise BackendHostError(reply["error"])
+                return reply["result"]
+
+    def _wait(self, seq: int, timeout: float) -> dict:
+        """Read messages until the reply for `seq` arrives, watching the host"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if self._conn.poll(min(self.heartbeat_interval, 0.5)):
+                    kind, msg_seq, body = decode(self._conn.recv_bytes())
+                    self._last_heartbeat = time.monotonic()
+                    if kind == MSG_ACCEPTED and msg_seq == seq:
+                        self._accepted = True
+                    elif kind == MSG_RESULT and msg_seq == seq:
+                        return body
+            except (EOFError, OSError):
+                raise _HostLost()
+
+            now = time.monotonic()
+            if not self._process.is_alive():
+                raise _HostLost()
+            if now - self._last_heartbeat > self.heartbeat_timeout or now > deadline:
+                raise _HostLost()
+
+    def print_pdfs(self, pdf_paths: list[str], options: JobOptions | None = None) -> PrintResult:
+        """Same as core.printer.print_pdfs, run in the host process"""
+        body = {
+            "paths": list(pdf_paths),
+            "options": asdict(options) if options else None,
+        }
+        try:
+            result = self._call("print", body, self.call_timeout * max(len(pdf_paths), 1))
+        except BackendHostError as e:
+            return PrintResult(False, str(e))
+        return PrintResult(**result)
+
+    def print_pdf(self, pdf_path: str, options: JobOptions | None = None) -> PrintResult:
+        """Same as core.printer.print_pdf, run in the host process"""
+        return self.print_pdfs([pdf_path], options)
+
+    def active_jobs(self) -> set[str] | None:
+        """
+        Same as core.printer.backend_active_jobs, asked in the host process.
+
+        A backend that keeps its queue in memory (the virtual printer)
+        starts empty again after a restart of the host.
+        """
+        try:
+            jobs = self._call("active_jobs", {}, self.call_timeout)
+        except BackendHostError:
+            return None
+        return None if jobs is None else set(jobs)
+
+
+class _HostLost(Exception):
+    """The host died, stopped sending heartbeats or timed out"""
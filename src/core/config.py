@@ -0,0 +1,98 @@
+"""
+Application settings
+Defaults can be overridden with PDFBP_* environment variables and,
+for scripted runs, command line options
+"""
+
+import os
+from dataclasses import dataclass, fields
+
+
+def _parse(kind: type, value: str):
+    """Convert an environment string to a field's type"""
+    if kind is bool:
+        return value.strip().lower() in ("1", "true", "yes", "on", "evet")
+    return kind(value)
+
+
+@dataclass
+class Settings:
+    """Tunable settings shared by the GUI and the command line"""
+
+    # Spool flow control (CUPS). Submission pauses when the bytes spooled
+    # but not yet printed exceed the high watermark and resumes once they
+    # drop below the low watermark. 0 disables flow control.
+    spool_dir: str = "/var/spool/cups"
+    spool_high_mb: int = 2048
+    spool_low_mb: int = 1024
+    spool_min_free_mb: int = 512  # Free space always left on the spool partition
+
+    # Print backends run in a supervised child process that is restarted
+    # when it crashes, stops sending heartbeats or exceeds the call timeout
+    backend_isolation: bool = True
+    backend_call_timeout: int = 120  # Seconds per file
+
+    # Large batches are validated and page-counted in parallel processes
+    # before printing starts. -1 uses every core, 0 or 1 disables sharding.
+    shard_processes: int = -1
+    shard_min_files: int = 5000  # Smaller batches are prepared in-process
+
+    # Save the batch (files, order, print status) on exit and restore it
+    # on the next start
+    session_restore: bool = True
+
+    # Sampling profiler (see core.profiler). A collapsed-stack file and a
+    # summary are written to profile_dir at the end of every batch.
+    profile: bool = False
+    profile_dir: str = ""          # Default: ~/.pdf-batch-printer/profiles
+    profile_interval_ms: int = 10
+
+    # Milliseconds the print worker pauses between files so the spooler
+    # keeps up; 0 for load tests against the virtual printer
+    submit_interval_ms: int = 500
+
+    # Print backend: "system" (lp/lpr/SumatraPDF) or "virtual", a simulated
+    # printer for load testing (see core.virtual_printer)
+    backend: str = "system"
+    virtual_accept_ms: float = 50.0
+    virtual_pages_per_minute: float = 60.0
+    virtual_queue_capacity: int = 100
+    virtual_failure_rate: float = 0.0   # Transient errors, 0..1
+    virtual_down_rate: float = 0.0      # "Printer stopped" errors, 0..1
+    virtual_seed: int = 0
+    virtual_speed: float = 1.0          # Virtual seconds per second, 0 = don't wait
+    virtual_trace: str = ""             # Timing trace to replay (accounting CSV export)
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> "Settings":
+        """
+        Build settings from PDFBP_<FIELD> environment variables,
+        e.g. PDFBP_SPOOL_HIGH_MB=4096.
+        """
+        settings = cls()
+        for f in fields(cls):
+            value = environ.get(f"PDFBP_{f.name.upper()}")
+            if value is None or value == "":
+                continue
+            try:
+                setattr(settings, f.name, _parse(f.type, value))
+            except (TypeError, ValueError):
+                raise ValueError(f"Geçersiz ayar: PDFBP_{f.name.upper()}={value}")
+        return settings
+
+
+_settings: Settings | None = None
+
+
+def get_settings() -> Settings:
+    """Current settings (loaded from the environment on first use)"""
+    global _settings
+    if _settings is None:
+        _settings = Settings.from_env()
+    return _settings
+
+
+def set_settings(settings: Settings):
+    """Replace the current settings (used by the command line entry point)"""
+    global _settings
+    _settings = settings
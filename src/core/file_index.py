@@ -0,0 +1,225 @@
+"""
+PDF file discovery and sort-key index
+Scans one or more folders (optionally recursive) once and keeps compact
+per-file metadata so re-sorting and filtering never touch the filesystem
+"""
+
+import os
+import re
+from array import array
+from collections.abc import Sequence
+from typing import Callable
+
+
+# Sort modes
+SORT_NATURAL = "natural"   # Name, numbers compared by value ("2" < "10")
+SORT_NAME = "name"         # Name, Turkish alphabetical order
+SORT_MTIME = "mtime"       # Last modification time
+SORT_SIZE = "size"         # File size
+
+SORT_MODES = (SORT_NATURAL, SORT_NAME, SORT_MTIME, SORT_SIZE)
+
+# Turkish alphabet (plus q, w, x) in collation order, remapped into the
+# private use area so the keys never collide with letters that really
+# occur in file names (e.g. U+0100..U+011F are Ā..ğ)
+_TR_ALPHABET = "abcçdefgğhıijklmnoöpqrsştuüvwxyz"
+_TR_COLLATE = {ord(c): 0xE000 + i for i, c in enumerate(_TR_ALPHABET)}
+_DIGITS = re.compile(r"(\d+)")
+
+
+def turkish_fold(text: str) -> str:
+    """Lower-case text with Turkish dotted/dotless I rules"""
+    return text.replace("I", "ı").replace("İ", "i").lower()
+
+
+def collation_key(text: str) -> str:
+    """
+    Key that orders text case-insensitively by the Turkish alphabet
+    (c < ç < d, g < ğ < h, ı < i, o < ö < p, s < ş < t, u < ü < v).
+
+    Letters are remapped into the private use area so digits, punctuation
+    and other scripts keep sorting before them; the result is a plain string, which keeps
+    comparisons fast and independent of the process locale.
+    """
+    return turkish_fold(text).translate(_TR_COLLATE)
+
+
+def natural_key(text: str) -> tuple:
+    """Key that compares runs of digits numerically ("2.pdf" < "10.pdf")"""
+    parts = _DIGITS.split(turkish_fold(text))
+    # re.split with a capture group alternates text/number, text first
+    return tuple(int(p) if i % 2 else p.translate(_TR_COLLATE) for i, p in enumerate(parts))
+
+
+class OrderedView(Sequence):
+    """
+    Read-only view of a column in a given order, e.g. the labels of the
+    current print order, without building a new list per sort or filter
+    """
+
+    def __init__(self, column, order):
+        self._column = column
+        self._order = order
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._column[j] for j in self._order[i]]
+        return self._column[self._order[i]]
+
+
+class FileIndex:
+    """
+    Column-oriented index of discovered PDF files.
+
+    Files are addressed by their position in the index. Sort keys are
+    computed once per file and sorted orders are cached per mode, so
+    switching sort mode or filter text on 100k entries is a pure
+    in-memory operation.
+    """
+
+    def __init__(self):
+        self.roots: list[str] = []
+        self.paths: list[str] = []
+        self.labels: list[str] = []      # Path shown to the user (relative to its root)
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self._keys: dict[str, list] = {}
+        self._orders: dict[str, array] = {}
+        self._folded: list[str] | None = None
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @classmethod
+    def from_columns(cls, roots: list[str], paths, labels, sizes, mtimes,
+                     orders: dict | None = None) -> "FileIndex":
+        """
+        Index over existing columns (e.g. a memory-mapped session snapshot).
+
+        `paths` and `labels` may be any sequence of str, `sizes`/`mtimes`
+        any indexable numbers; `orders` are precomputed sorted orders per
+        sort mode.
+        """
+        index = cls()
+        index.roots = list(roots)
+        index.paths = paths
+        index.labels = labels
+        index.sizes = sizes
+        index.mtimes = mtimes
+        index._orders = dict(orders or {})
+        return index
+
+    def cached_orders(self) -> dict:
+        """Sorted orders computed so far, by sort mode"""
+        return dict(self._orders)
+
+    @classmethod
+    def scan(cls, roots: list[str], recursive: bool = False,
+             should_cancel: Callable[[], bool] | None = None) -> "FileIndex":
+        """
+        Build an index of all PDF files under the given folders.
+
+        Args:
+            roots: Folders to scan, in the order they were selected
+            recursive: Also descend into subfolders
+            should_cancel: Polled once per folder; the scan stops early
+                (returning a partial index) when it returns True
+
+        Returns:
+            FileIndex in discovery order (use order() for print order)
+        """
+        index = cls()
+        seen = set()
+        prefix_labels = len(roots) > 1
+
+        for root in roots:
+            root = os.path.abspath(root)
+            index.roots.append(root)
+            root_name = os.path.basename(root.rstrip(os.sep)) or root
+            stack = [(root, "")]
+
+            while stack:
+                if should_cancel and should_cancel():
+                    return index
+                folder, rel = stack.pop()
+                try:
+                    entries = list(os.scandir(folder))
+                except OSError:
+                    continue
+
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                stack.append((entry.path, f"{rel}{entry.name}/"))
+                            continue
+                        if not entry.name.lower().endswith(".pdf") or not entry.is_file():
+                            continue
+                        # Overlapping roots or case-insensitive filesystems
+                        # can yield the same file twice
+                        key = os.path.normcase(entry.path)
+                        if key in seen:
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+
+                    seen.add(key)
+                    label = f"{rel}{entry.name}"
+                    if prefix_labels:
+                        label = f"{root_name}/{label}"
+                    index.paths.append(entry.path)
+                    index.labels.append(label)
+                    index.sizes.append(st.st_size)
+                    index.mtimes.append(st.st_mtime)
+
+        # Precompute the default key while the labels are hot
+        index.sort_keys(SORT_NATURAL)
+        return index
+
+    def sort_keys(self, mode: str) -> list | array:
+        """Per-file sort keys for a mode, computed once and cached"""
+        if mode == SORT_MTIME:
+            return self.mtimes
+        if mode == SORT_SIZE:
+            return self.sizes
+
+        keys = self._keys.get(mode)
+        if keys is None:
+            if mode == SORT_NATURAL:
+                keys = [natural_key(label) for label in self.labels]
+            elif mode == SORT_NAME:
+                keys = [collation_key(label) for label in self.labels]
+            else:
+                raise ValueError(f"Bilinmeyen sıralama: {mode}")
+            self._keys[mode] = keys
+        return keys
+
+    def order(self, mode: str = SORT_NATURAL, reverse: bool = False) -> array:
+        """
+        File positions sorted by the given mode.
+
+        Returns:
+            array of positions into paths/labels
+        """
+        cached = self._orders.get(mode)
+        if cached is None:
+            keys = self.sort_keys(mode)
+            cached = array("L", sorted(range(len(self.paths)), key=keys.__getitem__))
+            self._orders[mode] = cached
+        if reverse:
+            return cached[::-1]
+        return cached
+
+    def filter(self, order: array, text: str) -> array:
+        """Keep positions from `order` whose label contains `text` (case-insensitive)"""
+        needle = turkish_fold(text.strip())
+        if not needle:
+            return order
+        if self._folded is None:
+            self._folded = [turkish_fold(label) for label in self.labels]
+        folded = self._folded
+        return array("L", [i for i in order if needle in folded[i]])
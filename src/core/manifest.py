@@ -0,0 +1,248 @@
+"""
+Batch manifests: precomputed print lists with per-file options
+
+Supported formats (chosen by file extension):
+    .csv            Header row with a "path" column and optional
+                    copies, collate, duplex, nup, pages, media, tray,
+                    printer columns
+    .jsonl/.ndjson  One JSON object per line with the same keys
+
+Manifests are read line by line and never fully loaded into memory,
+so million-line manifests from external systems are fine.
+"""
+
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from core.options import JobOptions
+from core.printer import get_platform, print_pdfs, PrintResult
+from core.retry import ErrorKind, classify_error, classify_exception
+from core.spool import SpoolMonitor
+
+
+# Upper bound for files sharing one lp submission
+MAX_GROUP_FILES = 50
+
+
+def default_group_files() -> int:
+    """
+    Files per submission on this platform.
+
+    Windows prints a group one file at a time and reports only the first
+    failure, so a group could not tell which files were already printed
+    when it is retried or split; there every file is its own submission.
+    """
+    return 1 if get_platform() == "windows" else MAX_GROUP_FILES
+
+
+@dataclass
+class ManifestEntry:
+    """One file from a manifest"""
+    line: int
+    path: str
+    options: JobOptions
+    error: str = ""  # Set if the line could not be used
+
+
+@dataclass
+class ManifestGroup:
+    """Consecutive manifest entries that can be printed as one submission"""
+    options: JobOptions
+    entries: list[ManifestEntry] = field(default_factory=list)
+
+
+def _resolve(path: str, base_dir: str) -> str:
+    """Resolve a manifest path relative to the manifest's folder"""
+    path = os.path.expanduser(path.strip())
+    if not os.path.isabs(path):
+        path = os.path.join(base_dir, path)
+    return os.path.normpath(path)
+
+
+def _entry(line: int, row: dict, base_dir: str, defaults: JobOptions) -> ManifestEntry:
+    """Turn a raw manifest row into an entry, recording problems in `error`"""
+    raw_path = str(row.get("path") or row.get("dosya") or "").strip()
+    if not raw_path:
+        return ManifestEntry(line, "", defaults, f"Satır {line}: dosya yolu eksik")
+
+    path = _resolve(raw_path, base_dir)
+    try:
+        options = JobOptions.from_mapping(row, defaults)
+    except ValueError as e:
+        return ManifestEntry(line, path, defaults, f"Satır {line}: {e}")
+
+    if not os.path.isfile(path):
+        return ManifestEntry(line, path, options, f"Dosya bulunamadı: {path}")
+
+    return ManifestEntry(line, path, options)
+
+
+def iter_manifest(manifest_path: str, defaults: JobOptions | None = None) -> Iterator[ManifestEntry]:
+    """
+    Stream entries from a CSV or JSON-lines manifest.
+
+    Invalid lines are yielded with `error` set instead of aborting the
+    whole run, so one bad row cannot stop a large batch.
+
+    Args:
+        manifest_path: Path to the manifest file
+        defaults: Options for columns that are missing or empty
+
+    Raises:
+        ValueError: If the format is unknown or a CSV has no path column
+    """
+    defaults = defaults or JobOptions()
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    ext = os.path.splitext(manifest_path)[1].lower()
+
+    if ext == ".csv":
+        with open(manifest_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            fields = {name.strip().lower() for name in reader.fieldnames or []}
+            if not fields & {"path", "dosya"}:
+                raise ValueError("Manifest dosyasında 'path' sütunu yok")
+            for row in reader:
+                row = {(k or "").strip().lower(): v for k, v in row.items()}
+                # Line numbers count the header as line 1
+                yield _entry(reader.line_num, row, base_dir, defaults)
+
+    elif ext in (".jsonl", ".ndjson"):
+        with open(manifest_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield ManifestEntry(line_no, "", defaults, f"Satır {line_no}: geçersiz JSON ({e.msg})")
+                    continue
+                if not isinstance(row, dict):
+                    yield ManifestEntry(line_no, "", defaults, f"Satır {line_no}: JSON nesnesi bekleniyor")
+                    continue
+                yield _entry(line_no, row, base_dir, defaults)
+
+    else:
+        raise ValueError(f"Desteklenmeyen manifest biçimi: {ext or manifest_path}")
+
+
+def group_entries(entries: Iterable[ManifestEntry],
+                  max_files: int = MAX_GROUP_FILES) -> Iterator[ManifestGroup]:
+    """
+    Merge consecutive entries with identical options into groups.
+
+    Order is preserved exactly. Entries with an error are yielded as
+    groups of their own so they can be reported in sequence. Groups with
+    several copies are printed as separate documents (see
+    JobOptions.lp_args), so copies still come out per file.
+    """
+    group = None
+    for entry in entries:
+        if entry.error:
+            if group:
+                yield group
+                group = None
+            yield ManifestGroup(entry.options, [entry])
+            continue
+
+        if group and (group.options != entry.options or len(group.entries) >= max_files):
+            yield group
+            group = None
+        if group is None:
+            group = ManifestGroup(entry.options)
+        group.entries.append(entry)
+
+    if group:
+        yield group
+
+
+def run_manifest(manifest_path: str,
+                 defaults: JobOptions | None = None,
+                 on_result: Callable[[ManifestEntry, PrintResult], None] | None = None,
+                 should_cancel: Callable[[], bool] | None = None,
+                 max_group_files: int | None = None,
+                 spool: SpoolMonitor | None = None,
+                 on_throttle: Callable[[bool], None] | None = None,
+                 printer: Callable[[list[str], JobOptions], PrintResult] = print_pdfs) -> tuple[int, int]:
+    """
+    Print every file of a manifest, in order.
+
+    A group rejected as a whole for a permanent reason is printed again
+    file by file, so one bad file fails only its own entry.
+
+    Args:
+        manifest_path: Path to the manifest file
+        defaults: Options for columns that are missing or empty
+        on_result: Called once per entry with its outcome
+        should_cancel: Polled between submissions
+        max_group_files: Upper bound for files per submission
+            (default: default_group_files())
+        spool: Flow control that pauses while the spool partition is busy
+        on_throttle: Called with True/False when submission pauses/resumes
+        printer: Function used to submit a group; defaults to core.printer.print_pdfs
+
+    Returns:
+        Tuple of (success_count, error_count)
+    """
+    success_count = 0
+    error_count = 0
+
+    def submit(entries: list[ManifestEntry],
+               options: JobOptions) -> tuple[PrintResult, ErrorKind | None] | None:
+        """Print entries as one submission; None if cancelled while throttled"""
+        paths = [e.path for e in entries]
+        size = 0
+        if spool:
+            size = sum(os.path.getsize(p) for p in paths if os.path.isfile(p))
+            if not spool.wait_for_capacity(size, should_cancel, on_throttle):
+                return None
+        try:
+            result = printer(paths, options)
+        except Exception as e:
+            return PrintResult(False, str(e)), classify_exception(e)
+        if result.success:
+            if spool:
+                spool.register(result.job_id, size)
+            return result, None
+        return result, classify_error(result.error_message)
+
+    groups = group_entries(iter_manifest(manifest_path, defaults),
+                           max_group_files or default_group_files())
+    for group in groups:
+        if should_cancel and should_cancel():
+            break
+
+        first = group.entries[0]
+        if first.error:
+            outcomes = [(group.entries, PrintResult(False, first.error))]
+        else:
+            submitted = submit(group.entries, group.options)
+            if submitted is None:
+                break
+            result, kind = submitted
+            outcomes = [(group.entries, result)]
+            # One unprintable file makes lp reject the whole job: find it
+            # by printing the files one by one (as PrintWorker does)
+            if kind is ErrorKind.PERMANENT and len(group.entries) > 1:
+                outcomes = []
+                for entry in group.entries:
+                    if should_cancel and should_cancel():
+                        break
+                    submitted = submit([entry], group.options)
+                    if submitted is None:
+                        break
+                    outcomes.append(([entry], submitted[0]))
+
+        for entries, result in outcomes:
+            for entry in entries:
+                if result.success:
+                    success_count += 1
+                else:
+                    error_count += 1
+                if on_result:
+                    on_result(entry, result)
+
+    return success_count, error_count
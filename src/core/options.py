@@ -0,0 +1,235 @@
+"""
+Print job options and their translation to print command arguments
+"""
+
+import re
+from dataclasses import dataclass
+
+
+# Duplex modes (values are CUPS "sides" names)
+DUPLEX_OFF = "one-sided"
+DUPLEX_LONG = "two-sided-long-edge"
+DUPLEX_SHORT = "two-sided-short-edge"
+
+_DUPLEX_ALIASES = {
+    "": None,
+    "none": None,
+    "default": None,
+    "off": DUPLEX_OFF,
+    "no": DUPLEX_OFF,
+    "false": DUPLEX_OFF,
+    "0": DUPLEX_OFF,
+    "simplex": DUPLEX_OFF,
+    "one-sided": DUPLEX_OFF,
+    "tek": DUPLEX_OFF,
+    "on": DUPLEX_LONG,
+    "yes": DUPLEX_LONG,
+    "true": DUPLEX_LONG,
+    "1": DUPLEX_LONG,
+    "duplex": DUPLEX_LONG,
+    "long": DUPLEX_LONG,
+    "long-edge": DUPLEX_LONG,
+    "two-sided-long-edge": DUPLEX_LONG,
+    "short": DUPLEX_SHORT,
+    "short-edge": DUPLEX_SHORT,
+    "two-sided-short-edge": DUPLEX_SHORT,
+}
+
+_PAGE_RANGES = re.compile(r"^\d+(-\d+)?(,\d+(-\d+)?)*$")
+
+# How CUPS arranges the copies of a multi-file job (IPP multiple-document-handling)
+SEPARATE_COLLATED = "separate-documents-collated-copies"      # a b, a b
+SEPARATE_UNCOLLATED = "separate-documents-uncollated-copies"  # a a, b b
+
+# Pages per sheet supported by CUPS number-up
+NUMBER_UP_VALUES = (1, 2, 4, 6, 9, 16)
+
+_TRUE = ("1", "true", "yes", "on", "evet")
+_FALSE = ("0", "false", "no", "off", "hayır", "hayir")
+
+
+@dataclass(frozen=True)
+class JobOptions:
+    """
+    Options for one print submission.
+
+    None means "printer default". Instances are immutable and hashable so
+    consecutive files with identical options can share a submission.
+    """
+    printer: str | None = None
+    copies: int = 1
+    collate: bool | None = None
+    duplex: str | None = None
+    number_up: int = 1
+    page_ranges: str | None = None
+    media: str | None = None
+    tray: str | None = None
+
+    @classmethod
+    def from_mapping(cls, values: dict, defaults: "JobOptions | None" = None) -> "JobOptions":
+        """
+        Build options from loosely typed values (manifest row, CLI, JSON).
+
+        Missing or empty values fall back to `defaults`.
+
+        Raises:
+            ValueError: If a value is invalid
+        """
+        base = defaults or cls()
+
+        def text(key: str) -> str | None:
+            value = values.get(key)
+            if value is None:
+                return None
+            value = str(value).strip()
+            return value or None
+
+        copies = base.copies
+        if text("copies") is not None:
+            try:
+                copies = int(text("copies"))
+            except ValueError:
+                raise ValueError(f"Geçersiz kopya sayısı: {values.get('copies')}")
+            if copies < 1:
+                raise ValueError(f"Geçersiz kopya sayısı: {copies}")
+
+        duplex = base.duplex
+        if text("duplex") is not None:
+            key = text("duplex").lower()
+            if key not in _DUPLEX_ALIASES:
+                raise ValueError(f"Geçersiz çift yön değeri: {values.get('duplex')}")
+            duplex = _DUPLEX_ALIASES[key]
+
+        collate = base.collate
+        if text("collate") is not None:
+            key = text("collate").lower()
+            if key in _TRUE:
+                collate = True
+            elif key in _FALSE:
+                collate = False
+            else:
+                raise ValueError(f"Geçersiz harmanlama değeri: {values.get('collate')}")
+
+        number_up = base.number_up
+        if text("nup") is not None:
+            try:
+                number_up = int(text("nup"))
+            except ValueError:
+                number_up = 0
+            if number_up not in NUMBER_UP_VALUES:
+                raise ValueError(f"Geçersiz sayfa/yaprak değeri: {values.get('nup')}")
+
+        page_ranges = base.page_ranges
+        if text("pages") is not None:
+            page_ranges = text("pages").replace(" ", "")
+            if not _PAGE_RANGES.match(page_ranges):
+                raise ValueError(f"Geçersiz sayfa aralığı: {values.get('pages')}")
+
+        return cls(
+            printer=text("printer") or base.printer,
+            copies=copies,
+            collate=collate,
+            duplex=duplex,
+            number_up=number_up,
+            page_ranges=page_ranges,
+            media=text("media") or base.media,
+            tray=text("tray") or base.tray,
+        )
+
+    def describe(self) -> str:
+        """Short human readable summary, e.g. 3 kopya, çift yüz (uzun kenar)"""
+        parts = []
+        if self.printer:
+            parts.append(self.printer)
+        if self.copies > 1:
+            parts.append(f"{self.copies} kopya" + (" (harmanlanmış)" if self.collate else ""))
+        if self.duplex == DUPLEX_LONG:
+            parts.append("çift yüz (uzun kenar)")
+        elif self.duplex == DUPLEX_SHORT:
+            parts.append("çift yüz (kısa kenar)")
+        elif self.duplex == DUPLEX_OFF:
+            parts.append("tek yüz")
+        if self.number_up > 1:
+            parts.append(f"{self.number_up} sayfa/yaprak")
+        if self.page_ranges:
+            parts.append(f"sayfalar {self.page_ranges}")
+        if self.media:
+            parts.append(self.media)
+        if self.tray:
+            parts.append(f"tepsi {self.tray}")
+        return ", ".join(parts) or "yazıcı varsayılanları"
+
+    def _cups_options(self, files: int) -> list[str]:
+        """
+        -o options shared by lp and lpr.
+
+        When a job of several files is printed more than once, collate
+        also decides whether each copy is a full set of the files or
+        every file's copies come out together.
+        """
+        args = []
+        if files > 1 and self.copies > 1:
+            handling = SEPARATE_COLLATED if self.collate else SEPARATE_UNCOLLATED
+            args += ["-o", f"multiple-document-handling={handling}"]
+        if self.collate is not None:
+            args += ["-o", f"collate={'true' if self.collate else 'false'}"]
+        if self.duplex:
+            args += ["-o", f"sides={self.duplex}"]
+        if self.number_up > 1:
+            args += ["-o", f"number-up={self.number_up}"]
+        if self.media:
+            args += ["-o", f"media={self.media}"]
+        if self.tray:
+            args += ["-o", f"InputSlot={self.tray}"]
+        return args
+
+    def lp_args(self, files: int = 1) -> list[str]:
+        """
+        Arguments for CUPS `lp` printing `files` files as one job.
+
+        Copies are requested with -n so the server produces them from a
+        single spooled file instead of the client submitting repeatedly.
+        """
+        args = []
+        if self.printer:
+            args += ["-d", self.printer]
+        if self.copies > 1:
+            args += ["-n", str(self.copies)]
+        if self.page_ranges:
+            args += ["-P", self.page_ranges]
+        return args + self._cups_options(files)
+
+    def lpr_args(self, files: int = 1) -> list[str]:
+        """Arguments for BSD-style `lpr` (CUPS and macOS) printing `files` files as one job"""
+        args = []
+        if self.printer:
+            args += ["-P", self.printer]
+        if self.copies > 1:
+            args += ["-#", str(self.copies)]
+        if self.page_ranges:
+            args += ["-o", f"page-ranges={self.page_ranges}"]
+        return args + self._cups_options(files)
+
+    def sumatra_settings(self) -> str:
+        """
+        Value for SumatraPDF `-print-settings` (empty if nothing to set).
+
+        SumatraPDF has no n-up or collation setting; those options only
+        take effect with CUPS.
+        """
+        settings = []
+        if self.page_ranges:
+            settings.append(self.page_ranges)
+        if self.copies > 1:
+            settings.append(f"{self.copies}x")
+        if self.duplex == DUPLEX_LONG:
+            settings.append("duplexlong")
+        elif self.duplex == DUPLEX_SHORT:
+            settings.append("duplexshort")
+        elif self.duplex == DUPLEX_OFF:
+            settings.append("simplex")
+        if self.media:
+            settings.append(f"paper={self.media}")
+        if self.tray:
+            settings.append(f"bin={self.tray}")
+        return ",".join(settings)
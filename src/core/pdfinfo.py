@@ -0,0 +1,117 @@
+"""
+Lightweight PDF file checks that do not need a PDF library
+"""
+
+import functools
+import mmap
+import os
+import re
+import shutil
+import subprocess
+
+
+# PDF readers accept the header anywhere in the first 1024 bytes
+_HEADER_WINDOW = 1024
+
+# Page objects ("/Type /Page", but not "/Type /Pages") and page tree counts
+_PAGE_OBJECT = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+_PAGE_COUNT = re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)|/Count\s+(\d+)[^>]*?/Type\s*/Pages\b")
+_PDFINFO_PAGES = re.compile(rb"^Pages:\s+(\d+)", re.MULTILINE)
+
+
+def check_pdf(pdf_path: str) -> str:
+    """
+    Verify that a file exists and looks like a PDF.
+
+    Args:
+        pdf_path: Full path to the file
+
+    Returns:
+        The same path, so the function can be used as a pipeline stage
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the file is empty or has no PDF header
+    """
+    if not os.path.isfile(pdf_path):
+        raise FileNotFoundError(f"Dosya bulunamadı: {pdf_path}")
+
+    with open(pdf_path, "rb") as f:
+        head = f.read(_HEADER_WINDOW)
+
+    if not head:
+        raise ValueError(f"Dosya boş: {os.path.basename(pdf_path)}")
+    if b"%PDF-" not in head:
+        raise ValueError(f"Geçerli bir PDF dosyası değil: {os.path.basename(pdf_path)}")
+    return pdf_path
+
+
+def count_pages_in(data) -> int | None:
+    """
+    Best-effort page count of a PDF held in a buffer (bytes, mmap, memoryview).
+
+    Counts page objects; when those are hidden inside compressed object
+    streams, falls back to the largest page tree /Count. Incrementally
+    updated files keep superseded page objects, so this can overcount;
+    count_pages() prefers poppler's pdfinfo when it is installed.
+    """
+    pages = sum(1 for _ in _PAGE_OBJECT.finditer(data))
+    if pages:
+        return pages
+    counts = [int(a or b) for a, b in _PAGE_COUNT.findall(data)]
+    return max(counts) if counts else None
+
+
+@functools.cache
+def _pdfinfo_command() -> str | None:
+    return shutil.which("pdfinfo")
+
+
+def _pdfinfo_pages(pdf_path: str) -> int | None:
+    """Page count reported by poppler's pdfinfo, which reads the real page tree"""
+    command = _pdfinfo_command()
+    if command is None:
+        return None
+    try:
+        result = subprocess.run([command, pdf_path], capture_output=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _PDFINFO_PAGES.search(result.stdout) if result.returncode == 0 else None
+    return int(match.group(1)) if match else None
+
+
+def count_pages(pdf_path: str) -> int | None:
+    """
+    Page count of a PDF file.
+
+    Uses pdfinfo when it is installed, otherwise the scan of
+    count_pages_in on a memory map of the file (not copied into memory).
+    Either way this costs real time on large files, so callers keep it
+    off the print path.
+
+    Returns:
+        Number of pages, or None if it cannot be determined
+    """
+    pages = _pdfinfo_pages(pdf_path)
+    if pages is not None:
+        return pages
+    return scan_pages(pdf_path)
+
+
+def scan_pages(pdf_path: str) -> int | None:
+    """
+    Page count of a PDF file from count_pages_in on a memory map of it.
+
+    Runs in-process (no pdfinfo), for callers that need a cheap estimate.
+
+    Returns:
+        Number of pages, or None if it cannot be determined
+    """
+    try:
+        with open(pdf_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return count_pages_in(data)
+    except (OSError, ValueError):
+        return None
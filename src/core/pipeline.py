@@ -0,0 +1,203 @@
+"""
+Staged parallel pipeline that preserves input order
+
+Pre-submission work (validation, conversion, hashing ...) can run in
+parallel, but files must reach the printer strictly in the sorted batch
+order. Each stage has its own worker threads and a bounded input queue;
+results pass through a sequence-numbered reorder buffer before they are
+handed to the consumer, so output order always equals input order and
+memory stays bounded by the queue sizes.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator
+
+from core.profiler import stage as profile_stage
+
+
+@dataclass
+class Stage:
+    """One processing step of a pipeline"""
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 16
+
+
+@dataclass
+class PipelineResult:
+    """Outcome of one input item after all stages"""
+    seq: int
+    value: Any                         # Output of the last stage; None if a stage failed
+    error: BaseException | None = None
+    stage: str = ""  # Name of the stage that failed, if any
+    input: Any = None                  # The item as it entered the pipeline
+
+
+class ReorderBuffer:
+    """
+    Releases sequence-numbered items strictly in order.
+
+    Items that arrive early are held until every item before them has
+    been released.
+    """
+
+    def __init__(self, start: int = 0):
+        self._next = start
+        self._pending: dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def push(self, seq: int, item: Any) -> list[Any]:
+        """Add an item and return the items that are now in order (maybe none)"""
+        self._pending[seq] = item
+        ready = []
+        while self._next in self._pending:
+            ready.append(self._pending.pop(self._next))
+            self._next += 1
+        return ready
+
+
+_END = object()
+_POLL = 0.1
+
+
+class Pipeline:
+    """
+    Runs items through a chain of stages with bounded parallelism.
+
+    A failing stage does not stop the pipeline: the item skips the
+    remaining stages and is delivered in order with `error` set (and
+    `value` None), so the consumer can report it at the right position;
+    `input` always holds the original item.
+
+    A pipeline runs once. cancel() may be called before run() starts,
+    in which case run() yields nothing.
+
+    Args:
+        stages: Processing steps, applied in order
+        window: Maximum number of items in flight; defaults to the total
+            capacity of all stage queues and workers
+    """
+
+    def __init__(self, stages: list[Stage], window: int | None = None):
+        if not stages:
+            raise ValueError("Pipeline en az bir aşama gerektirir")
+        self.stages = stages
+        self.window = window or sum(s.queue_size + s.workers for s in stages)
+        self._stop = threading.Event()
+
+    def cancel(self):
+        """Stop feeding new items; items in flight are dropped"""
+        self._stop.set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """Blocking put that gives up when the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that gives up (returns _END) when the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                continue
+        return _END
+
+    def run(self, items: Iterable) -> Iterator[PipelineResult]:
+        """
+        Process items and yield results in input order.
+
+        Closing the generator early (e.g. on cancel) stops all threads.
+        """
+        queues = [queue.Queue(maxsize=s.queue_size) for s in self.stages]
+        output = queue.Queue()
+        slots = threading.Semaphore(self.window)
+        source_error: list[BaseException] = []
+        threads = []
+
+        def feed():
+            try:
+                for seq, value in enumerate(items):
+                    while not slots.acquire(timeout=_POLL):
+                        if self._stop.is_set():
+                            return
+                    if not self._put(queues[0], PipelineResult(seq, value, input=value)):
+                        return
+            except BaseException as e:
+                source_error.append(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    self._put(queues[0], _END)
+
+        def work(position: int, remaining: list[int], lock: threading.Lock):
+            stage = self.stages[position]
+            inbox = queues[position]
+            is_last = position == len(self.stages) - 1
+            outbox = output if is_last else queues[position + 1]
+
+            while True:
+                item = self._get(inbox)
+                if item is _END:
+                    break
+                if item.error is None:
+                    try:
+                        with profile_stage(stage.name):
+                            item.value = stage.func(item.value)
+                    except Exception as e:
+                        item.value = None
+                        item.error = e
+                        item.stage = stage.name
+                if is_last:
+                    outbox.put(item)
+                elif not self._put(outbox, item):
+                    return
+
+            # The last worker of a stage to finish closes the next stage
+            with lock:
+                remaining[0] -= 1
+                last_worker = remaining[0] == 0
+            if last_worker:
+                if is_last:
+                    output.put(_END)
+                else:
+                    for _ in range(self.stages[position + 1].workers):
+                        self._put(outbox, _END)
+
+        threads.append(threading.Thread(target=feed, name="pipeline-feed", daemon=True))
+        for position, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=work, args=(position, remaining, lock),
+                    name=f"pipeline-{stage.name}-{n}", daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        buffer = ReorderBuffer()
+        try:
+            while True:
+                item = self._get(output)
+                if item is _END:
+                    break
+                for ready in buffer.push(item.seq, item):
+                    yield ready
+                    slots.release()
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if source_error:
+            raise source_error[0]
@@ -4,18 +4,79 @@ Supports Windows (via SumatraPDF/Adobe Reader) and Linux (via CUPS/lp)
 """
 
 import os
+import re
+import stat
 import sys
 import subprocess
 import shutil
+import threading
 from pathlib import Path
 from dataclasses import dataclass
 
+from core.config import Settings
+from core.options import JobOptions
+
 
 @dataclass
 class PrintResult:
     """Result of a print operation"""
     success: bool
     error_message: str = ""
+    job_id: str = ""  # Spooler job id, if the print command reported one
+
+
+# lp output: "request id is PRINTER-123 (1 file(s))"
+_LP_JOB_ID = re.compile(r"request id is (\S+)")
+
+# Print backends selectable with PDFBP_BACKEND / --backend
+BACKEND_SYSTEM = "system"    # Platform print commands
+BACKEND_VIRTUAL = "virtual"  # Simulated printer (core.virtual_printer)
+BACKENDS = (BACKEND_SYSTEM, BACKEND_VIRTUAL)
+
+# Replaces the platform print commands when set
+_backend = None
+
+
+def set_backend(backend):
+    """
+    Route all printing through `backend` instead of the system commands.
+
+    The backend needs a `name` and a `print_pdfs(paths, options)` method
+    returning a PrintResult. None restores the system commands.
+    """
+    global _backend
+    _backend = backend
+
+
+def backend_active_jobs() -> set[str] | None:
+    """
+    Ids of jobs the installed backend has not finished yet.
+
+    Returns:
+        Set of job ids, or None for the system commands (ask lpstat) and
+        backends that cannot tell
+    """
+    lister = getattr(_backend, "active_jobs", None)
+    return None if lister is None else set(lister())
+
+
+def configure_backend(settings: Settings):
+    """
+    Install the backend selected in the settings.
+
+    Raises:
+        ValueError: If the backend name or its settings are invalid
+    """
+    if settings.backend == BACKEND_SYSTEM:
+        set_backend(None)
+    elif settings.backend == BACKEND_VIRTUAL:
+        from core.virtual_printer import VirtualPrinter
+        try:
+            set_backend(VirtualPrinter.from_settings(settings))
+        except OSError as e:
+            raise ValueError(f"Zamanlama kaydı okunamadı: {e}")
+    else:
+        raise ValueError(f"Bilinmeyen yazdırma arka ucu: {settings.backend}")
 
 
 def get_platform() -> str:
@@ -30,38 +91,151 @@ def get_platform() -> str:
         return "unknown"
 
 
-def print_pdf(pdf_path: str) -> PrintResult:
+def print_pdf(pdf_path: str, options: JobOptions | None = None) -> PrintResult:
     """
     Print a PDF file using platform-appropriate method.
 
     Args:
         pdf_path: Full path to the PDF file
+        options: Copies, duplex, tray etc. (default: printer defaults)
 
     Returns:
         PrintResult with success status and any error message
     """
-    # Validate file exists
-    if not os.path.isfile(pdf_path):
-        return PrintResult(False, f"Dosya bulunamadı: {pdf_path}")
+    return print_pdfs([pdf_path], options)
+
+
+def print_pdfs(pdf_paths: list[str], options: JobOptions | None = None) -> PrintResult:
+    """
+    Print several PDF files that share the same options.
+
+    On CUPS/macOS the files are sent as a single submission, so the
+    options are parsed once and the spooler sees one job instead of many.
+    Windows has no multi-file print command; files are printed one by
+    one and the first failure is returned, so callers submit one file per
+    call there (see core.manifest.default_group_files).
+
+    Args:
+        pdf_paths: Full paths to the PDF files, in print order
+        options: Options applied to every file
+
+    Returns:
+        PrintResult for the whole submission
+    """
+    options = options or JobOptions()
+
+    # Validate files exist
+    for pdf_path in pdf_paths:
+        if not os.path.isfile(pdf_path):
+            return PrintResult(False, f"Dosya bulunamadı: {pdf_path}")
+
+    pdf_paths = [os.path.abspath(p) for p in pdf_paths]
+    if _backend is not None:
+        return _backend.print_pdfs(pdf_paths, options)
 
     platform = get_platform()
 
     if platform == "windows":
-        return _print_windows(pdf_path)
+        for pdf_path in pdf_paths:
+            result = _print_windows(pdf_path, options)
+            if not result.success:
+                return result
+        return PrintResult(True)
     elif platform == "linux":
-        return _print_linux(pdf_path)
+        return _print_linux(pdf_paths, options)
     elif platform == "macos":
-        return _print_macos(pdf_path)
+        return _print_macos(pdf_paths, options)
     else:
         return PrintResult(False, f"Desteklenmeyen platform: {platform}")
 
 
-def _print_windows(pdf_path: str) -> PrintResult:
+def print_stream(source, options: JobOptions | None = None, title: str = "",
+                 offset: int = 0, length: int | None = None) -> PrintResult:
+    """
+    Print a document piped into the print command's standard input.
+
+    Generated data (merged, split or converted documents) can be printed
+    straight from memory without a temporary file, and open files without
+    reading them into this process:
+
+    - A file descriptor (or file object) is handed to `lp -` as its
+      standard input as is; this process copies nothing. A regular file
+      is first positioned at `offset`, wherever the caller left it; a
+      pipe is read from where it is (data a file object has already
+      buffered is not sent).
+    - A byte range of a file (`offset`/`length`) is moved into the pipe
+      with os.sendfile or os.splice inside the kernel.
+    - A buffer (bytes, bytearray, memoryview, mmap) is written to the
+      pipe in slices, without intermediate copies.
+
+    Only CUPS (Linux/macOS) can print from standard input.
+
+    Args:
+        source: File descriptor, file object with fileno() or buffer
+        options: Options for the job
+        title: Job title shown in the printer queue
+        offset: Start of the document within a file descriptor (for a
+            pipe: bytes to skip)
+        length: Bytes to send from `offset` (default: up to end of file)
+
+    Returns:
+        PrintResult for the submission
+    """
+    options = options or JobOptions()
+    title = title or "pdf-batch-printer"
+
+    if _backend is not None:
+        print_stream_backend = getattr(_backend, "print_stream", None)
+        if print_stream_backend is None:
+            return PrintResult(False, f"Akış ile yazdırma desteklenmiyor: {_backend.name}")
+        return print_stream_backend(source, options, title, offset, length)
+
+    platform = get_platform()
+    if platform not in ("linux", "macos"):
+        return PrintResult(False, f"Akış ile yazdırma bu platformda desteklenmiyor: {platform}")
+
+    if platform == "linux" and shutil.which("lp"):
+        tool, command = "lp", ["lp", *options.lp_args(), "-t", title, "-"]
+    elif shutil.which("lpr"):
+        # lpr reads standard input when no file is given
+        tool, command = "lpr", ["lpr", *options.lpr_args(), "-T", title]
+    else:
+        return PrintResult(False, "lp veya lpr komutu bulunamadı. CUPS kurulu mu?")
+
+    fd = source.fileno() if hasattr(source, "fileno") else source
+    try:
+        if isinstance(fd, int):
+            st = os.fstat(fd)
+            regular = stat.S_ISREG(st.st_mode)
+            if length is None and regular:
+                # The command reads from the shared file position
+                os.lseek(fd, offset, os.SEEK_SET)
+                return _run_stream(tool, command, fd, None, max(st.st_size - offset, 0))
+            if length is None and offset == 0:
+                return _run_stream(tool, command, fd, None, 0)
+            if length is None:
+                # Pipe: everything after the skipped bytes
+                return _run_stream(tool, command, None,
+                                   lambda w: _pump_fd(fd, w, offset, sys.maxsize), 0)
+            return _run_stream(tool, command, None, lambda w: _pump_fd(fd, w, offset, length), length)
+
+        view = memoryview(source).cast("B")
+        return _run_stream(tool, command, None, lambda w: _pump_buffer(view, w), view.nbytes)
+    except (OSError, TypeError, ValueError) as e:
+        return PrintResult(False, f"{tool} hatası: {e}")
+
+
+def _submit_timeout(file_count: int) -> int:
+    """Timeout for an lp/lpr call submitting `file_count` files"""
+    return 30 + 2 * (file_count - 1)
+
+
+def _print_windows(pdf_path: str, options: JobOptions) -> PrintResult:
     """
     Print PDF on Windows using available methods.
 
     Priority:
-    1. SumatraPDF (lightweight, silent printing)
+    1. SumatraPDF (lightweight, silent printing, honours options)
     2. Adobe Reader (if installed)
     3. Windows print command (ShellExecute)
     """
@@ -78,9 +252,17 @@ def _print_windows(pdf_path: str) -> PrintResult:
         if os.path.isfile(sumatra_path):
             try:
                 # -print-to-default: print to default printer
+                # -print-settings: copies, duplex, page ranges, tray
                 # -silent: no GUI
+                if options.printer:
+                    command = [sumatra_path, "-print-to", options.printer]
+                else:
+                    command = [sumatra_path, "-print-to-default"]
+                settings = options.sumatra_settings()
+                if settings:
+                    command += ["-print-settings", settings]
                 result = subprocess.run(
-                    [sumatra_path, "-print-to-default", "-silent", pdf_path],
+                    command + ["-silent", pdf_path],
                     capture_output=True,
                     timeout=60,
                     creationflags=subprocess.CREATE_NO_WINDOW
@@ -105,9 +287,12 @@ def _print_windows(pdf_path: str) -> PrintResult:
     for adobe_path in adobe_paths:
         if os.path.isfile(adobe_path):
             try:
-                # /t: print to default printer and exit
+                # /t: print to default (or named) printer and exit
+                command = [adobe_path, "/t", pdf_path]
+                if options.printer:
+                    command.append(options.printer)
                 result = subprocess.run(
-                    [adobe_path, "/t", pdf_path],
+                    command,
                     capture_output=True,
                     timeout=60,
                     creationflags=subprocess.CREATE_NO_WINDOW
@@ -142,12 +327,10 @@ def _print_windows(pdf_path: str) -> PrintResult:
         return PrintResult(False, f"Windows yazdırma hatası: {str(e)}")
 
 
-def _print_linux(pdf_path: str) -> PrintResult:
+def _print_linux(pdf_paths: list[str], options: JobOptions) -> PrintResult:
     """
-    Print PDF on Linux using CUPS (lp command).
+    Print PDFs on Linux using CUPS (lp command).
     """
-    pdf_path = os.path.abspath(pdf_path)
-
     # Check if lp command is available
     if not shutil.which("lp"):
         # Try lpr as fallback
@@ -157,9 +340,9 @@ def _print_linux(pdf_path: str) -> PrintResult:
         # Use lpr
         try:
             result = subprocess.run(
-                ["lpr", pdf_path],
+                ["lpr", *options.lpr_args(len(pdf_paths)), *pdf_paths],
                 capture_output=True,
-                timeout=30,
+                timeout=_submit_timeout(len(pdf_paths)),
                 text=True
             )
             if result.returncode == 0:
@@ -175,13 +358,14 @@ def _print_linux(pdf_path: str) -> PrintResult:
     # Use lp (preferred)
     try:
         result = subprocess.run(
-            ["lp", pdf_path],
+            ["lp", *options.lp_args(len(pdf_paths)), *pdf_paths],
             capture_output=True,
-            timeout=30,
+            timeout=_submit_timeout(len(pdf_paths)),
             text=True
         )
         if result.returncode == 0:
-            return PrintResult(True)
+            match = _LP_JOB_ID.search(result.stdout or "")
+            return PrintResult(True, job_id=match.group(1) if match else "")
         else:
             error = result.stderr.strip() if result.stderr else "Bilinmeyen hata"
             return PrintResult(False, f"lp hatası: {error}")
@@ -191,17 +375,15 @@ def _print_linux(pdf_path: str) -> PrintResult:
         return PrintResult(False, f"lp hatası: {str(e)}")
 
 
-def _print_macos(pdf_path: str) -> PrintResult:
+def _print_macos(pdf_paths: list[str], options: JobOptions) -> PrintResult:
     """
-    Print PDF on macOS using lpr command.
+    Print PDFs on macOS using lpr command.
     """
-    pdf_path = os.path.abspath(pdf_path)
-
     try:
         result = subprocess.run(
-            ["lpr", pdf_path],
+            ["lpr", *options.lpr_args(len(pdf_paths)), *pdf_paths],
             capture_output=True,
-            timeout=30,
+            timeout=_submit_timeout(len(pdf_paths)),
             text=True
         )
         if result.returncode == 0:
@@ -215,11 +397,116 @@ def _print_macos(pdf_path: str) -> PrintResult:
         return PrintResult(False, f"lpr hatası: {str(e)}")
 
 
+# Chunk moved per write/sendfile call when streaming into a pipe
+_STREAM_CHUNK = 1024 * 1024
+
+
+def _pump_buffer(view: memoryview, pipe_fd: int):
+    """Write a buffer into a pipe; memoryview slices do not copy"""
+    position = 0
+    while position < len(view):
+        position += os.write(pipe_fd, view[position:position + _STREAM_CHUNK])
+
+
+def _pump_fd(fd: int, pipe_fd: int, offset: int, length: int):
+    """Move a byte range of a file into a pipe inside the kernel where possible"""
+    mode = os.fstat(fd).st_mode
+    end = offset + length
+    if stat.S_ISREG(mode) and hasattr(os, "sendfile"):
+        while offset < end:
+            sent = os.sendfile(pipe_fd, fd, offset, min(_STREAM_CHUNK, end - offset))
+            if sent == 0:
+                return  # File shorter than expected
+            offset += sent
+    elif stat.S_ISFIFO(mode) and hasattr(os, "splice"):
+        # Pipes cannot seek; offset counts bytes to skip
+        while offset > 0:
+            skipped = len(os.read(fd, min(_STREAM_CHUNK, offset)))
+            if skipped == 0:
+                return
+            offset -= skipped
+        while length > 0:
+            moved = os.splice(fd, pipe_fd, min(_STREAM_CHUNK, length))
+            if moved == 0:
+                return
+            length -= moved
+    else:
+        while length > 0:
+            chunk = os.pread(fd, min(_STREAM_CHUNK, length), offset)
+            if not chunk:
+                return
+            _pump_buffer(memoryview(chunk), pipe_fd)
+            offset += len(chunk)
+            length -= len(chunk)
+
+
+def _run_stream(tool: str, command: list[str], stdin_fd: int | None, pump, nbytes: int) -> PrintResult:
+    """
+    Run a print command reading standard input.
+
+    Either `stdin_fd` is passed to the command directly, or `pump(fd)`
+    writes the document into a pipe from a background thread while the
+    command's output is collected.
+    """
+    timeout = _submit_timeout(1) + nbytes // (8 * 1024 * 1024)
+    pipe_w = None
+    if stdin_fd is None:
+        stdin_fd, pipe_w = os.pipe()
+
+    writer = None
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=stdin_fd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+    except BaseException:
+        if pipe_w is not None:
+            os.close(pipe_w)
+        raise
+    finally:
+        if pipe_w is not None:
+            os.close(stdin_fd)  # The child holds its own copy
+
+    if pipe_w is not None:
+        def write():
+            try:
+                pump(pipe_w)
+            except OSError:
+                pass  # Command exited early (BrokenPipe); its stderr tells why
+            finally:
+                os.close(pipe_w)
+
+        writer = threading.Thread(target=write, name="print-stream", daemon=True)
+        writer.start()
+
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        return PrintResult(False, "Yazdırma zaman aşımına uğradı")
+    finally:
+        if writer is not None:
+            writer.join()
+
+    if process.returncode != 0:
+        error = stderr.strip() if stderr else "Bilinmeyen hata"
+        return PrintResult(False, f"{tool} hatası: {error}")
+    match = _LP_JOB_ID.search(stdout or "")
+    return PrintResult(True, job_id=match.group(1) if match else "")
+
+
 def get_default_printer() -> str | None:
     """
     Get the name of the default printer.
     Returns None if no default printer is set.
     """
+    if _backend is not None:
+        return _backend.name
+
     platform = get_platform()
 
     if platform == "windows":
@@ -263,6 +550,28 @@ def get_default_printer() -> str | None:
     return None
 
 
+def list_printers() -> list[str]:
+    """
+    Names of the configured printers.
+    Returns an empty list where printers cannot be enumerated.
+    """
+    if _backend is not None:
+        return [_backend.name]
+    if get_platform() in ("linux", "macos"):
+        try:
+            result = subprocess.run(
+                ["lpstat", "-e"],
+                capture_output=True,
+                text=True,
+                timeout=5
+            )
+            if result.returncode == 0:
+                return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        except Exception:
+            pass
+    return []
+
+
 def check_print_system() -> tuple[bool, str]:
     """
     Check if the print system is properly configured.
@@ -270,6 +579,9 @@ def check_print_system() -> tuple[bool, str]:
     Returns:
         Tuple of (is_ready, message)
     """
+    if _backend is not None:
+        return (True, f"Sanal yazıcı etkin: {_backend.name}")
+
     platform = get_platform()
 
     if platform == "windows":
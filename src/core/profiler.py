@@ -0,0 +1,260 @@
+"""
+Built-in sampling profiler
+
+Enabled with --profile or PDFBP_PROFILE=1. A background thread samples
+the Python stacks of the worker, pipeline and GUI threads at a fixed
+interval. Code marks what it is doing with stage("name"); only threads
+inside a stage are sampled, so an idle event loop costs nothing and
+every sample is tagged with its stage path (e.g. worker;submit).
+
+At the end of each batch two files are written to the profile folder:
+
+    <time>-<n>-<label>.collapsed   One "stage;...;frame;...;frame count"
+                                   line per distinct stack, the input format
+                                   of flamegraph.pl, speedscope and inferno
+    <time>-<n>-<label>.txt         Time per stage and the functions with
+                                   the most self time
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from typing import Callable
+
+from core.config import Settings
+
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser("~"), ".pdf-batch-printer", "profiles")
+
+# Functions listed in the summary
+TOP_FUNCTIONS = 25
+
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    """Context manager that tags the current thread's samples"""
+
+    __slots__ = ("_stages", "_name")
+
+    def __init__(self, stages: dict[int, list[str]], name: str):
+        self._stages = stages
+        self._name = name
+
+    def __enter__(self):
+        ident = threading.get_ident()
+        stack = self._stages.get(ident)
+        if stack is None:
+            stack = self._stages[ident] = []
+        stack.append(self._name)
+        return self
+
+    def __exit__(self, *exc):
+        ident = threading.get_ident()
+        stack = self._stages[ident]
+        stack.pop()
+        if not stack:
+            del self._stages[ident]
+        return False
+
+
+class Profiler:
+    """
+    Statistical profiler for tagged threads.
+
+    Args:
+        output_dir: Folder for the collapsed-stack and summary files
+        interval: Seconds between samples
+    """
+
+    def __init__(self, output_dir: str, interval: float = 0.01):
+        self.output_dir = output_dir
+        self.interval = interval
+        self._stages: dict[int, list[str]] = {}  # Stage stack per thread id
+        self._samples: Counter[tuple[tuple[str, ...], tuple[str, ...]]] = Counter()
+        self._frame_names: dict = {}  # Code object -> frame label
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = time.monotonic()
+        self._sampling_time = 0.0
+        self._rounds = 0
+        self._dumps = 0
+
+    def start(self):
+        """Start the sampling thread"""
+        self._stop.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stage(self, name: str) -> _Stage:
+        """Context manager tagging the current thread's samples with `name`"""
+        return _Stage(self._stages, name)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            started = time.perf_counter()
+            self._sample()
+            elapsed = time.perf_counter() - started
+            # dump() swaps these out under the lock from another thread
+            with self._lock:
+                self._sampling_time += elapsed
+                self._rounds += 1
+
+    def _frame_name(self, code) -> str:
+        name = self._frame_names.get(code)
+        if name is None:
+            if code.co_filename == __file__:
+                name = self._frame_names[code] = ""  # Hide stage() wrappers
+                return name
+            # ";" separates frames and " " the count in the collapsed format
+            filename = os.path.basename(code.co_filename).replace(";", "_").replace(" ", "_")
+            name = f"{code.co_name}({filename}:{code.co_firstlineno})"
+            self._frame_names[code] = name
+        return name
+
+    def _sample(self):
+        """Record the stacks of every thread that is inside a stage"""
+        tagged = [(ident, tuple(stack)) for ident, stack in list(self._stages.items())]
+        if not tagged:
+            return
+        frames = sys._current_frames()
+        for ident, stages in tagged:
+            frame = frames.get(ident)
+            if frame is None or not stages:
+                continue
+            names = []
+            while frame is not None:
+                name = self._frame_name(frame.f_code)
+                if name:
+                    names.append(name)
+                frame = frame.f_back
+            names.reverse()
+            with self._lock:
+                self._samples[stages, tuple(names)] += 1
+
+    def dump(self, label: str) -> str | None:
+        """
+        Write the samples taken since the last dump and start over.
+
+        Returns:
+            Path of the collapsed-stack file, or None if there were no samples
+        """
+        with self._lock:
+            samples, self._samples = self._samples, Counter()
+            sampling_time, self._sampling_time = self._sampling_time, 0.0
+            rounds, self._rounds = self._rounds, 0
+        now = time.monotonic()
+        elapsed, self._started = now - self._started, now
+        if not samples:
+            return None
+
+        self._dumps += 1
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(
+            self.output_dir,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{self._dumps:03d}-{label}"
+        )
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for (stages, frames), count in sorted(samples.items()):
+                f.write(f"{';'.join(stages + frames)} {count}\n")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(self._summary(label, samples, elapsed, rounds, sampling_time))
+        return base + ".collapsed"
+
+    def _summary(self, label: str, samples: Counter, elapsed: float, rounds: int,
+                 sampling_time: float) -> str:
+        """Human-readable report of one dump"""
+        total = sum(samples.values())
+        # Under load the sampler wakes up later than asked, so time per
+        # sample is measured rather than taken from the interval
+        per_sample = elapsed / rounds if rounds else self.interval
+        by_stage: Counter[str] = Counter()
+        by_function: Counter[str] = Counter()
+        for (stages, frames), count in samples.items():
+            by_stage["/".join(stages)] += count
+            if frames:
+                by_function[frames[-1]] += count
+
+        overhead = 100 * sampling_time / elapsed if elapsed > 0 else 0.0
+        lines = [
+            f"Profil: {label}",
+            f"Süre: {elapsed:.1f} s, örnek: {total}, aralık: {self.interval * 1000:g} ms "
+            f"(gerçekleşen {per_sample * 1000:.1f} ms), örnekleyici yükü: %{overhead:.2f}",
+            "",
+            f"{'Aşama':<40} {'Örnek':>8} {'%':>6} {'~Süre (s)':>10}",
+        ]
+        for stage, count in by_stage.most_common():
+            lines.append(f"{stage:<40} {count:>8} {100 * count / total:>6.1f} "
+                         f"{count * per_sample:>10.2f}")
+        lines += ["", f"{'Fonksiyon (kendi süresi)':<60} {'Örnek':>8} {'%':>6}"]
+        for function, count in by_function.most_common(TOP_FUNCTIONS):
+            lines.append(f"{function:<60} {count:>8} {100 * count / total:>6.1f}")
+        return "\n".join(lines) + "\n"
+
+
+_profiler: Profiler | None = None
+
+
+def start_profiler(settings: Settings) -> Profiler | None:
+    """Start the process-wide profiler if profiling is enabled in settings"""
+    global _profiler
+    if not settings.profile or _profiler is not None:
+        return _profiler
+    _profiler = Profiler(settings.profile_dir or DEFAULT_PROFILE_DIR,
+                         max(settings.profile_interval_ms, 1) / 1000)
+    _profiler.start()
+    return _profiler
+
+
+def stop_profiler():
+    """Stop the process-wide profiler"""
+    global _profiler
+    if _profiler is not None:
+        _profiler.stop()
+        _profiler = None
+
+
+def get_profiler() -> Profiler | None:
+    """The running profiler, or None if profiling is disabled"""
+    return _profiler
+
+
+def stage(name: str):
+    """Tag the current thread's samples with `name` (no-op when profiling is off)"""
+    if _profiler is None:
+        return _NULL_STAGE
+    return _profiler.stage(name)
+
+
+def profiled(name: str) -> Callable:
+    """Decorator running a function inside stage(name)"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def dump_profile(label: str) -> str | None:
+    """Write the samples collected so far (see Profiler.dump); None if disabled"""
+    if _profiler is None:
+        return None
+    try:
+        return _profiler.dump(label)
+    except OSError:
+        return None
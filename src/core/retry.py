@@ -0,0 +1,182 @@
+"""
+Error classification and retry scheduling for print jobs
+Separates transient spooler hiccups from real failures
+"""
+
+import errno
+import heapq
+import random
+import subprocess
+import time
+from dataclasses import dataclass
+from enum import Enum
+
+
+class ErrorKind(Enum):
+    """Classification of a failed print attempt"""
+    TRANSIENT = "transient"          # Worth retrying after a short delay
+    PRINTER_DOWN = "printer_down"    # Printer/queue unavailable, needs attention
+    PERMANENT = "permanent"          # Retrying will not help (bad file, bad args)
+    AMBIGUOUS = "ambiguous"          # Job may already be spooled; repeating could print twice
+
+
+# Substrings matched against lower-cased lp/lpr stderr and our own messages.
+# Order matters: the first matching group wins.
+_PERMANENT_PATTERNS = (
+    "dosya bulunamadı",
+    "no such file",
+    "unable to access",
+    "unsupported document-format",
+    "document-format-not-supported",
+    "permission denied",
+    "bad option",
+    "unknown option",
+    "desteklenmeyen platform",
+)
+
+_PRINTER_DOWN_PATTERNS = (
+    "not accepting jobs",
+    "does not exist",
+    "no default destination",
+    "unknown destination",
+    "printer-stopped",
+    "printer is stopped",
+    "paused",
+    "bulunamadı. cups kurulu mu",
+)
+
+# Submission timed out or the backend died mid-call: lp may have handed
+# the job to the spooler before it stopped answering
+_AMBIGUOUS_PATTERNS = (
+    "zaman aşımına uğradı",
+    "ulaşmış olabilir",
+)
+
+_TRANSIENT_PATTERNS = (
+    "zaman aşımı",
+    "timed out",
+    "timeout",
+    "unable to connect",
+    "connection refused",
+    "connection reset",
+    "server-error-busy",
+    "service-unavailable",
+    "temporarily unavailable",
+    "try again",
+    "too many",
+    "broken pipe",
+)
+
+
+def classify_error(message: str) -> ErrorKind:
+    """
+    Classify a print error message (lp/lpr stderr or PrintResult text).
+
+    Unknown messages are treated as permanent so that a misbehaving
+    backend never causes an endless retry loop.
+    """
+    text = message.lower()
+    for pattern in _PERMANENT_PATTERNS:
+        if pattern in text:
+            return ErrorKind.PERMANENT
+    for pattern in _PRINTER_DOWN_PATTERNS:
+        if pattern in text:
+            return ErrorKind.PRINTER_DOWN
+    for pattern in _AMBIGUOUS_PATTERNS:
+        if pattern in text:
+            return ErrorKind.AMBIGUOUS
+    for pattern in _TRANSIENT_PATTERNS:
+        if pattern in text:
+            return ErrorKind.TRANSIENT
+    return ErrorKind.PERMANENT
+
+
+def classify_exception(exc: BaseException) -> ErrorKind:
+    """Classify an exception raised while submitting a print job"""
+    if isinstance(exc, subprocess.TimeoutExpired):
+        return ErrorKind.AMBIGUOUS
+    if isinstance(exc, (TimeoutError, ConnectionError, InterruptedError)):
+        return ErrorKind.TRANSIENT
+    if isinstance(exc, (FileNotFoundError, IsADirectoryError, PermissionError, ValueError)):
+        return ErrorKind.PERMANENT
+    if isinstance(exc, OSError) and exc.errno is not None:
+        if exc.errno in (errno.EAGAIN, errno.EBUSY, errno.EINTR, errno.ENOMEM, errno.EMFILE):
+            return ErrorKind.TRANSIENT
+    return classify_error(str(exc))
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential back-off settings for transient failures"""
+    max_attempts: int = 4        # Including the first attempt
+    base_delay: float = 2.0      # Seconds before the first retry
+    max_delay: float = 60.0      # Upper bound for a single delay
+    jitter: float = 0.5          # Fraction of the delay that is randomised
+
+    def should_retry(self, kind: ErrorKind, attempt: int) -> bool:
+        """Return True if a failure of the given kind on `attempt` should be retried"""
+        return kind is ErrorKind.TRANSIENT and attempt < self.max_attempts
+
+    def delay(self, attempt: int, rng: random.Random | None = None) -> float:
+        """
+        Delay before retrying after failed attempt number `attempt` (1-based).
+
+        Uses "equal jitter": half of the exponential delay is fixed, the
+        other half is random, so retries of many files spread out while
+        still backing off.
+        """
+        rng = rng or random
+        raw = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        fixed = raw * (1.0 - self.jitter)
+        return fixed + rng.uniform(0.0, raw * self.jitter)
+
+
+class RetryQueue:
+    """
+    Time-ordered queue of files waiting to be retried.
+
+    Kept separate from the main file sequence so that a file waiting for
+    its back-off never holds up the files behind it.
+    """
+
+    def __init__(self, policy: RetryPolicy | None = None, clock=time.monotonic):
+        self.policy = policy or RetryPolicy()
+        self._clock = clock
+        self._heap: list[tuple[float, int, int, int]] = []
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, index: int, attempt: int) -> float:
+        """
+        Schedule `index` for another try after failed attempt `attempt`.
+
+        Returns:
+            The chosen delay in seconds
+        """
+        delay = self.policy.delay(attempt)
+        self._counter += 1
+        heapq.heappush(self._heap, (self._clock() + delay, self._counter, index, attempt + 1))
+        return delay
+
+    def pop_due(self) -> list[tuple[int, int]]:
+        """Remove and return (index, attempt) pairs whose delay has elapsed"""
+        now = self._clock()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, index, attempt = heapq.heappop(self._heap)
+            due.append((index, attempt))
+        return due
+
+    def drain(self) -> list[tuple[int, int]]:
+        """Remove and return every waiting (index, attempt) pair, due or not"""
+        entries = [(index, attempt) for _, _, index, attempt in sorted(self._heap)]
+        self._heap.clear()
+        return entries
+
+    def time_until_next(self) -> float | None:
+        """Seconds until the next retry is due, or None if the queue is empty"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self._clock())
@@ -0,0 +1,321 @@
+"""
+Session snapshots
+
+The batch (folders, file list, metadata, sorted orders and per-file
+print status) is saved as one compact binary file when the application
+closes and memory-mapped when it starts again, so a 100k-file session is
+back without rescanning the folders or rebuilding sort keys. Paths and
+labels are decoded only when accessed.
+
+Restored entries are not trusted blindly: load_session() checks the
+structure (a damaged snapshot whose settings are still readable raises
+SessionDamaged, so the caller can rescan the same folders), and
+revalidate() compares a file with the filesystem and is meant to be run
+lazily, a chunk at a time. SessionSaver writes snapshots on a background
+thread.
+
+Layout (little-endian, columns 8-byte aligned):
+
+    header        magic, version, file count, order count,
+                  meta length, string blob length
+    meta          UTF-8 JSON: roots, sort/filter state, order modes
+    sizes         int64[n]
+    mtimes        float64[n]
+    path offsets  uint64[n + 1]   into the string blob
+    label offsets uint64[n + 1]   into the string blob
+    orders        uint32[n] per saved sort mode
+    status        uint8[n]        per file position
+    strings       UTF-8 paths followed by labels
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from core.file_index import FileIndex, SORT_NATURAL
+
+
+MAGIC = b"PDFBPSN1"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIIIQ")
+
+# Result of revalidate()
+FILE_OK = 0
+FILE_CHANGED = 1   # Size or modification time differ; metadata updated
+FILE_MISSING = 2
+
+# Paths may hold lone surrogates (undecodable names); keep them round-trip safe
+_ERRORS = "surrogatepass"
+
+
+class SessionDamaged(ValueError):
+    """
+    The snapshot is damaged but its list settings could be read.
+
+    Attributes:
+        session: Session holding those settings and an empty index
+    """
+
+    def __init__(self, message: str, session: "Session"):
+        super().__init__(message)
+        self.session = session
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _layout(count: int, order_count: int, meta_len: int) -> dict[str, int]:
+    """Byte offsets of every section"""
+    offsets = {}
+    offset = _align(_HEADER.size + meta_len)
+    for name, size in (("sizes", 8 * count), ("mtimes", 8 * count),
+                       ("path_offsets", 8 * (count + 1)), ("label_offsets", 8 * (count + 1)),
+                       ("orders", 4 * count * order_count), ("status", count)):
+        offsets[name] = offset
+        offset = _align(offset + size)
+    offsets["strings"] = offset
+    return offsets
+
+
+class _Strings(Sequence):
+    """Strings in a memory-mapped blob, decoded on access"""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8", _ERRORS)
+
+
+@dataclass
+class Session:
+    """A restored batch"""
+    index: FileIndex
+    status: memoryview                 # Print status per file position
+    recursive: bool = False
+    sort_mode: str = SORT_NATURAL
+    reverse: bool = False
+    filter_text: str = ""
+    saved: float = 0.0
+
+
+def save_session(path: str, index: FileIndex, status: bytes | bytearray,
+                 recursive: bool = False, sort_mode: str = SORT_NATURAL,
+                 reverse: bool = False, filter_text: str = ""):
+    """
+    Write a snapshot of a batch, replacing `path` atomically.
+
+    Args:
+        path: Snapshot file
+        index: Files of the batch
+        status: Print status per file position (len(index) bytes)
+        recursive, sort_mode, reverse, filter_text: List settings to restore
+    """
+    count = len(index)
+    if len(status) != count:
+        raise ValueError("Durum sayısı dosya sayısıyla eşleşmiyor")
+
+    # Save at least the default order so a restore never has to sort
+    index.order(sort_mode)
+    orders = index.cached_orders()
+    modes = list(orders)
+
+    blob = bytearray()
+    path_offsets = array("Q", [0])
+    for text in index.paths:
+        blob += text.encode("utf-8", _ERRORS)
+        path_offsets.append(len(blob))
+    label_offsets = array("Q", [len(blob)])
+    for text in index.labels:
+        blob += text.encode("utf-8", _ERRORS)
+        label_offsets.append(len(blob))
+
+    meta = json.dumps({
+        "roots": index.roots,
+        "recursive": recursive,
+        "sort_mode": sort_mode,
+        "reverse": reverse,
+        "filter": filter_text,
+        "orders": modes,
+        "saved": time.time(),
+    }, ensure_ascii=False).encode("utf-8")
+    layout = _layout(count, len(modes), len(meta))
+
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            def section(name: str, data):
+                f.write(b"\0" * (layout[name] - f.tell()))
+                f.write(data)
+
+            f.write(_HEADER.pack(MAGIC, VERSION, count, len(modes), len(meta), len(blob)))
+            f.write(meta)
+            section("sizes", array("q", index.sizes).tobytes())
+            section("mtimes", array("d", index.mtimes).tobytes())
+            section("path_offsets", path_offsets.tobytes())
+            section("label_offsets", label_offsets.tobytes())
+            f.write(b"\0" * (layout["orders"] - f.tell()))
+            for mode in modes:
+                f.write(array("I", orders[mode]).tobytes())
+            section("status", bytes(status))
+            section("strings", blob)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SessionSaver:
+    """
+    Writes snapshots on a background thread so the window never waits
+    for the disk.
+
+    Only the newest snapshot matters: a request still waiting when a new
+    one arrives is replaced. The caller must not modify the index or the
+    status buffer it hands over (the GUI replaces its index on a rescan
+    and builds a fresh status buffer for every save).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: tuple | None = None
+        self._thread: threading.Thread | None = None
+
+    def save(self, path: str, index: FileIndex, status: bytes | bytearray, **settings):
+        """Queue a snapshot (arguments as save_session)"""
+        with self._lock:
+            self._pending = (path, index, status, settings)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-save", daemon=True)
+                self._thread.start()
+
+    def wait(self):
+        """Block until every queued snapshot is written"""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._thread = None
+                    return
+                path, index, status, settings = self._pending
+                self._pending = None
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                save_session(path, index, status, **settings)
+            except (OSError, ValueError):
+                pass  # Losing the snapshot only costs a rescan next time
+
+
+def load_session(path: str) -> Session:
+    """
+    Memory-map a snapshot.
+
+    The mapping is copy-on-write: metadata refreshed by revalidate() is
+    changed in memory only, never in the file. On Windows the file is
+    read instead, since a mapped file cannot be replaced by the next save.
+
+    Raises:
+        OSError: If the file cannot be read
+        ValueError: If it is not a valid snapshot
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            raise ValueError("Oturum dosyası bozuk")
+        if os.name == "nt":
+            data = bytearray(f.read())
+        else:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    buf = memoryview(data)
+    magic, version, count, order_count, meta_len, strings_len = _HEADER.unpack_from(buf)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Oturum dosyası tanınmıyor")
+    layout = _layout(count, order_count, meta_len)
+    if layout["strings"] + strings_len > size:
+        raise ValueError("Oturum dosyası bozuk")
+    meta = json.loads(str(buf[_HEADER.size:_HEADER.size + meta_len], "utf-8"))
+    settings = Session(
+        index=FileIndex.from_columns(meta["roots"], [], [], [], [], {}),
+        status=memoryview(b""),
+        recursive=meta.get("recursive", False),
+        sort_mode=meta.get("sort_mode", SORT_NATURAL),
+        reverse=meta.get("reverse", False),
+        filter_text=meta.get("filter", ""),
+        saved=meta.get("saved", 0.0),
+    )
+
+    def column(name: str, fmt: str, length: int) -> memoryview:
+        start = layout[name]
+        return buf[start:start + struct.calcsize(fmt) * length].cast(fmt)
+
+    if len(meta["orders"]) != order_count:
+        raise SessionDamaged("Oturum dosyası bozuk: sıralama sayısı tutmuyor", settings)
+    orders = {}
+    for n, mode in enumerate(meta["orders"]):
+        start = layout["orders"] + 4 * count * n
+        orders[mode] = buf[start:start + 4 * count].cast("I")
+        # Out-of-range positions would surface later as IndexErrors in the view
+        if count and max(orders[mode]) >= count:
+            raise SessionDamaged("Oturum dosyası bozuk: geçersiz sıralama", settings)
+
+    path_offsets = column("path_offsets", "Q", count + 1)
+    label_offsets = column("label_offsets", "Q", count + 1)
+    if path_offsets[count] != label_offsets[0] or label_offsets[count] != strings_len:
+        raise SessionDamaged("Oturum dosyası bozuk: dosya adları eksik", settings)
+
+    blob = buf[layout["strings"]:layout["strings"] + strings_len]
+    settings.index = FileIndex.from_columns(
+        meta["roots"],
+        _Strings(blob, path_offsets),
+        _Strings(blob, label_offsets),
+        column("sizes", "q", count),
+        column("mtimes", "d", count),
+        orders,
+    )
+    settings.status = column("status", "B", count)
+    return settings
+
+
+def revalidate(index: FileIndex, pos: int) -> int:
+    """
+    Compare one restored file with the filesystem.
+
+    Size and modification time of a changed file are updated in the index.
+
+    Returns:
+        FILE_OK, FILE_CHANGED or FILE_MISSING
+    """
+    try:
+        st = os.stat(index.paths[pos])
+    except OSError:
+        return FILE_MISSING
+    if st.st_size == index.sizes[pos] and st.st_mtime == index.mtimes[pos]:
+        return FILE_OK
+    index.sizes[pos] = st.st_size
+    index.mtimes[pos] = st.st_mtime
+    return FILE_CHANGED
@@ -0,0 +1,266 @@
+"""
+Sharded file preparation for very large batches
+
+Checking a file's header is cheap; counting its pages is not: it means
+a pdfinfo run or a regex scan over the whole file, which would otherwise
+run one file at a time inside the print worker (or the accounting
+writer). The batch, already in print order, is split into contiguous
+shards, each validated and page-counted by its own process. Results are
+written straight into a shared memory block laid out as columns, so
+nothing per file is pickled back, and are read while the shards are
+still running: the worker takes sizes and page counts from there.
+
+Shared memory layout (n files, s shards):
+
+    header    int64 cancel flag, int64 done counter per shard
+    sizes     int64[n]
+    pages     int64[n]   (-1 if the count is unknown)
+    status    uint8[n]   (STATUS_*)
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Callable
+
+from core.config import Settings
+from core.pdfinfo import check_pdf, count_pages
+
+
+STATUS_PENDING = 0   # Not prepared (shard process died or was cancelled)
+STATUS_OK = 1
+STATUS_INVALID = 2   # Missing, empty, unreadable or not a PDF
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _layout(count: int, shards: int) -> dict[str, int]:
+    """Byte offsets of every column (and the total size under "end")"""
+    offsets = {"header": 0}
+    offset = 8 * (1 + shards)
+    for name, width in (("sizes", 8), ("pages", 8), ("status", 1)):
+        offsets[name] = offset
+        offset = _align(offset + width * count)
+    offsets["end"] = max(offset, 1)
+    return offsets
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open the block created by the parent, which alone is responsible for unlinking it"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Spawned children share the parent's resource tracker, so the block
+    # is registered once and released by the parent's unlink
+    return shared_memory.SharedMemory(name=name)
+
+
+def _prepare_shard(shm_name: str, layout: dict[str, int], count: int, shard: int,
+                   start: int, paths: list[str]):
+    """Entry point of a shard process: prepare paths[start:start + len(paths)]"""
+    shm = _attach(shm_name)
+    buf = shm.buf
+    try:
+        header = buf[0:layout["sizes"]].cast("q")
+        sizes = buf[layout["sizes"]:layout["sizes"] + 8 * count].cast("q")
+        pages = buf[layout["pages"]:layout["pages"] + 8 * count].cast("q")
+        status = buf[layout["status"]:layout["status"] + count]
+
+        for n, path in enumerate(paths):
+            if header[0]:
+                break  # Cancelled
+            i = start + n
+            try:
+                check_pdf(path)
+                sizes[i] = os.path.getsize(path)
+                page_count = count_pages(path)
+                pages[i] = -1 if page_count is None else page_count
+                status[i] = STATUS_OK
+            except (OSError, ValueError):
+                status[i] = STATUS_INVALID
+            header[1 + shard] = n + 1
+
+        for view in (header, sizes, pages, status):
+            view.release()
+    finally:
+        buf.release()
+        shm.close()
+
+
+class ShardedPreparation:
+    """
+    Sharded preparation that can be read while it runs.
+
+    Every shard reports how far through its slice it got, so a file can
+    be used as soon as its own shard has passed it. Printing starts with
+    the first files of shard 0 instead of waiting for the whole batch;
+    the later shards are normally done before printing reaches them.
+
+    Args:
+        paths: Files in print order; each shard gets a contiguous slice
+        shards: Number of processes
+        poll_interval: Seconds between checks while waiting for a shard
+    """
+
+    def __init__(self, paths: list[str], shards: int, poll_interval: float = 0.1):
+        self.paths = list(paths)
+        self.poll_interval = poll_interval
+        count = len(self.paths)
+        self._shards = max(1, min(shards, count or 1))
+        self._step = max(1, -(-count // self._shards))  # Ceiling division
+        self._layout = _layout(count, self._shards)
+        self._lock = threading.Lock()  # Guards the views below against close()
+        self._closed = False
+        self._processes: dict[int, multiprocessing.Process] = {}
+        self._watcher: threading.Thread | None = None
+        self._shm = shared_memory.SharedMemory(create=True, size=self._layout["end"])
+        layout = self._layout
+        buf = self._shm.buf
+        self._header = buf[0:layout["sizes"]].cast("q")
+        self._sizes = buf[layout["sizes"]:layout["sizes"] + 8 * count].cast("q")
+        self._pages = buf[layout["pages"]:layout["pages"] + 8 * count].cast("q")
+        self._status = buf[layout["status"]:layout["status"] + count]
+        for i in range(len(self._header)):
+            self._header[i] = 0
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def start(self, on_progress: Callable[[int, int], None] | None = None) -> "ShardedPreparation":
+        """
+        Start the shard processes.
+
+        Args:
+            on_progress: Called with (prepared, total) from a background
+                thread while the shards run
+        """
+        ctx = multiprocessing.get_context("spawn")
+        for shard in range(self._shards):
+            begin = shard * self._step
+            chunk = self.paths[begin:begin + self._step]
+            if not chunk:
+                continue
+            process = ctx.Process(
+                target=_prepare_shard,
+                args=(self._shm.name, self._layout, len(self.paths), shard, begin, chunk),
+                name=f"pdfbp-shard-{shard}",
+                daemon=True
+            )
+            process.start()
+            self._processes[shard] = process
+        self._watcher = threading.Thread(target=self._watch, args=(on_progress,),
+                                         name="shard-watch", daemon=True)
+        self._watcher.start()
+        return self
+
+    def _watch(self, on_progress: Callable[[int, int], None] | None):
+        """Report progress until every shard has exited"""
+        while any(p.is_alive() for p in self._processes.values()):
+            if on_progress:
+                on_progress(self.done(), len(self.paths))
+            time.sleep(self.poll_interval)
+        for process in self._processes.values():
+            process.join()
+        if on_progress:
+            on_progress(self.done(), len(self.paths))
+
+    def done(self) -> int:
+        """Number of files the shards have handled so far"""
+        with self._lock:
+            return 0 if self._closed else sum(self._header[1:])
+
+    def cancel(self):
+        """Ask the shard processes to stop after their current file"""
+        with self._lock:
+            if not self._closed:
+                self._header[0] = 1
+
+    def wait(self, pos: int, should_cancel: Callable[[], bool] | None = None) -> bool:
+        """
+        Block until the shard of file `pos` has passed it or stopped.
+
+        Returns:
+            False if cancelled or closed while waiting. True does not mean
+            the file was prepared (its shard may have died); see prepared()
+        """
+        shard, offset = divmod(pos, self._step)
+        while True:
+            with self._lock:
+                if self._closed:
+                    return False
+                if self._header[1 + shard] > offset:
+                    return True
+                process = self._processes.get(shard)
+                if process is None or not process.is_alive():
+                    return True
+            if should_cancel and should_cancel():
+                return False
+            time.sleep(self.poll_interval)
+
+    def prepared(self, pos: int) -> bool:
+        """True if a shard process handled the file"""
+        with self._lock:
+            return not self._closed and self._status[pos] != STATUS_PENDING
+
+    def check(self, pos: int):
+        """
+        Re-raise the validation error of a file, if it had one.
+
+        Only failing files are re-checked here (to get the exact error
+        message); files that passed cost nothing.
+
+        Raises:
+            FileNotFoundError, ValueError, OSError: As core.pdfinfo.check_pdf
+        """
+        with self._lock:
+            ok = not self._closed and self._status[pos] == STATUS_OK
+        if not ok:
+            check_pdf(self.paths[pos])
+
+    def size(self, pos: int) -> int | None:
+        """Size of a file in bytes as seen by its shard, or None if not prepared"""
+        with self._lock:
+            if self._closed or self._status[pos] != STATUS_OK:
+                return None
+            return self._sizes[pos]
+
+    def pages(self, pos: int) -> int | None:
+        """Page count of a file as counted by its shard, or None if unknown"""
+        with self._lock:
+            if self._closed or self._status[pos] != STATUS_OK or self._pages[pos] < 0:
+                return None
+            return self._pages[pos]
+
+    def close(self):
+        """Stop shards that are still running and release the shared memory"""
+        self.cancel()
+        if self._watcher is not None:
+            self._watcher.join()
+        for process in self._processes.values():
+            process.join()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            for view in (self._header, self._sizes, self._pages, self._status):
+                view.release()
+        self._shm.close()
+        self._shm.unlink()
+
+
+def shard_count(settings: Settings, file_count: int) -> int:
+    """
+    Number of shard processes to use for a batch (0 = prepare in-process).
+
+    Small batches are not worth the process start-up cost.
+    """
+    processes = settings.shard_processes
+    if processes < 0:
+        processes = os.cpu_count() or 1
+    if processes < 2 or file_count < settings.shard_min_files:
+        return 0
+    return min(processes, file_count)
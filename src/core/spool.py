@@ -0,0 +1,232 @@
+"""
+Spool-disk aware flow control for CUPS submissions
+
+Every lp call copies the document into the CUPS spool directory. Large
+batches submitted faster than the printer consumes them can fill the
+spool partition, after which CUPS rejects every job. SpoolMonitor tracks
+the bytes of submitted-but-unfinished jobs and the free space on the
+spool partition and throttles submission between a high and a low
+watermark.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from core.config import Settings
+from core.printer import BACKEND_VIRTUAL, backend_active_jobs, get_platform
+
+
+MB = 1024 * 1024
+
+
+def list_active_jobs() -> set[str] | None:
+    """
+    Ids of jobs CUPS has not completed yet.
+
+    Returns:
+        Set of job ids, or None if the job list is unavailable
+    """
+    try:
+        result = subprocess.run(
+            ["lpstat", "-o"],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    # Format: "PRINTER-123   user   1024   Mon 01 Jan 2024 ..."
+    return {line.split()[0] for line in result.stdout.splitlines() if line.strip()}
+
+
+def _free_bytes(path: str) -> int | None:
+    """
+    Free bytes on the filesystem holding `path`.
+
+    The CUPS spool directory itself is usually not searchable by normal
+    users, so parent directories (same partition in practice) are tried.
+    """
+    if not hasattr(os, "statvfs"):
+        return None
+    path = os.path.abspath(path)
+    while True:
+        try:
+            st = os.statvfs(path)
+            return st.f_bavail * st.f_frsize
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+class SpoolMonitor:
+    """
+    Throttles submission by spooled bytes and free spool space.
+
+    lpr (and so every macOS submission) does not report a job id. Such
+    jobs are kept in submission order and matched against the unfinished
+    jobs whose id is not known: CUPS prints a queue in order, so when only
+    k of them remain, the k most recent anonymous submissions are the
+    ones still outstanding. Jobs of other users or programs make this
+    estimate err on the side of throttling.
+
+    The job list is read at most once per `refresh_interval`, so checking
+    for room before each file does not spawn lpstat every time.
+
+    Args:
+        spool_dir: CUPS spool directory
+        high_watermark: Pause when outstanding bytes would exceed this
+        low_watermark: Resume once outstanding bytes are at or below this
+        min_free: Bytes that must stay free on the spool partition
+        job_lister: Returns ids of unfinished jobs (None if unknown)
+        poll_interval: Seconds between checks while throttled
+        refresh_interval: Minimum seconds between two job_lister calls
+    """
+
+    def __init__(self, spool_dir: str, high_watermark: int, low_watermark: int,
+                 min_free: int = 0,
+                 job_lister: Callable[[], set[str] | None] = list_active_jobs,
+                 free_space: Callable[[str], int | None] = _free_bytes,
+                 poll_interval: float = 2.0, refresh_interval: float = 2.0):
+        self.spool_dir = spool_dir
+        self.high_watermark = high_watermark
+        self.low_watermark = min(low_watermark, high_watermark)
+        self.min_free = min_free
+        self.poll_interval = poll_interval
+        self.refresh_interval = refresh_interval
+        self._job_lister = job_lister
+        self._free_space = free_space
+        self._jobs: dict[str, int] = {}
+        self._anonymous: deque[int] = deque()  # Bytes of jobs without an id, oldest first
+        self._listed_at: float | None = None
+        self._lock = threading.Lock()
+        self._throttled = False
+
+    @classmethod
+    def from_settings(cls, settings: Settings,
+                      job_lister: Callable[[], set[str] | None] | None = None) -> "SpoolMonitor | None":
+        """
+        Monitor for the current platform, or None if flow control does not apply.
+
+        Args:
+            settings: Watermarks and spool folder
+            job_lister: Lists the unfinished jobs of the print backend;
+                with the virtual printer this is its device queue (pass
+                BackendHost.active_jobs when it runs in the host process)
+        """
+        if settings.spool_high_mb <= 0:
+            return None
+        if settings.backend == BACKEND_VIRTUAL:
+            if settings.virtual_speed == 0:
+                # The virtual clock only moves while a job is submitted, so
+                # the queue would never drain while submission is paused
+                return None
+            # The simulated device queue stands in for CUPS; there is no spool disk
+            return cls(
+                settings.spool_dir,
+                settings.spool_high_mb * MB,
+                settings.spool_low_mb * MB,
+                job_lister=job_lister or backend_active_jobs,
+                free_space=lambda path: None,
+            )
+        if get_platform() not in ("linux", "macos") or not shutil.which("lpstat"):
+            return None
+        return cls(
+            settings.spool_dir,
+            settings.spool_high_mb * MB,
+            settings.spool_low_mb * MB,
+            settings.spool_min_free_mb * MB,
+        )
+
+    @property
+    def throttled(self) -> bool:
+        """True while submission is paused"""
+        return self._throttled
+
+    def register(self, job_id: str, nbytes: int):
+        """Record a successfully submitted job (`job_id` may be empty, see class doc)"""
+        with self._lock:
+            if job_id:
+                self._jobs[job_id] = self._jobs.get(job_id, 0) + nbytes
+            else:
+                self._anonymous.append(nbytes)
+
+    def outstanding_bytes(self, refresh: bool = True) -> int:
+        """
+        Bytes of submitted jobs that CUPS has not finished yet.
+
+        Args:
+            refresh: Update from the job list if it is older than
+                refresh_interval
+        """
+        now = time.monotonic()
+        if (refresh and (self._jobs or self._anonymous)
+                and (self._listed_at is None or now - self._listed_at >= self.refresh_interval)):
+            self._listed_at = now
+            active = self._job_lister()
+            if active is not None:
+                with self._lock:
+                    for job_id in [j for j in self._jobs if j not in active]:
+                        del self._jobs[job_id]
+                    unknown = len(active) - len(self._jobs)
+                    while len(self._anonymous) > unknown:
+                        self._anonymous.popleft()
+        with self._lock:
+            return sum(self._jobs.values()) + sum(self._anonymous)
+
+    def _has_room(self, nbytes: int, threshold: int) -> bool:
+        outstanding = self.outstanding_bytes()
+        # A single file larger than the watermark must still get through
+        # once everything before it has drained
+        if outstanding > 0 and outstanding + nbytes > threshold:
+            return False
+        free = self._free_space(self.spool_dir)
+        if free is not None and free - nbytes < self.min_free and outstanding > 0:
+            return False
+        return True
+
+    def wait_for_capacity(self, nbytes: int,
+                          should_cancel: Callable[[], bool] | None = None,
+                          on_throttle: Callable[[bool], None] | None = None) -> bool:
+        """
+        Block until a file of `nbytes` may be submitted.
+
+        Once throttled, submission resumes only after the outstanding
+        bytes fall to the low watermark, so the spooler drains in large
+        steps instead of flapping around the high watermark.
+
+        Args:
+            nbytes: Size of the file about to be submitted
+            should_cancel: Polled while waiting
+            on_throttle: Called with True when pausing and False when resuming
+
+        Returns:
+            False if cancelled while waiting, True otherwise
+        """
+        if self._has_room(nbytes, self.high_watermark):
+            return True
+
+        self._throttled = True
+        if on_throttle:
+            on_throttle(True)
+        try:
+            while True:
+                deadline = time.monotonic() + self.poll_interval
+                while time.monotonic() < deadline:
+                    if should_cancel and should_cancel():
+                        return False
+                    time.sleep(min(0.2, self.poll_interval))
+                if self._has_room(nbytes, self.low_watermark + nbytes):
+                    return True
+        finally:
+            self._throttled = False
+            if on_throttle:
+                on_throttle(False)
@@ -0,0 +1,257 @@
+"""
+First-page thumbnails for the file list
+
+Thumbnails are rendered in a background process pool (a crashing or slow
+PDF renderer never blocks the GUI), kept in a memory-bounded LRU cache
+and persisted on disk keyed by (path, size, mtime), so reopening a large
+folder shows previews immediately. The disk cache is bounded too: past
+its limit the least recently used thumbnails are deleted.
+
+Rendering uses PyMuPDF when it is installed, otherwise poppler's
+`pdftoppm` command.
+"""
+
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable
+
+
+def _has_pymupdf() -> bool:
+    return importlib.util.find_spec("fitz") is not None
+
+
+def renderer_available() -> bool:
+    """True if thumbnails can be rendered on this system"""
+    return _has_pymupdf() or shutil.which("pdftoppm") is not None
+
+
+def render_first_page(pdf_path: str, size: int) -> bytes:
+    """
+    Render the first page of a PDF as a PNG whose longer side is `size` pixels.
+
+    Runs inside a worker process.
+
+    Returns:
+        PNG bytes, or b"" if the page could not be rendered
+    """
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+
+    if fitz is not None:
+        try:
+            with fitz.open(pdf_path) as doc:
+                if doc.page_count == 0:
+                    return b""
+                page = doc.load_page(0)
+                zoom = size / max(page.rect.width, page.rect.height)
+                return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+        except Exception:
+            return b""
+
+    try:
+        # "-" as output root writes the single page to stdout
+        result = subprocess.run(
+            ["pdftoppm", "-png", "-f", "1", "-l", "1", "-singlefile",
+             "-scale-to", str(size), pdf_path, "-"],
+            capture_output=True,
+            timeout=30
+        )
+    except (OSError, subprocess.SubprocessError):
+        return b""
+    return result.stdout if result.returncode == 0 else b""
+
+
+def cache_key(pdf_path: str, file_size: int, mtime: float, size: int) -> str:
+    """Disk cache key; changes whenever the file is modified"""
+    raw = f"{os.path.abspath(pdf_path)}\0{file_size}\0{mtime:.6f}\0{size}"
+    return hashlib.sha1(raw.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class ThumbnailCache:
+    """
+    Two-level thumbnail cache with background rendering.
+
+    Args:
+        cache_dir: Folder for persisted thumbnails
+        size: Longer side of a thumbnail in pixels
+        max_memory: Upper bound for thumbnail bytes held in memory
+        max_disk: Upper bound for thumbnail bytes kept in `cache_dir`
+        processes: Number of render processes
+    """
+
+    def __init__(self, cache_dir: str, size: int = 96, max_memory: int = 32 * 1024 * 1024,
+                 max_disk: int = 256 * 1024 * 1024, processes: int = 2):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes: int | None = None  # Unknown until the first store
+        self._pending: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # spawn: forking a process that runs Qt and worker threads is unsafe
+        self._pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.png")
+
+    def _remember(self, key: str, data: bytes):
+        """Insert into the memory LRU, evicting the oldest entries over budget"""
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory and len(self._memory) > 1:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def get(self, pdf_path: str, file_size: int, mtime: float) -> bytes | None:
+        """
+        Cached thumbnail from memory or disk, without rendering.
+
+        Returns:
+            PNG bytes, b"" if the file cannot be rendered, or None if unknown
+        """
+        key = cache_key(pdf_path, file_size, mtime, self.size)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # Most recently used: pruned last
+        except OSError:
+            pass
+        self._remember(key, data)
+        return data
+
+    def request(self, pdf_path: str, file_size: int, mtime: float,
+                callback: Callable[[str, bytes], None]):
+        """
+        Make sure a thumbnail is (or will be) available.
+
+        `callback(pdf_path, png_bytes)` is called immediately for cached
+        thumbnails, otherwise from a background thread once rendered.
+        """
+        data = self.get(pdf_path, file_size, mtime)
+        if data is not None:
+            callback(pdf_path, data)
+            return
+
+        key = cache_key(pdf_path, file_size, mtime, self.size)
+        with self._lock:
+            if key in self._pending:
+                return
+            try:
+                future = self._pool.submit(render_first_page, pdf_path, self.size)
+            except RuntimeError:
+                return  # Pool shut down
+            self._pending[key] = future
+
+        def done(f: Future):
+            with self._lock:
+                self._pending.pop(key, None)
+            if f.cancelled():
+                return
+            try:
+                data = f.result()
+            except Exception:
+                data = b""
+            self._remember(key, data)
+            if data:
+                self._store(key, data)
+            callback(pdf_path, data)
+
+        future.add_done_callback(done)
+
+    def _store(self, key: str, data: bytes):
+        """Persist a thumbnail atomically"""
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return  # The memory copy is enough for this session
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            prune = self._disk_bytes is None or self._disk_bytes > self.max_disk
+        if prune:
+            total = self._prune_disk()
+            with self._lock:
+                self._disk_bytes = total
+
+    def _prune_disk(self) -> int:
+        """
+        Delete the least recently used thumbnails while the disk cache is over max_disk.
+
+        Prunes down to 90% of the limit, so it does not run again on the
+        next store. Runs on the render callback thread.
+
+        Returns:
+            Bytes left in the disk cache
+        """
+        entries = []
+        try:
+            for folder in os.scandir(self.cache_dir):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(".png"):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            pass
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_disk:
+            return total
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk * 0.9:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        return total
+
+    def cancel_pending(self):
+        """Drop queued renders that have not started (e.g. rows scrolled away)"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self):
+        """Stop the render processes"""
+        self.cancel_pending()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,223 @@
+"""
+Virtual printer for load testing and simulation
+
+Replaces the system print commands (see core.printer.set_backend) with a
+model of a printer: per-job accept latency, a finite device queue drained
+at a fixed page rate, and injected failure rates. Outcomes are drawn from
+a seeded random generator, so a run with the same seed and the same files
+produces the same sequence of results.
+
+Instead of the model, a recorded timing trace can be replayed: a CSV
+export of the accounting `jobs` table (or JSON lines with the same keys)
+supplies the accept latency (`submit_ms`) and outcome (`outcome`,
+`error`) of each submission, in order, cycling when it runs out.
+
+The device queue and the random generator live in the process that
+prints, which is the backend host when isolation is on. They are not
+persisted: when the host is restarted the queue starts empty and the
+outcome sequence starts over from the seed, as if the printer had been
+power-cycled. Runs that need a reproducible sequence should therefore
+not rely on host restarts (or use PDFBP_BACKEND_ISOLATION=0).
+"""
+
+import csv
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from core.config import Settings
+from core.options import JobOptions
+from core.pdfinfo import count_pages_in, scan_pages
+from core.printer import PrintResult
+
+
+VIRTUAL_PRINTER_NAME = "virtual"
+
+# Errors use the wording of real lp messages so they are classified
+# (transient / printer down) exactly like real ones
+_ERROR_BUSY = "lp: Error - server-error-busy (sanal yazıcı)"
+_ERROR_QUEUE_FULL = "lp: Error - too many jobs, server-error-busy (sanal yazıcı kuyruğu dolu)"
+_ERROR_DOWN = "lp: Error - printer-stopped (sanal yazıcı)"
+
+
+@dataclass
+class TraceEntry:
+    """One recorded submission"""
+    latency: float     # Seconds the print command took
+    error: str = ""    # Error message, empty for a successful submission
+
+
+def load_trace(path: str) -> list[TraceEntry]:
+    """
+    Read a timing trace from a CSV or JSON-lines file.
+
+    Raises:
+        ValueError: If the file has no usable entries
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+
+    entries = []
+    for row in rows:
+        try:
+            latency = float(row.get("submit_ms") or 0) / 1000
+        except (TypeError, ValueError):
+            continue
+        error = ""
+        if str(row.get("outcome") or "done").strip().lower() != "done":
+            error = str(row.get("error") or "").strip() or _ERROR_BUSY
+        entries.append(TraceEntry(latency, error))
+
+    if not entries:
+        raise ValueError(f"Zamanlama kaydında kullanılabilir satır yok: {path}")
+    return entries
+
+
+class VirtualPrinter:
+    """
+    Simulated printer with a deterministic outcome sequence.
+
+    Time is virtual: with `speed` > 0 it runs `speed` times faster than
+    the wall clock (latencies are actually waited, scaled down). With
+    `speed` = 0 nothing is waited at all and the virtual clock only moves
+    by the simulated latencies, which makes runs fully reproducible.
+
+    Args:
+        accept_ms: Mean time the print command takes to accept a job
+        pages_per_minute: Rate at which queued jobs are printed
+        queue_capacity: Jobs the device holds; further jobs are rejected
+        failure_rate: Probability of a transient (busy) error per job
+        down_rate: Probability of a "printer stopped" error per job
+        seed: Seed for latency jitter and injected failures
+        speed: Virtual seconds per wall-clock second (0 = don't wait)
+        trace: Recorded submissions to replay instead of the model's
+            latency and failures
+    """
+
+    name = VIRTUAL_PRINTER_NAME
+
+    def __init__(self, accept_ms: float = 50.0, pages_per_minute: float = 60.0,
+                 queue_capacity: int = 100, failure_rate: float = 0.0,
+                 down_rate: float = 0.0, seed: int = 0, speed: float = 1.0,
+                 trace: list[TraceEntry] | None = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        if pages_per_minute <= 0 or speed < 0:
+            raise ValueError("Sanal yazıcı hızı pozitif olmalı")
+        self.accept_ms = accept_ms
+        self.pages_per_minute = pages_per_minute
+        self.queue_capacity = queue_capacity
+        self.failure_rate = failure_rate
+        self.down_rate = down_rate
+        self.speed = speed
+        self.trace = trace or []
+        self._rng = random.Random(seed)
+        self._clock = clock
+        self._sleep = sleep
+        self._started = clock()
+        self._virtual_time = 0.0
+        self._queue: deque[tuple[str, float]] = deque()  # (job id, finish time)
+        self._submissions = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "VirtualPrinter":
+        """Virtual printer configured by the PDFBP_VIRTUAL_* settings"""
+        return cls(
+            accept_ms=settings.virtual_accept_ms,
+            pages_per_minute=settings.virtual_pages_per_minute,
+            queue_capacity=settings.virtual_queue_capacity,
+            failure_rate=settings.virtual_failure_rate,
+            down_rate=settings.virtual_down_rate,
+            seed=settings.virtual_seed,
+            speed=settings.virtual_speed,
+            trace=load_trace(settings.virtual_trace) if settings.virtual_trace else None,
+        )
+
+    def _now(self) -> float:
+        if self.speed == 0:
+            return self._virtual_time
+        return (self._clock() - self._started) * self.speed
+
+    def _wait(self, seconds: float):
+        if self.speed == 0:
+            self._virtual_time += seconds
+        elif seconds > 0:
+            self._sleep(seconds / self.speed)
+
+    def _drain(self, now: float):
+        """Forget jobs the device has finished printing"""
+        while self._queue and self._queue[0][1] <= now:
+            self._queue.popleft()
+
+    def active_jobs(self) -> set[str]:
+        """Ids of jobs still queued on the device (like `lpstat -o`)"""
+        with self._lock:
+            self._drain(self._now())
+            return {job_id for job_id, _ in self._queue}
+
+    def print_pdfs(self, pdf_paths: list[str], options: JobOptions | None = None) -> PrintResult:
+        """Submit files to the simulated device"""
+        return self._submit(lambda: sum(scan_pages(p) or 1 for p in pdf_paths),
+                            options or JobOptions())
+
+    def print_stream(self, source, options: JobOptions | None = None, title: str = "",
+                     offset: int = 0, length: int | None = None) -> PrintResult:
+        """Submit a streamed document (see core.printer.print_stream)"""
+        def pages():
+            if isinstance(source, int) or hasattr(source, "fileno"):
+                return 1
+            return count_pages_in(memoryview(source).cast("B")) or 1
+        return self._submit(pages, options or JobOptions())
+
+    def _submit(self, pages: Callable[[], int], options: JobOptions) -> PrintResult:
+        """
+        Run one submission through the model.
+
+        `pages` is only called for jobs that enter the device queue, and
+        scans the files in-process: the simulated device must not cost a
+        pdfinfo process per file.
+        """
+        with self._lock:
+            self._submissions += 1
+            # Always draw the same number of values per submission so the
+            # sequence does not depend on which branch was taken
+            jitter = 0.5 + self._rng.random()
+            roll = self._rng.random()
+
+            if self.trace:
+                entry = self.trace[(self._submissions - 1) % len(self.trace)]
+                latency, error = entry.latency, entry.error
+            else:
+                latency = self.accept_ms / 1000 * jitter
+                error = ""
+                if roll < self.down_rate:
+                    error = _ERROR_DOWN
+                elif roll < self.down_rate + self.failure_rate:
+                    error = _ERROR_BUSY
+
+            self._wait(latency)
+            now = self._now()
+            self._drain(now)
+
+            if error:
+                return PrintResult(False, error)
+            if len(self._queue) >= self.queue_capacity:
+                return PrintResult(False, _ERROR_QUEUE_FULL)
+
+            sheets = -(-pages() * options.copies // options.number_up)
+            start = self._queue[-1][1] if self._queue else now
+            finish = max(start, now) + sheets * 60 / self.pages_per_minute
+            job_id = f"{self.name}-{self._submissions}"
+            self._queue.append((job_id, finish))
+            return PrintResult(True, job_id=job_id)
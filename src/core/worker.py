@@ -3,70 +3,393 @@ Background worker thread for batch PDF printing
 """
 
 import os
+import threading
+import time
 from pathlib import Path
+from collections.abc import Sequence
+from typing import Callable
 from PyQt6.QtCore import QThread, pyqtSignal
 
-from core.printer import print_pdf, PrintResult
+from core.accounting import AccountingStore, JobRecord
+from core.config import get_settings
+from core.file_index import FileIndex
+from core.manifest import default_group_files
+from core.options import JobOptions
+from core.printer import print_pdfs, get_default_printer, PrintResult
+from core.pdfinfo import check_pdf
+from core.pipeline import Pipeline, Stage
+from core.profiler import profiled, stage
+from core.sharding import ShardedPreparation
+from core.spool import SpoolMonitor
+from core.retry import ErrorKind, RetryPolicy, RetryQueue, classify_error, classify_exception
 
 
 class PrintWorker(QThread):
     """
     Worker thread that handles batch PDF printing.
     Emits signals to update the UI without blocking.
+
+    Files are validated ahead of the printer in a parallel pipeline that
+    hands them over strictly in batch order. Very large batches are also
+    prepared (validated and page-counted) by several processes at once; printing starts as
+    soon as the first files are prepared. Consecutive valid
+    files are submitted together as one job of up to `group_files` files,
+    so the options are parsed once and the spooler sees one job instead
+    of many; a job rejected as a whole is split into single files so that
+    one bad file cannot fail the others.
+
+    Transient failures are not reported as errors right away: they go to a
+    separate retry queue with jittered exponential back-off and are retried
+    one file per job by their own thread, alongside the remaining files.
+    Retries still waiting when the batch is cancelled are reported as failed.
     """
 
     # Signals
     progress = pyqtSignal(int, int)  # current, total
+    preparing = pyqtSignal(int, int)  # prepared, total (sharded preparation, runs alongside printing)
     file_started = pyqtSignal(int, str)  # index, filename
     file_completed = pyqtSignal(int, str)  # index, filename
     file_error = pyqtSignal(int, str, str)  # index, filename, error message
+    file_retrying = pyqtSignal(int, str, int, float)  # index, filename, next attempt, delay
+    spool_throttled = pyqtSignal(bool)  # True while waiting for the spooler to drain
     finished = pyqtSignal(int, int)  # success_count, error_count
 
-    def __init__(self, pdf_files: list[str], parent=None):
+    def __init__(self, pdf_files: Sequence[str], indices: list[int] | None = None,
+                 options: JobOptions | None = None,
+                 retry_policy: RetryPolicy | None = None,
+                 accounting: AccountingStore | None = None,
+                 spool: SpoolMonitor | None = None,
+                 printer: Callable[[list[str], JobOptions], PrintResult] = print_pdfs,
+                 shards: int = 0, group_files: int | None = None, parent=None):
+        """
+        Args:
+            pdf_files: Full batch, in print order
+            indices: Positions in `pdf_files` to print (default: all).
+                Signals always carry positions in `pdf_files`, so a
+                "retry failed" run updates the same list rows.
+            options: Print options applied to every file of the batch
+            retry_policy: Back-off settings for transient failures
+            accounting: Store that records every file's outcome (optional)
+            spool: Flow control that pauses submission while the
+                spool partition is busy (optional)
+            printer: Function used to print a job of one or more files;
+                defaults to core.printer.print_pdfs (BackendHost.print_pdfs
+                isolates it in a supervised process)
+            shards: Number of processes that prepare the batch ahead of
+                the printer (0 = validate in the pipeline only)
+            group_files: Upper bound for files sharing one job (1 = one
+                job per file; default: default_group_files(), which is
+                1 on Windows)
+        """
         super().__init__(parent)
         self.pdf_files = pdf_files
+        self.indices = list(indices) if indices is not None else list(range(len(pdf_files)))
+        self.options = options or JobOptions()
+        self.retry_queue = RetryQueue(retry_policy)
+        self.pipeline = Pipeline([
+            Stage("validate", self._validate, workers=2, queue_size=32),
+        ])
+        self.accounting = accounting
+        self.spool = spool
+        self.printer = printer
+        self.shards = shards
+        self.group_files = max(1, group_files or default_group_files())
+        self.submit_interval_ms = get_settings().submit_interval_ms
+        self._prepared: ShardedPreparation | None = None
+        self._prepared_pos: dict[int, int] = {}
+        self._batch_id = None
+        self._printer_name = ""
         self._cancelled = False
+        self._success_count = 0
+        self._error_count = 0
+        self._retry_cond = threading.Condition()  # Guards retry_queue, counters
+        self._sequence_done = False
 
     def cancel(self):
         """Request cancellation of the print job"""
         self._cancelled = True
+        self.pipeline.cancel()
+        if self._prepared is not None:
+            self._prepared.cancel()
+        with self._retry_cond:
+            self._retry_cond.notify_all()
 
+    @profiled("worker")
     def run(self):
         """Execute the print job in a background thread"""
-        total = len(self.pdf_files)
-        success_count = 0
-        error_count = 0
+        total = len(self.indices)
 
-        for index, pdf_path in enumerate(self.pdf_files):
-            # Check for cancellation
-            if self._cancelled:
-                break
+        if self.accounting:
+            self._printer_name = self.options.printer or get_default_printer() or ""
+            self._batch_id = self.accounting.begin_batch(self._printer_name, total)
 
-            filename = Path(pdf_path).name
+        if self.shards > 1 and not self._cancelled:
+            with stage("prepare"):
+                self._prepared_pos = {index: pos for pos, index in enumerate(self.indices)}
+                self._prepared = ShardedPreparation(
+                    [self.pdf_files[i] for i in self.indices], self.shards
+                ).start(self.preparing.emit)
 
-            # Notify that we're starting this file
-            self.file_started.emit(index, filename)
-            self.progress.emit(index + 1, total)
+        retry_thread = threading.Thread(target=self._retry_loop, name="print-retry", daemon=True)
+        retry_thread.start()
 
-            # Attempt to print
+        try:
+            results = self.pipeline.run(self.indices)
+            group: list[int] = []
+            handed_over = 0
             try:
-                result = print_pdf(pdf_path)
+                for item in results:
+                    # Check for cancellation
+                    if self._cancelled:
+                        break
 
-                if result.success:
-                    self.file_completed.emit(index, filename)
-                    success_count += 1
-                else:
-                    self.file_error.emit(index, filename, result.error_message)
-                    error_count += 1
+                    if item.error is None:
+                        group.append(item.value)
+                        if len(group) < self.group_files:
+                            continue
+                        handed_over = self._submit_group(group, handed_over, total)
+                        group = []
+                        continue
+
+                    # Keep outcomes in batch order: the files before it go first
+                    if group:
+                        handed_over = self._submit_group(group, handed_over, total)
+                        group = []
+                        if self._cancelled:
+                            break
+                    handed_over += 1
+                    self.progress.emit(handed_over, total)
+                    filename = Path(self.pdf_files[item.input]).name
+                    self.file_started.emit(item.input, filename)
+                    self._handle_failure(item.input, filename, 1, str(item.error),
+                                         classify_exception(item.error))
+
+                if group and not self._cancelled:
+                    self._submit_group(group, handed_over, total)
+            finally:
+                results.close()
 
-            except Exception as e:
-                self.file_error.emit(index, filename, str(e))
-                error_count += 1
+            # Let the retry thread finish the files still backing off
+            with self._retry_cond:
+                self._sequence_done = True
+                self._retry_cond.notify_all()
+            with stage("retry-wait"):
+                retry_thread.join()
 
-            # Small delay to allow print queue to process
-            # and prevent overwhelming the system
-            if not self._cancelled:
-                self.msleep(500)
+            # Files whose retry never ran still need a final outcome
+            with self._retry_cond:
+                pending = self.retry_queue.drain()
+            for index, attempt in pending:
+                self._fail_cancelled(index, attempt - 1)
+        finally:
+            # Retries read sizes and page counts from it until here
+            if self._prepared is not None:
+                self._prepared.close()
+
+        if self.accounting:
+            self.accounting.end_batch(self._batch_id, self._success_count, self._error_count)
 
         # Emit finished signal
-        self.finished.emit(success_count, error_count)
+        self.finished.emit(self._success_count, self._error_count)
+
+    def _validate(self, index: int) -> int:
+        """Pipeline stage: make sure the file is still there and is a PDF"""
+        pos = self._prepared_pos.get(index)
+        if pos is not None:
+            with stage("prepare-wait"):
+                self._prepared.wait(pos, lambda: self._cancelled)
+            if self._prepared.prepared(pos):
+                self._prepared.check(pos)
+                return index
+
+        check_pdf(self.pdf_files[index])
+        return index
+
+    def _submit_group(self, group: list[int], handed_over: int, total: int) -> int:
+        """Print a group of validated files as one job; returns the new progress count"""
+        handed_over += len(group)
+        self.progress.emit(handed_over, total)
+        self._attempt(group, 1)
+
+        # Small delay to allow print queue to process
+        # and prevent overwhelming the system
+        if not self._cancelled and self.submit_interval_ms > 0:
+            with stage("interval"):
+                self.msleep(self.submit_interval_ms)
+        return handed_over
+
+    def _retry_loop(self):
+        """Retry thread: re-attempt files as their back-off delays elapse"""
+        while True:
+            with self._retry_cond:
+                while not self._cancelled:
+                    wait = self.retry_queue.time_until_next()
+                    if wait is None and self._sequence_done:
+                        return
+                    if wait == 0:
+                        break
+                    # Wake up regularly so cancellation stays responsive
+                    self._retry_cond.wait(0.2 if wait is None else min(wait, 0.2))
+                if self._cancelled:
+                    return  # run() reports what is left in the queue
+                due = self.retry_queue.pop_due()
+
+            for n, (index, attempt) in enumerate(due):
+                if self._cancelled:
+                    for index, attempt in due[n:]:
+                        self._fail_cancelled(index, attempt - 1)
+                    return
+                with stage("retry"):
+                    self._attempt([index], attempt)
+
+    def _fail_cancelled(self, index: int, attempts: int):
+        """Report a file that was waiting for a retry when the batch was cancelled"""
+        filename = Path(self.pdf_files[index]).name
+        error = "İptal edildi (yeniden deneme bekliyordu)"
+        self.file_error.emit(index, filename, error)
+        with self._retry_cond:
+            self._error_count += 1
+        self._record(index, attempts, None, "error", error)
+
+    def _attempt(self, indices: list[int], attempt: int):
+        """Try to print files as one job and route the outcome to each of them"""
+        paths = [self.pdf_files[index] for index in indices]
+        filenames = [Path(pdf_path).name for pdf_path in paths]
+
+        # Don't outrun the spooler: wait until the spool partition has room
+        size = 0
+        if self.spool:
+            size = sum(self._size(index) or 0 for index in indices)
+            with stage("spool-wait"):
+                if not self.spool.wait_for_capacity(size, lambda: self._cancelled,
+                                                    self.spool_throttled.emit):
+                    if attempt > 1:
+                        for index in indices:
+                            self._fail_cancelled(index, attempt - 1)
+                    return
+
+        # Notify that we're starting these files
+        for index, filename in zip(indices, filenames):
+            self.file_started.emit(index, filename)
+
+        # Attempt to print
+        started = time.perf_counter()
+        try:
+            with stage("submit"):
+                result = self.printer(paths, self.options)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            if result.success:
+                if self.spool:
+                    self.spool.register(result.job_id, size)
+                with self._retry_cond:
+                    self._success_count += len(indices)
+                for index, filename in zip(indices, filenames):
+                    self.file_completed.emit(index, filename)
+                    # Each file is charged its share of the job's submission time
+                    self._record(index, attempt, elapsed_ms / len(indices), "done")
+                return
+
+            error = result.error_message
+            kind = classify_error(error)
+
+        except Exception as e:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            error = str(e)
+            kind = classify_exception(e)
+
+        # One unprintable file makes lp reject the whole job: find it by
+        # printing the files one by one
+        if kind is ErrorKind.PERMANENT and len(indices) > 1:
+            for index in indices:
+                if self._cancelled:
+                    break
+                self._attempt([index], attempt)
+            return
+
+        for index, filename in zip(indices, filenames):
+            self._handle_failure(index, filename, attempt, error, kind,
+                                 elapsed_ms / len(indices))
+
+    def _handle_failure(self, index: int, filename: str, attempt: int, error: str,
+                        kind: ErrorKind, elapsed_ms: float | None = None):
+        """
+        Schedule a retry for transient failures, report everything else.
+
+        `elapsed_ms` is None for files that failed before submission.
+        """
+        if self.retry_queue.policy.should_retry(kind, attempt) and not self._cancelled:
+            with self._retry_cond:
+                delay = self.retry_queue.schedule(index, attempt)
+                self._retry_cond.notify_all()
+            self.file_retrying.emit(index, filename, attempt + 1, delay)
+            return
+
+        self.file_error.emit(index, filename, error)
+        with self._retry_cond:
+            self._error_count += 1
+        self._record(index, attempt, elapsed_ms, "error", error)
+
+    def _size(self, index: int) -> int | None:
+        """Size of a file, from the sharded preparation when it has it"""
+        pos = self._prepared_pos.get(index)
+        if pos is not None:
+            size = self._prepared.size(pos)
+            if size is not None:
+                return size
+        try:
+            return os.path.getsize(self.pdf_files[index])
+        except OSError:
+            return None
+
+    @profiled("accounting")
+    def _record(self, index: int, attempts: int, elapsed_ms: float | None, outcome: str,
+                error: str = ""):
+        """Send a file's final outcome to the accounting store"""
+        if not self.accounting:
+            return
+        pos = self._prepared_pos.get(index)
+        self.accounting.record_job(JobRecord(
+            batch_id=self._batch_id,
+            seq=index,
+            path=self.pdf_files[index],
+            printer=self._printer_name,
+            # Counted by the shards; otherwise by the store's writer thread
+            pages=self._prepared.pages(pos) if pos is not None else None,
+            bytes=self._size(index),
+            submitted=time.time(),
+            submit_ms=elapsed_ms,
+            attempts=attempts,
+            outcome=outcome,
+            error=error,
+        ))
+
+
+class ScanWorker(QThread):
+    """
+    Worker thread that scans folders into a FileIndex, so opening a
+    100k-file folder never freezes the window. The sorted order for the
+    current sort mode is computed here as well.
+    """
+
+    scanned = pyqtSignal(object)  # FileIndex
+
+    def __init__(self, roots: list[str], recursive: bool, sort_mode: str, parent=None):
+        super().__init__(parent)
+        self.roots = list(roots)
+        self.recursive = recursive
+        self.sort_mode = sort_mode
+        self._cancelled = False
+
+    def cancel(self):
+        """Stop scanning; no result is emitted"""
+        self._cancelled = True
+
+    @profiled("scan")
+    def run(self):
+        index = FileIndex.scan(self.roots, self.recursive, should_cancel=lambda: self._cancelled)
+        if self._cancelled:
+            return
+        index.order(self.sort_mode)
+        if not self._cancelled:
+            self.scanned.emit(index)
@@ -0,0 +1,138 @@
+"""
+List model for the PDF file list
+Keeps only labels and a status byte per row so very large batches
+stay responsive in a QListView
+"""
+
+from collections import OrderedDict
+from collections.abc import Sequence
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt6.QtGui import QBrush, QColor, QIcon
+
+
+# Per-row print status
+STATUS_PENDING = 0
+STATUS_PRINTING = 1
+STATUS_DONE = 2
+STATUS_RETRYING = 3
+STATUS_ERROR = 4
+
+_MARKERS = {
+    STATUS_DONE: "✅",
+    STATUS_RETRYING: "🔁",
+    STATUS_ERROR: "❌",
+}
+
+_BACKGROUNDS = {
+    STATUS_PRINTING: QColor("#0f3460"),
+    STATUS_DONE: QColor("#1a4a3a"),
+    STATUS_RETRYING: QColor("#4a3a1a"),
+    STATUS_ERROR: QColor("#4a1a1a"),
+}
+
+# Thumbnail icons kept per model; rows scrolled out of view are evicted first
+MAX_THUMBNAIL_ICONS = 512
+
+
+class FileListModel(QAbstractListModel):
+    """Rows of the current batch, in print order"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._labels: Sequence[str] = []
+        self._status = bytearray()
+        self._tooltips: dict[int, str] = {}
+        self._thumbnails: OrderedDict[int, QIcon] = OrderedDict()
+
+    def set_files(self, labels: Sequence[str]):
+        """Replace all rows; every row starts as pending"""
+        self.beginResetModel()
+        self._labels = labels
+        self._status = bytearray(len(labels))
+        self._tooltips = {}
+        self._thumbnails.clear()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._labels)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            marker = _MARKERS.get(self._status[row])
+            if marker:
+                return f"  {marker}  │  {self._labels[row]}"
+            return f"  {row + 1:03d}  │  {self._labels[row]}"
+        if role == Qt.ItemDataRole.BackgroundRole:
+            color = _BACKGROUNDS.get(self._status[row])
+            return QBrush(color) if color else None
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self._tooltips.get(row)
+        if role == Qt.ItemDataRole.DecorationRole:
+            icon = self._thumbnails.get(row)
+            if icon is not None:
+                self._thumbnails.move_to_end(row)
+            return icon
+        return None
+
+    def status(self, row: int) -> int:
+        """Current status of a row"""
+        return self._status[row]
+
+    def set_status(self, row: int, status: int, tooltip: str | None = None):
+        """Update the status (and optionally the tooltip) of a single row"""
+        if not 0 <= row < len(self._labels):
+            return
+        self._status[row] = status
+        if tooltip:
+            self._tooltips[row] = tooltip
+        else:
+            self._tooltips.pop(row, None)
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx)
+
+    def statuses(self) -> bytes:
+        """Status of every row"""
+        return bytes(self._status)
+
+    def set_statuses(self, statuses: bytes | bytearray):
+        """Replace the status of every row at once (e.g. a restored session)"""
+        self._status = bytearray(statuses)
+        self._tooltips = {}
+        if self._labels:
+            self.dataChanged.emit(self.index(0), self.index(len(self._labels) - 1))
+
+    def reset_status(self, rows: list[int]):
+        """Put the given rows back to pending"""
+        for row in rows:
+            if 0 <= row < len(self._labels):
+                self._status[row] = STATUS_PENDING
+                self._tooltips.pop(row, None)
+        if self._labels:
+            self.dataChanged.emit(self.index(0), self.index(len(self._labels) - 1))
+
+    def has_thumbnail(self, row: int) -> bool:
+        """True if a thumbnail is loaded for the row"""
+        return row in self._thumbnails
+
+    def set_thumbnail(self, row: int, icon: QIcon):
+        """Show a first-page thumbnail for a row"""
+        if not 0 <= row < len(self._labels):
+            return
+        self._thumbnails[row] = icon
+        self._thumbnails.move_to_end(row)
+        while len(self._thumbnails) > MAX_THUMBNAIL_ICONS:
+            self._thumbnails.popitem(last=False)
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.ItemDataRole.DecorationRole])
+
+    def clear_thumbnails(self):
+        """Drop all thumbnails (e.g. when previews are switched off)"""
+        self._thumbnails.clear()
+        if self._labels:
+            self.dataChanged.emit(self.index(0), self.index(len(self._labels) - 1),
+                                  [Qt.ItemDataRole.DecorationRole])
@@ -8,13 +8,30 @@ from pathlib import Path
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QProgressBar, QFileDialog,
-    QListWidget, QListWidgetItem, QMessageBox, QGroupBox,
+    QListView, QMessageBox, QGroupBox, QLineEdit, QComboBox, QCheckBox,
+    QSpinBox, QGridLayout,
     QStatusBar, QFrame, QSplitter, QToolBar, QSizePolicy
 )
-from PyQt6.QtCore import Qt, pyqtSlot, QSize
-from PyQt6.QtGui import QFont, QIcon, QColor, QPalette, QLinearGradient, QBrush
-
-from core.worker import PrintWorker
+from PyQt6.QtCore import Qt, pyqtSignal, pyqtSlot, QObject, QPoint, QSize, QStandardPaths, QTimer
+from PyQt6.QtGui import QFont, QIcon, QPalette, QLinearGradient, QBrush, QPixmap
+
+from core.worker import PrintWorker, ScanWorker
+from core.accounting import AccountingStore
+from core.backend_host import BackendHost
+from core.config import get_settings
+from core.options import JobOptions, DUPLEX_OFF, DUPLEX_LONG, DUPLEX_SHORT, NUMBER_UP_VALUES
+from core.printer import BACKEND_VIRTUAL, list_printers, print_pdfs
+from core.profiler import dump_profile, profiled, stop_profiler
+from core.spool import SpoolMonitor
+from core.retry import ErrorKind, classify_error
+from core.sharding import shard_count
+from core.file_index import FileIndex, OrderedView, SORT_NATURAL, SORT_NAME, SORT_MTIME, SORT_SIZE
+from core.session import (FILE_CHANGED, FILE_MISSING, SessionDamaged, SessionSaver,
+                          load_session, revalidate)
+from core.thumbnails import ThumbnailCache, renderer_available
+from gui.file_model import (
+    FileListModel, STATUS_PENDING, STATUS_PRINTING, STATUS_DONE, STATUS_RETRYING, STATUS_ERROR
+)
 
 
 # Professional dark theme stylesheet
@@ -126,7 +143,7 @@ QPushButton#danger:disabled {
     border-color: #2a2a4a;
 }
 
-QListWidget {
+QListView {
     background-color: #16213e;
     border: 2px solid #0f3460;
     border-radius: 8px;
@@ -134,7 +151,7 @@ QListWidget {
     outline: none;
 }
 
-QListWidget::item {
+QListView::item {
     background-color: #1a1a2e;
     border-radius: 6px;
     padding: 10px 12px;
@@ -142,16 +159,31 @@ QListWidget::item {
     border: 1px solid transparent;
 }
 
-QListWidget::item:hover {
+QListView::item:hover {
     background-color: #0f3460;
     border-color: #00d4ff;
 }
 
-QListWidget::item:selected {
+QListView::item:selected {
     background-color: #0f3460;
     border-color: #00d4ff;
 }
 
+QLineEdit, QComboBox, QSpinBox {
+    background-color: #16213e;
+    border: 2px solid #0f3460;
+    border-radius: 6px;
+    padding: 6px 10px;
+}
+
+QLineEdit:focus, QComboBox:focus, QSpinBox:focus {
+    border-color: #00d4ff;
+}
+
+QCheckBox {
+    background-color: transparent;
+}
+
 QProgressBar {
     background-color: #16213e;
     border: 2px solid #0f3460;
@@ -207,9 +239,29 @@ QMessageBox QLabel {
 QMessageBox QPushButton {
     min-width: 80px;
 }
+
+QMenuBar {
+    background-color: #16213e;
+    border-bottom: 1px solid #0f3460;
+}
+
+QMenuBar::item:selected, QMenu::item:selected {
+    background-color: #0f3460;
+    color: #00d4ff;
+}
+
+QMenu {
+    background-color: #16213e;
+    border: 1px solid #0f3460;
+}
 """
 
 
+class ThumbnailBridge(QObject):
+    """Delivers thumbnails rendered in the background to the GUI thread"""
+    ready = pyqtSignal(int, int, bytes)  # generation, row, PNG bytes
+
+
 class MainWindow(QMainWindow):
     """Main application window with professional UI"""
 
@@ -220,21 +272,43 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.worker = None
+        self.scan_worker = None
         self.pdf_files = []
-        self.selected_folder = None
+        self.failed_indices = set()
+        self.selected_folders = []
+        self.file_index = FileIndex()
+        self.row_positions = []  # File index position of each list row
+        self.accounting = self.open_accounting()
+        self.backend_host = BackendHost.from_settings(get_settings())
+        self.thumbnail_cache = self.open_thumbnail_cache()
+        self.thumbnail_bridge = ThumbnailBridge(self)
+        self.thumbnail_generation = 0  # Bumped whenever the rows change
+        self.validation_row = 0  # Next list row to check against the filesystem
+        self.session_saver = SessionSaver()
+        self.profile_batches = 0
 
         self.setup_ui()
         self.setup_connections()
+        self.restore_session()
 
     def setup_ui(self):
         """Initialize the professional user interface"""
         self.setWindowTitle(f"{self.APP_NAME} v{self.APP_VERSION}")
+        if get_settings().backend == BACKEND_VIRTUAL:
+            self.setWindowTitle(f"{self.APP_NAME} v{self.APP_VERSION} [Simülasyon - sanal yazıcı]")
         self.setMinimumSize(750, 600)
         self.resize(850, 700)
 
         # Apply dark theme
         self.setStyleSheet(DARK_STYLE)
 
+        # Reports menu
+        reports_menu = self.menuBar().addMenu("Raporlar")
+        self.export_jobs_action = reports_menu.addAction("Yazdırma Geçmişi (CSV)...")
+        self.export_daily_action = reports_menu.addAction("Yazıcı Bazında Günlük Özet (CSV)...")
+        self.export_parquet_action = reports_menu.addAction("Yazdırma Geçmişi (Parquet)...")
+        reports_menu.setEnabled(self.accounting is not None)
+
         # Central widget
         central = QWidget()
         self.setCentralWidget(central)
@@ -282,23 +356,78 @@ class MainWindow(QMainWindow):
         self.folder_label.setWordWrap(True)
         folder_layout.addWidget(self.folder_label, 1)
 
+        folder_btn_layout = QVBoxLayout()
+        folder_btn_layout.setSpacing(8)
+
         self.select_btn = QPushButton("  Klasör Seç")
         self.select_btn.setMinimumWidth(140)
         self.select_btn.setCursor(Qt.CursorShape.PointingHandCursor)
-        folder_layout.addWidget(self.select_btn)
+        folder_btn_layout.addWidget(self.select_btn)
+
+        self.add_folder_btn = QPushButton("  Klasör Ekle")
+        self.add_folder_btn.setMinimumWidth(140)
+        self.add_folder_btn.setEnabled(False)
+        self.add_folder_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        folder_btn_layout.addWidget(self.add_folder_btn)
+
+        self.recursive_check = QCheckBox("Alt klasörler dahil")
+        folder_btn_layout.addWidget(self.recursive_check)
+
+        folder_layout.addLayout(folder_btn_layout)
 
         layout.addWidget(folder_group)
 
         # PDF list group
-        list_group = QGroupBox("  PDF Dosyaları (Alfabetik Sıra)")
+        list_group = QGroupBox("  PDF Dosyaları (Yazdırma Sırası)")
         list_layout = QVBoxLayout(list_group)
         list_layout.setContentsMargins(15, 20, 15, 15)
         list_layout.setSpacing(10)
 
-        self.file_list = QListWidget()
+        # Sort and filter controls
+        order_layout = QHBoxLayout()
+        order_layout.setSpacing(10)
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("🔍 Dosya adına göre filtrele...")
+        self.filter_edit.setClearButtonEnabled(True)
+        order_layout.addWidget(self.filter_edit, 1)
+
+        self.sort_combo = QComboBox()
+        self.sort_combo.addItem("Doğal Sıra (1, 2, 10)", SORT_NATURAL)
+        self.sort_combo.addItem("Alfabetik (A-Z)", SORT_NAME)
+        self.sort_combo.addItem("Değiştirilme Tarihi", SORT_MTIME)
+        self.sort_combo.addItem("Dosya Boyutu", SORT_SIZE)
+        order_layout.addWidget(self.sort_combo)
+
+        self.reverse_check = QCheckBox("Ters")
+        order_layout.addWidget(self.reverse_check)
+
+        self.thumbnail_check = QCheckBox("Önizleme")
+        self.thumbnail_check.setEnabled(self.thumbnail_cache is not None)
+        self.thumbnail_check.setToolTip(
+            "İlk sayfa önizlemelerini göster" if self.thumbnail_cache is not None
+            else "Önizleme için PyMuPDF veya poppler (pdftoppm) gerekli"
+        )
+        order_layout.addWidget(self.thumbnail_check)
+
+        list_layout.addLayout(order_layout)
+
+        self.file_model = FileListModel(self)
+        self.file_list = QListView()
+        self.file_list.setModel(self.file_model)
+        self.file_list.setUniformItemSizes(True)
         self.file_list.setMinimumHeight(200)
         list_layout.addWidget(self.file_list)
 
+        # Thumbnails are requested once scrolling settles
+        self.thumbnail_timer = QTimer(self)
+        self.thumbnail_timer.setSingleShot(True)
+        self.thumbnail_timer.setInterval(100)
+
+        # Restored files are re-checked in small chunks between events
+        self.validation_timer = QTimer(self)
+        self.validation_timer.setInterval(0)
+
         # File count with icon
         count_layout = QHBoxLayout()
         count_layout.addStretch()
@@ -309,6 +438,61 @@ class MainWindow(QMainWindow):
 
         layout.addWidget(list_group, 1)
 
+        # Print options group
+        options_group = QGroupBox("  Yazdırma Seçenekleri")
+        options_layout = QGridLayout(options_group)
+        options_layout.setContentsMargins(15, 20, 15, 15)
+        options_layout.setHorizontalSpacing(12)
+        options_layout.setVerticalSpacing(8)
+
+        self.printer_combo = QComboBox()
+        self.printer_combo.addItem("Varsayılan yazıcı", None)
+        for printer in list_printers():
+            self.printer_combo.addItem(printer, printer)
+        options_layout.addWidget(QLabel("Yazıcı:"), 0, 0)
+        options_layout.addWidget(self.printer_combo, 0, 1)
+
+        self.copies_spin = QSpinBox()
+        self.copies_spin.setRange(1, 999)
+        options_layout.addWidget(QLabel("Kopya:"), 0, 2)
+        options_layout.addWidget(self.copies_spin, 0, 3)
+
+        self.collate_check = QCheckBox("Harmanla")
+        self.collate_check.setToolTip("Her kopya sayfa sırasıyla basılır (1,2,3 1,2,3)")
+        options_layout.addWidget(self.collate_check, 0, 4)
+
+        self.duplex_combo = QComboBox()
+        self.duplex_combo.addItem("Yazıcı varsayılanı", None)
+        self.duplex_combo.addItem("Tek yüz", DUPLEX_OFF)
+        self.duplex_combo.addItem("Çift yüz (uzun kenar)", DUPLEX_LONG)
+        self.duplex_combo.addItem("Çift yüz (kısa kenar)", DUPLEX_SHORT)
+        options_layout.addWidget(QLabel("Baskı:"), 1, 0)
+        options_layout.addWidget(self.duplex_combo, 1, 1)
+
+        self.nup_combo = QComboBox()
+        for value in NUMBER_UP_VALUES:
+            self.nup_combo.addItem(f"{value} sayfa/yaprak", value)
+        options_layout.addWidget(QLabel("Düzen:"), 1, 2)
+        options_layout.addWidget(self.nup_combo, 1, 3, 1, 2)
+
+        self.pages_edit = QLineEdit()
+        self.pages_edit.setPlaceholderText("Tümü (örn. 1-3,5)")
+        options_layout.addWidget(QLabel("Sayfalar:"), 2, 0)
+        options_layout.addWidget(self.pages_edit, 2, 1)
+
+        self.media_combo = QComboBox()
+        self.media_combo.setEditable(True)
+        self.media_combo.addItem("Varsayılan", None)
+        for media in ("A4", "A3", "A5", "Letter", "Legal"):
+            self.media_combo.addItem(media, media)
+        options_layout.addWidget(QLabel("Kağıt:"), 2, 2)
+        options_layout.addWidget(self.media_combo, 2, 3, 1, 2)
+
+        options_layout.setColumnStretch(1, 1)
+        options_layout.setColumnStretch(3, 1)
+
+        layout.addWidget(options_group)
+
         # Progress group
         progress_group = QGroupBox("  Yazdırma Durumu")
         progress_layout = QVBoxLayout(progress_group)
@@ -362,6 +546,13 @@ class MainWindow(QMainWindow):
         self.print_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         btn_layout.addWidget(self.print_btn)
 
+        self.retry_btn = QPushButton("  Hatalıları Yeniden Dene")
+        self.retry_btn.setEnabled(False)
+        self.retry_btn.setMinimumHeight(50)
+        self.retry_btn.setMinimumWidth(180)
+        self.retry_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_layout.addWidget(self.retry_btn)
+
         self.cancel_btn = QPushButton("  İptal Et")
         self.cancel_btn.setObjectName("danger")
         self.cancel_btn.setEnabled(False)
@@ -380,8 +571,161 @@ class MainWindow(QMainWindow):
     def setup_connections(self):
         """Connect signals to slots"""
         self.select_btn.clicked.connect(self.select_folder)
+        self.add_folder_btn.clicked.connect(self.add_folder)
+        self.recursive_check.toggled.connect(self.load_pdf_files)
+        self.filter_edit.textChanged.connect(self.apply_order)
+        self.sort_combo.currentIndexChanged.connect(self.apply_order)
+        self.reverse_check.toggled.connect(self.apply_order)
+        self.thumbnail_check.toggled.connect(self.toggle_thumbnails)
+        self.thumbnail_timer.timeout.connect(self.request_visible_thumbnails)
+        self.file_list.verticalScrollBar().valueChanged.connect(self.thumbnail_timer.start)
+        self.file_list.verticalScrollBar().rangeChanged.connect(self.thumbnail_timer.start)
+        self.thumbnail_bridge.ready.connect(self.on_thumbnail_ready)
+        self.validation_timer.timeout.connect(self.validate_restored_files)
         self.print_btn.clicked.connect(self.start_printing)
+        self.retry_btn.clicked.connect(self.retry_failed)
         self.cancel_btn.clicked.connect(self.cancel_printing)
+        self.export_jobs_action.triggered.connect(lambda: self.export_report("jobs", "csv"))
+        self.export_daily_action.triggered.connect(lambda: self.export_report("printer_daily", "csv"))
+        self.export_parquet_action.triggered.connect(lambda: self.export_report("jobs", "parquet"))
+
+    def open_accounting(self) -> AccountingStore | None:
+        """Open the print accounting database in the user's data folder"""
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        try:
+            os.makedirs(data_dir, exist_ok=True)
+            return AccountingStore(os.path.join(data_dir, "accounting.db"))
+        except Exception:
+            # Printing must keep working without accounting
+            return None
+
+    def open_thumbnail_cache(self) -> ThumbnailCache | None:
+        """Thumbnail cache in the user's cache folder, or None if no renderer is installed"""
+        if not renderer_available():
+            return None
+        cache_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+        try:
+            return ThumbnailCache(os.path.join(cache_dir, "thumbnails"))
+        except Exception:
+            return None
+
+    def session_path(self) -> str:
+        """Snapshot file of the last batch in the user's data folder"""
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        return os.path.join(data_dir, "session.pdfbps")
+
+    @profiled("gui")
+    def restore_session(self):
+        """Bring back the batch of the previous run without rescanning the folders"""
+        if not get_settings().session_restore:
+            return
+        try:
+            session = load_session(self.session_path())
+        except SessionDamaged as e:
+            # The file list cannot be trusted, but the folders are known
+            self.restore_list_settings(e.session)
+            self.selected_folders = list(e.session.index.roots)
+            if self.selected_folders:
+                self.update_folder_label()
+                self.load_pdf_files()
+            return
+        except (OSError, ValueError, KeyError):
+            return  # No snapshot yet, or unreadable: start empty
+
+        self.restore_list_settings(session)
+        self.selected_folders = list(session.index.roots)
+        if self.selected_folders:
+            self.update_folder_label()
+        self.file_index = session.index
+        self.apply_order()
+
+        statuses = bytearray(session.status[pos] for pos in self.row_positions)
+        self.file_model.set_statuses(statuses)
+        self.failed_indices = {row for row, status in enumerate(statuses) if status == STATUS_ERROR}
+        self.retry_btn.setEnabled(bool(self.failed_indices))
+        self.status_bar.showMessage(f"  ♻️ Önceki oturum geri yüklendi: {len(self.pdf_files)} PDF dosyası")
+
+        self.validation_row = 0
+        self.validation_timer.start()
+
+    def restore_list_settings(self, session):
+        """Restore the list settings of a snapshot without triggering a rescan"""
+        widgets = (self.recursive_check, self.sort_combo, self.reverse_check, self.filter_edit)
+        for widget in widgets:
+            widget.blockSignals(True)
+        self.recursive_check.setChecked(session.recursive)
+        sort_row = self.sort_combo.findData(session.sort_mode)
+        if sort_row >= 0:
+            self.sort_combo.setCurrentIndex(sort_row)
+        self.reverse_check.setChecked(session.reverse)
+        self.filter_edit.setText(session.filter_text)
+        for widget in widgets:
+            widget.blockSignals(False)
+
+    @pyqtSlot()
+    @profiled("gui")
+    def validate_restored_files(self):
+        """Compare the next chunk of restored files with the filesystem"""
+        end = min(self.validation_row + 500, len(self.row_positions))
+        for row in range(self.validation_row, end):
+            result = revalidate(self.file_index, self.row_positions[row])
+            if result == FILE_MISSING:
+                self.failed_indices.discard(row)
+                self.file_model.set_status(row, STATUS_ERROR, "Hata: Dosya bulunamadı")
+            elif result == FILE_CHANGED and self.file_model.status(row) != STATUS_PENDING:
+                # Modified since it was printed: print it again
+                self.failed_indices.discard(row)
+                self.file_model.set_status(row, STATUS_PENDING)
+        self.validation_row = end
+
+        if end >= len(self.row_positions):
+            self.validation_timer.stop()
+            self.retry_btn.setEnabled(bool(self.failed_indices))
+
+    def save_current_session(self):
+        """Snapshot the batch so the next start can restore it (written in the background)"""
+        if not get_settings().session_restore or not self.selected_folders:
+            return
+        # Status is stored per file, not per row; files being printed
+        # when the application closed count as not printed
+        status = bytearray(len(self.file_index))
+        for row, value in enumerate(self.file_model.statuses()):
+            if value not in (STATUS_PRINTING, STATUS_RETRYING):
+                status[self.row_positions[row]] = value
+        self.session_saver.save(
+            self.session_path(), self.file_index, status,
+            recursive=self.recursive_check.isChecked(),
+            sort_mode=self.sort_combo.currentData(),
+            reverse=self.reverse_check.isChecked(),
+            filter_text=self.filter_edit.text()
+        )
+
+    def export_report(self, table: str, fmt: str):
+        """Export accounting data to a file chosen by the user"""
+        if self.accounting is None:
+            return
+
+        file_filter = "CSV (*.csv)" if fmt == "csv" else "Parquet (*.parquet)"
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Raporu Kaydet",
+            str(Path.home() / f"{table}.{fmt}"),
+            file_filter
+        )
+        if not path:
+            return
+
+        try:
+            self.accounting.flush()
+            if fmt == "csv":
+                self.accounting.export_csv(path, table)
+            else:
+                self.accounting.export_parquet(path, table)
+        except Exception as e:
+            QMessageBox.warning(self, "Dışa Aktarma Hatası", f"⚠️ Rapor kaydedilemedi.\n\n{e}")
+            return
+
+        self.status_bar.showMessage(f"  📊 Rapor kaydedildi: {path}")
 
     def update_status_icon(self, status: str):
         """Update status icon based on state"""
@@ -394,46 +738,101 @@ class MainWindow(QMainWindow):
         }
         self.status_icon.setText(icons.get(status, "⏳"))
 
-    @pyqtSlot()
-    def select_folder(self):
+    def ask_folder(self) -> str:
         """Open folder selection dialog"""
-        folder = QFileDialog.getExistingDirectory(
+        start = self.selected_folders[-1] if self.selected_folders else str(Path.home())
+        return QFileDialog.getExistingDirectory(
             self,
             "PDF Klasörü Seç",
-            str(Path.home()),
+            start,
             QFileDialog.Option.ShowDirsOnly
         )
 
+    @pyqtSlot()
+    def select_folder(self):
+        """Replace the batch with the PDFs of a single folder"""
+        folder = self.ask_folder()
         if folder:
-            self.selected_folder = folder
-            self.folder_label.setText(folder)
-            self.folder_label.setStyleSheet("color: #00ffcc; font-size: 13px;")
+            self.selected_folders = [folder]
+            self.update_folder_label()
             self.load_pdf_files()
 
-    def load_pdf_files(self):
-        """Load and list PDF files from selected folder"""
-        self.file_list.clear()
-        self.pdf_files = []
+    @pyqtSlot()
+    def add_folder(self):
+        """Add another folder to the current batch"""
+        folder = self.ask_folder()
+        if folder and folder not in self.selected_folders:
+            self.selected_folders.append(folder)
+            self.update_folder_label()
+            self.load_pdf_files()
 
-        if not self.selected_folder:
-            return
+    def update_folder_label(self):
+        """Show the selected folders"""
+        self.folder_label.setText("\n".join(self.selected_folders))
+        self.folder_label.setStyleSheet("color: #00ffcc; font-size: 13px;")
+        self.add_folder_btn.setEnabled(bool(self.selected_folders))
 
-        # Find all PDF files
-        folder_path = Path(self.selected_folder)
-        pdf_files = list(folder_path.glob("*.pdf")) + list(folder_path.glob("*.PDF"))
+    @pyqtSlot()
+    @profiled("gui")
+    def load_pdf_files(self):
+        """Scan the selected folders in the background and rebuild the file index"""
+        if not self.selected_folders or self.scan_worker is not None:
+            return
 
-        # Sort alphabetically (case-insensitive)
-        pdf_files.sort(key=lambda x: x.name.lower())
+        # The batch definition stays locked until the new index arrives
+        self.set_batch_controls_enabled(False)
+        self.print_btn.setEnabled(False)
+        self.retry_btn.setEnabled(False)
+        self.status_bar.showMessage("  🔍 Klasörler taranıyor...")
+
+        self.scan_worker = ScanWorker(
+            self.selected_folders,
+            self.recursive_check.isChecked(),
+            self.sort_combo.currentData(),
+            self
+        )
+        self.scan_worker.scanned.connect(self.on_scanned)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_worker.start()
+
+    @pyqtSlot(object)
+    @profiled("gui")
+    def on_scanned(self, index: FileIndex):
+        """Show the files found by a background scan"""
+        self.validation_timer.stop()  # Freshly scanned, nothing to re-check
+        self.file_index = index
+        self.apply_order()
 
-        self.pdf_files = [str(f) for f in pdf_files]
+    @pyqtSlot()
+    def on_scan_finished(self):
+        """Unlock the batch definition once the scan thread has ended"""
+        self.scan_worker.deleteLater()
+        self.scan_worker = None
+        self.set_batch_controls_enabled(True)
 
-        # Update list widget
-        for i, pdf_file in enumerate(pdf_files, 1):
-            item = QListWidgetItem(f"  {i:03d}  │  {pdf_file.name}")
-            self.file_list.addItem(item)
+    @pyqtSlot()
+    @profiled("gui")
+    def apply_order(self):
+        """Sort and filter the indexed files into the print order"""
+        self.failed_indices.clear()
+        self.retry_btn.setEnabled(False)
+
+        index = self.file_index
+        order = index.order(self.sort_combo.currentData(), self.reverse_check.isChecked())
+        order = index.filter(order, self.filter_edit.text())
+
+        self.row_positions = order
+        self.validation_row = 0
+        self.pdf_files = OrderedView(index.paths, order)
+        self.thumbnail_generation += 1
+        self.file_model.set_files(OrderedView(index.labels, order))
+        self.thumbnail_timer.start()
 
         count = len(self.pdf_files)
-        self.file_count_label.setText(f"📄 {count} PDF dosyası bulundu")
+        if count == len(index):
+            self.file_count_label.setText(f"📄 {count} PDF dosyası bulundu")
+        else:
+            self.file_count_label.setText(f"📄 {count} / {len(index)} PDF dosyası gösteriliyor")
 
         # Enable/disable print button
         self.print_btn.setEnabled(count > 0)
@@ -445,17 +844,80 @@ class MainWindow(QMainWindow):
             self.status_bar.showMessage(f"  ✅ {count} PDF dosyası yazdırılmaya hazır")
             self.file_count_label.setStyleSheet("color: #00ffcc; font-size: 12px;")
 
+    @pyqtSlot(bool)
+    def toggle_thumbnails(self, enabled: bool):
+        """Show or hide first-page previews in the file list"""
+        if enabled:
+            self.file_list.setIconSize(QSize(40, 56))
+            self.thumbnail_timer.start()
+        else:
+            self.thumbnail_timer.stop()
+            if self.thumbnail_cache is not None:
+                self.thumbnail_cache.cancel_pending()
+            self.file_list.setIconSize(QSize())
+            self.file_model.clear_thumbnails()
+
     @pyqtSlot()
+    @profiled("gui")
+    def request_visible_thumbnails(self):
+        """Render thumbnails for the rows currently on screen only"""
+        if self.thumbnail_cache is None or not self.thumbnail_check.isChecked():
+            return
+        count = self.file_model.rowCount()
+        if count == 0:
+            return
+
+        viewport = self.file_list.viewport()
+        first = self.file_list.indexAt(QPoint(0, 0)).row()
+        last = self.file_list.indexAt(QPoint(0, viewport.height() - 1)).row()
+        first = max(first, 0)
+        last = count - 1 if last < 0 else last
+
+        # Renders queued for rows that scrolled away are no longer needed
+        self.thumbnail_cache.cancel_pending()
+
+        index = self.file_index
+        generation = self.thumbnail_generation
+        for row in range(first, last + 1):
+            if self.file_model.has_thumbnail(row):
+                continue
+            i = self.row_positions[row]
+            self.thumbnail_cache.request(
+                index.paths[i], index.sizes[i], index.mtimes[i],
+                lambda path, data, row=row: self.thumbnail_bridge.ready.emit(generation, row, data)
+            )
+
+    @pyqtSlot(int, int, bytes)
+    @profiled("gui")
+    def on_thumbnail_ready(self, generation: int, row: int, data: bytes):
+        """Show a rendered thumbnail if its row still belongs to the current list"""
+        if generation != self.thumbnail_generation or not data:
+            return
+        if not self.thumbnail_check.isChecked():
+            return
+        pixmap = QPixmap()
+        if pixmap.loadFromData(data, "PNG"):
+            self.file_model.set_thumbnail(row, QIcon(pixmap))
+
+    @pyqtSlot()
+    @profiled("gui")
     def start_printing(self):
         """Start the batch printing process"""
         if not self.pdf_files:
             return
 
+        try:
+            options = self.print_options()
+        except ValueError as e:
+            QMessageBox.warning(self, "Geçersiz Seçenek", f"⚠️ {e}")
+            return
+
         # Confirm before starting
         reply = QMessageBox.question(
             self,
             "Yazdırmayı Onayla",
-            f"📄 {len(self.pdf_files)} PDF dosyası yazdırılacak.\n\n"
+            f"📄 {len(self.pdf_files)} PDF dosyası yazdırılacak.\n"
+            f"🖨️ {options.describe()}\n\n"
             "Devam etmek istiyor musunuz?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
             QMessageBox.StandardButton.Yes
@@ -464,30 +926,96 @@ class MainWindow(QMainWindow):
         if reply != QMessageBox.StandardButton.Yes:
             return
 
+        self.failed_indices.clear()
+        self.run_worker(list(range(len(self.pdf_files))), options)
+        self.status_bar.showMessage("  🖨️ Yazdırma işlemi başlatıldı...")
+
+    @pyqtSlot()
+    @profiled("gui")
+    def retry_failed(self):
+        """Re-print only the files that failed in the previous run"""
+        if not self.failed_indices:
+            return
+
+        try:
+            options = self.print_options()
+        except ValueError as e:
+            QMessageBox.warning(self, "Geçersiz Seçenek", f"⚠️ {e}")
+            return
+
+        indices = sorted(self.failed_indices)
+        self.failed_indices.clear()
+        self.run_worker(indices, options)
+        self.status_bar.showMessage(f"  🔁 {len(indices)} hatalı dosya yeniden deneniyor...")
+
+    def print_options(self) -> JobOptions:
+        """
+        Collect the print options from the form.
+
+        Raises:
+            ValueError: If a value is invalid
+        """
+        media = self.media_combo.currentText().strip()
+        if media == self.media_combo.itemText(0):
+            media = ""
+        return JobOptions.from_mapping({
+            "printer": self.printer_combo.currentData(),
+            "copies": self.copies_spin.value(),
+            "collate": "true" if self.collate_check.isChecked() else "false",
+            "duplex": self.duplex_combo.currentData(),
+            "nup": self.nup_combo.currentData(),
+            "pages": self.pages_edit.text(),
+            "media": media,
+        })
+
+    def set_batch_controls_enabled(self, enabled: bool):
+        """Lock the batch definition while a print job is running"""
+        self.select_btn.setEnabled(enabled)
+        self.add_folder_btn.setEnabled(enabled and bool(self.selected_folders))
+        self.recursive_check.setEnabled(enabled)
+        self.filter_edit.setEnabled(enabled)
+        self.sort_combo.setEnabled(enabled)
+        self.reverse_check.setEnabled(enabled)
+        for widget in (self.printer_combo, self.copies_spin, self.collate_check,
+                       self.duplex_combo, self.nup_combo, self.pages_edit, self.media_combo):
+            widget.setEnabled(enabled)
+
+    def run_worker(self, indices: list[int], options: JobOptions):
+        """Start a worker thread for the given positions of the file list"""
         # Update UI state
-        self.select_btn.setEnabled(False)
+        self.set_batch_controls_enabled(False)
         self.print_btn.setEnabled(False)
+        self.retry_btn.setEnabled(False)
         self.cancel_btn.setEnabled(True)
         self.progress_bar.setValue(0)
-        self.progress_bar.setMaximum(len(self.pdf_files))
+        self.progress_bar.setMaximum(len(indices))
         self.update_status_icon("printing")
 
         # Reset list item styles
-        for i in range(self.file_list.count()):
-            item = self.file_list.item(i)
-            item.setBackground(QColor("transparent"))
+        self.validation_timer.stop()
+        self.file_model.reset_status(indices)
 
         # Create and start worker thread
-        self.worker = PrintWorker(self.pdf_files)
+        self.worker = PrintWorker(
+            self.pdf_files, indices,
+            options=options,
+            accounting=self.accounting,
+            spool=SpoolMonitor.from_settings(
+                get_settings(), self.backend_host.active_jobs if self.backend_host else None
+            ),
+            printer=self.backend_host.print_pdfs if self.backend_host else print_pdfs,
+            shards=shard_count(get_settings(), len(indices))
+        )
         self.worker.progress.connect(self.on_progress)
+        self.worker.preparing.connect(self.on_preparing)
         self.worker.file_started.connect(self.on_file_started)
         self.worker.file_completed.connect(self.on_file_completed)
         self.worker.file_error.connect(self.on_file_error)
+        self.worker.file_retrying.connect(self.on_file_retrying)
+        self.worker.spool_throttled.connect(self.on_spool_throttled)
         self.worker.finished.connect(self.on_finished)
         self.worker.start()
 
-        self.status_bar.showMessage("  🖨️ Yazdırma işlemi başlatıldı...")
-
     @pyqtSlot()
     def cancel_printing(self):
         """Cancel the ongoing print operation"""
@@ -508,57 +1036,89 @@ class MainWindow(QMainWindow):
                 self.status_bar.showMessage("  🚫 Yazdırma iptal ediliyor...")
 
     @pyqtSlot(int, int)
+    @profiled("gui")
     def on_progress(self, current: int, total: int):
         """Update progress bar"""
         self.progress_bar.setValue(current)
         self.status_label.setText(f"{current} / {total} yazdırılıyor")
 
+    @pyqtSlot(int, int)
+    @profiled("gui")
+    def on_preparing(self, prepared: int, total: int):
+        """Show progress of the parallel preparation, which runs alongside printing"""
+        if prepared < total:
+            self.status_bar.showMessage(f"  Dosyalar hazırlanıyor: {prepared} / {total}")
+        else:
+            self.status_bar.showMessage(f"  {total} dosya hazırlandı", 3000)
+
     @pyqtSlot(int, str)
+    @profiled("gui")
     def on_file_started(self, index: int, filename: str):
         """Highlight current file being printed"""
         self.current_file_label.setText(f"🖨️ Yazdırılıyor: {filename}")
 
         # Highlight item in list
-        if index < self.file_list.count():
-            item = self.file_list.item(index)
-            item.setBackground(QColor("#0f3460"))
-            self.file_list.scrollToItem(item)
+        self.file_model.set_status(index, STATUS_PRINTING)
+        self.file_list.scrollTo(self.file_model.index(index))
 
     @pyqtSlot(int, str)
+    @profiled("gui")
     def on_file_completed(self, index: int, filename: str):
         """Mark file as completed"""
-        if index < self.file_list.count():
-            item = self.file_list.item(index)
-            item.setBackground(QColor("#1a4a3a"))
-            original_text = item.text()
-            # Extract filename and add checkmark
-            parts = original_text.split("│")
-            if len(parts) == 2:
-                item.setText(f"  ✅  │{parts[1]}")
+        self.file_model.set_status(index, STATUS_DONE)
+
+    @pyqtSlot(bool)
+    @profiled("gui")
+    def on_spool_throttled(self, throttled: bool):
+        """Show when submission waits for the print spooler to drain"""
+        if throttled:
+            self.current_file_label.setText("⏸️ Yazıcı kuyruğu dolu, boşalması bekleniyor...")
+            self.status_bar.showMessage("  ⏸️ Yazdırma kuyruğu dolu, gönderim duraklatıldı")
+        else:
+            self.current_file_label.setText("")
+            self.status_bar.showMessage("  🖨️ Yazdırma devam ediyor...")
+
+    @pyqtSlot(int, str, int, float)
+    @profiled("gui")
+    def on_file_retrying(self, index: int, filename: str, attempt: int, delay: float):
+        """Mark file as waiting for an automatic retry"""
+        self.file_model.set_status(
+            index, STATUS_RETRYING, f"Geçici hata, {attempt}. deneme {delay:.0f} sn sonra"
+        )
+
+        self.status_bar.showMessage(f"  🔁 {filename} {delay:.0f} sn sonra yeniden denenecek")
 
     @pyqtSlot(int, str, str)
+    @profiled("gui")
     def on_file_error(self, index: int, filename: str, error: str):
         """Mark file as failed"""
-        if index < self.file_list.count():
-            item = self.file_list.item(index)
-            item.setBackground(QColor("#4a1a1a"))
-            original_text = item.text()
-            parts = original_text.split("│")
-            if len(parts) == 2:
-                item.setText(f"  ❌  │{parts[1]}")
-            item.setToolTip(f"Hata: {error}")
+        self.failed_indices.add(index)
+        kind = classify_error(error)
+        if kind is ErrorKind.PRINTER_DOWN:
+            error = f"Yazıcı kullanılamıyor - {error}"
+        elif kind is ErrorKind.AMBIGUOUS and "ulaşmış olabilir" not in error:
+            error = f"{error} - iş yazıcıya ulaşmış olabilir, tekrar yazdırmadan önce kuyruğu kontrol edin"
+
+        self.file_model.set_status(index, STATUS_ERROR, f"Hata: {error}")
 
         self.status_bar.showMessage(f"  ⚠️ Hata: {filename} - {error}")
 
     @pyqtSlot(int, int)
+    @profiled("gui")
     def on_finished(self, success_count: int, error_count: int):
         """Handle print job completion"""
         # Reset UI state
-        self.select_btn.setEnabled(True)
-        self.print_btn.setEnabled(True)
+        self.set_batch_controls_enabled(True)
+        self.print_btn.setEnabled(bool(self.pdf_files))
+        self.retry_btn.setEnabled(bool(self.failed_indices))
         self.cancel_btn.setEnabled(False)
 
         self.current_file_label.setText("")
+        self.save_current_session()
+        self.profile_batches += 1
+        profile_path = dump_profile(f"batch{self.profile_batches}")
+        if self.validation_row < len(self.row_positions):
+            self.validation_timer.start()
 
         if error_count == 0:
             self.status_label.setText(f"Tamamlandı! ({success_count} dosya)")
@@ -585,9 +1145,13 @@ class MainWindow(QMainWindow):
                 f"⚠️ Yazdırma tamamlandı.\n\n"
                 f"✅ Başarılı: {success_count}\n"
                 f"❌ Hatalı: {error_count}\n\n"
-                f"Hatalı dosyalar için listeye bakın."
+                f"Hatalı dosyalar için listeye bakın veya\n"
+                f"\"Hatalıları Yeniden Dene\" ile tekrar yazdırın."
             )
 
+        if profile_path:
+            self.status_bar.showMessage(f"  📊 Profil kaydedildi: {profile_path}")
+
         self.worker = None
 
     def closeEvent(self, event):
@@ -602,11 +1166,32 @@ class MainWindow(QMainWindow):
                 QMessageBox.StandardButton.No
             )
 
-            if reply == QMessageBox.StandardButton.Yes:
-                self.worker.cancel()
-                self.worker.wait()
-                event.accept()
-            else:
+            if reply != QMessageBox.StandardButton.Yes:
                 event.ignore()
-        else:
-            event.accept()
+                return
+
+            self.worker.cancel()
+            self.worker.wait()
+
+        self.shutdown()
+        event.accept()
+
+    def shutdown(self):
+        """Release background resources before the window closes"""
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+            self.scan_worker.wait()
+        self.validation_timer.stop()
+        self.save_current_session()
+        self.session_saver.wait()  # The process must not exit mid-write
+        dump_profile("session")
+        stop_profiler()
+        if self.thumbnail_cache is not None:
+            self.thumbnail_cache.shutdown()
+            self.thumbnail_cache = None
+        if self.accounting is not None:
+            self.accounting.close()
+            self.accounting = None
+        if self.backend_host is not None:
+            self.backend_host.stop()
+            self.backend_host = None
@@ -4,13 +4,264 @@ PDF Batch Printer - Cross-platform PDF batch printing application
 Main entry point
 """
 
+import argparse
+import multiprocessing
+import os
 import sys
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt
-from gui.main_window import MainWindow
 
 
-def main():
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """Parse command line arguments"""
+    from core.printer import BACKENDS
+
+    parser = argparse.ArgumentParser(
+        prog="pdf-batch-printer",
+        description="Toplu PDF yazdırma uygulaması. Argümansız çalıştırıldığında arayüzü açar."
+    )
+    parser.add_argument(
+        "--manifest", metavar="DOSYA",
+        help="CSV/JSONL manifest dosyasındaki PDF'leri arayüz olmadan yazdır"
+    )
+    parser.add_argument(
+        "--stdin", action="store_true",
+        help="Standart girdiden gelen PDF'i (ör. başka bir programın ürettiği belge) "
+             "geçici dosya yazmadan yazdır"
+    )
+    parser.add_argument(
+        "--agents", nargs="+", metavar="URL",
+        help="Manifesti yerelde yazdırmak yerine bu uzak yazdırma ajanlarına dağıt"
+    )
+
+    agent = parser.add_argument_group("ajan modu (uzak şubeler için)")
+    agent.add_argument("--agent", action="store_true", help="Yazdırma ajanı olarak çalış")
+    agent.add_argument("--agent-host", default="127.0.0.1", help="Dinlenecek adres (varsayılan: 127.0.0.1)")
+    agent.add_argument("--agent-port", type=int, default=None, help="Dinlenecek port (varsayılan: 8631)")
+    agent.add_argument("--agent-spool", default=None, help="Kalıcı kuyruk klasörü")
+    agent.add_argument(
+        "--agent-token", default=os.environ.get("PDFBP_AGENT_TOKEN"),
+        help="Ajan ve denetleyici arasındaki ortak anahtar (ya da PDFBP_AGENT_TOKEN)"
+    )
+
+    spool = parser.add_argument_group("kuyruk akış kontrolü (CUPS)")
+    spool.add_argument("--spool-high-mb", type=int, help="Gönderimi duraklatma eşiği (MB, 0 = kapalı)")
+    spool.add_argument("--spool-low-mb", type=int, help="Gönderime devam etme eşiği (MB)")
+
+    backend = parser.add_argument_group("yazdırma arka ucu")
+    backend.add_argument(
+        "--backend", choices=BACKENDS,
+        help="system: sistem yazdırma komutları, virtual: yük testi için sanal yazıcı"
+    )
+    backend.add_argument(
+        "--virtual-trace", metavar="DOSYA",
+        help="Sanal yazıcıda yeniden oynatılacak zamanlama kaydı (muhasebe CSV dışa aktarımı)"
+    )
+
+    profile = parser.add_argument_group("performans profili")
+    profile.add_argument(
+        "--profile", action="store_true",
+        help="Örnekleyici profil modunu aç; her toplu işin sonunda flame graph dosyası yazılır"
+    )
+    profile.add_argument("--profile-dir", metavar="KLASÖR", help="Profil dosyalarının klasörü")
+
+    options = parser.add_argument_group("yazdırma seçenekleri (manifestte boş olan sütunlar için)")
+    options.add_argument("--printer", help="Yazıcı adı")
+    options.add_argument("--copies", help="Kopya sayısı (sunucu tarafında çoğaltılır)")
+    options.add_argument("--collate", help="Kopyaları harmanla: evet/hayır")
+    options.add_argument("--duplex", help="Çift yön: off, long, short")
+    options.add_argument("--nup", help="Yaprak başına sayfa: 1, 2, 4, 6, 9, 16")
+    options.add_argument("--pages", help="Sayfa aralığı, örn. 1-3,5")
+    options.add_argument("--media", help="Kağıt boyutu, örn. A4")
+    options.add_argument("--tray", help="Kağıt tepsisi")
+
+    # Qt passes its own options (-style, -platform ...) through argv
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def load_settings(args: argparse.Namespace):
+    """Load settings from the environment and apply command line overrides"""
+    from core.config import Settings, set_settings
+    from core.printer import configure_backend
+
+    settings = Settings.from_env()
+    if args.spool_high_mb is not None:
+        settings.spool_high_mb = args.spool_high_mb
+    if args.spool_low_mb is not None:
+        settings.spool_low_mb = args.spool_low_mb
+    if args.backend is not None:
+        settings.backend = args.backend
+    if args.virtual_trace is not None:
+        settings.backend = "virtual"
+        settings.virtual_trace = args.virtual_trace
+    if args.profile:
+        settings.profile = True
+    if args.profile_dir is not None:
+        settings.profile = True
+        settings.profile_dir = args.profile_dir
+    set_settings(settings)
+    configure_backend(settings)
+    return settings
+
+
+def run_manifest_cli(args: argparse.Namespace) -> int:
+    """Print a manifest without the GUI, reporting one line per file"""
+    from core.backend_host import BackendHost
+    from core.config import get_settings
+    from core.manifest import run_manifest
+    from core.options import JobOptions
+    from core.printer import print_pdfs
+    from core.profiler import dump_profile, stage
+    from core.spool import SpoolMonitor
+
+    def throttled(paused):
+        if paused:
+            print("Yazdırma kuyruğu dolu, gönderim duraklatıldı...")
+
+    try:
+        defaults = JobOptions.from_mapping(vars(args))
+    except ValueError as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 2
+
+    def report(entry, result):
+        if result.success:
+            print(f"[{entry.line:>6}] OK    {entry.path}")
+        else:
+            print(f"[{entry.line:>6}] HATA  {entry.path or '-'}: {result.error_message}")
+
+    host = BackendHost.from_settings(get_settings())
+    try:
+        with stage("manifest"):
+            success_count, error_count = run_manifest(
+                args.manifest, defaults, on_result=report,
+                spool=SpoolMonitor.from_settings(get_settings(), host.active_jobs if host else None),
+                on_throttle=throttled,
+                printer=host.print_pdfs if host else print_pdfs
+            )
+    except (OSError, ValueError) as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("İptal edildi", file=sys.stderr)
+        return 130
+    finally:
+        if host:
+            host.stop()
+        profile_path = dump_profile("manifest")
+        if profile_path:
+            print(f"Profil kaydedildi: {profile_path}")
+
+    print(f"Tamamlandı: {success_count} başarılı, {error_count} hatalı")
+    return 0 if error_count == 0 else 1
+
+
+def run_stdin_cli(args: argparse.Namespace) -> int:
+    """Print the document piped into standard input as one job"""
+    from core.options import JobOptions
+    from core.printer import print_stream
+
+    try:
+        options = JobOptions.from_mapping(vars(args))
+    except ValueError as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 2
+    if sys.stdin is None or sys.stdin.isatty():
+        print("Hata: standart girdiden bir PDF bekleniyor", file=sys.stderr)
+        return 2
+
+    # The descriptor goes to lp as is; nothing is read here or written to disk
+    result = print_stream(sys.stdin.buffer, options, title="pdf-batch-printer (stdin)")
+    if not result.success:
+        print(f"Hata: {result.error_message}", file=sys.stderr)
+        return 1
+    print(f"Gönderildi: {result.job_id}" if result.job_id else "Gönderildi")
+    return 0
+
+
+def run_agent_cli(args: argparse.Namespace) -> int:
+    """Serve as a print agent until interrupted"""
+    from core.agent import PrintAgent, DEFAULT_PORT
+
+    spool_dir = args.agent_spool or os.path.join(os.path.expanduser("~"), ".pdf-batch-printer", "agent")
+    port = args.agent_port if args.agent_port is not None else DEFAULT_PORT
+    try:
+        agent = PrintAgent(spool_dir, args.agent_host, port, token=args.agent_token)
+    except OSError as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 2
+
+    print(f"Yazdırma ajanı çalışıyor: {agent.url} (kuyruk: {spool_dir})")
+    agent.serve_forever()
+    return 0
+
+
+def dispatch_manifest_cli(args: argparse.Namespace) -> int:
+    """Send the groups of a manifest to remote agents and wait for them"""
+    from core.agent import AgentClient, AgentError, Controller, STATUS_DONE
+    from core.manifest import group_entries, iter_manifest
+    from core.options import JobOptions
+
+    try:
+        defaults = JobOptions.from_mapping(vars(args))
+        controller = Controller([AgentClient(url, args.agent_token) for url in args.agents])
+        handles = []
+        error_count = 0
+        for group in group_entries(iter_manifest(args.manifest, defaults)):
+            if group.entries[0].error:
+                print(f"[{group.entries[0].line:>6}] HATA  {group.entries[0].error}")
+                error_count += 1
+                continue
+            try:
+                uploads = controller.uploads([e.path for e in group.entries])
+            except OSError as e:
+                for entry in group.entries:
+                    print(f"[{entry.line:>6}] HATA  {entry.path}: {e}")
+                error_count += len(group.entries)
+                continue
+            # An upload that is not accepted fails its own files; the
+            # uploads already queued on agents are still waited for
+            agent = None
+            start = 0
+            for upload in uploads:
+                entries = group.entries[start:start + len(upload)]
+                start += len(upload)
+                try:
+                    agent, batch_id = controller.submit(upload, group.options, prefer=agent)
+                except AgentError as e:
+                    for entry in entries:
+                        print(f"[{entry.line:>6}] HATA  {entry.path}: {e}")
+                    error_count += len(entries)
+                    continue
+                handles.append((agent, batch_id))
+                print(f"{len(entries)} dosya gönderildi: {agent.url} ({batch_id})")
+
+        statuses = controller.wait(handles)
+    except (OSError, ValueError, AgentError) as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        print("İptal edildi", file=sys.stderr)
+        return 130
+
+    success_count = 0
+    for (agent, _), files in zip(handles, statuses):
+        for f in files:
+            if f["status"] == STATUS_DONE:
+                success_count += 1
+            else:
+                error_count += 1
+                print(f"HATA  {agent.url} {f['name']}: {f['error']}")
+
+    print(f"Tamamlandı: {success_count} başarılı, {error_count} hatalı")
+    return 0 if error_count == 0 else 1
+
+
+def run_gui() -> int:
+    """Start the desktop application"""
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import Qt
+    from gui.main_window import MainWindow
+
     # High DPI scaling for modern displays
     QApplication.setHighDpiScaleFactorRoundingPolicy(
         Qt.HighDpiScaleFactorRoundingPolicy.PassThrough
@@ -27,8 +278,37 @@ def main():
     window = MainWindow()
     window.show()
 
-    sys.exit(app.exec())
+    return app.exec()
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+
+    try:
+        settings = load_settings(args)
+    except ValueError as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        sys.exit(2)
+
+    from core.profiler import start_profiler
+    start_profiler(settings)
+
+    if args.agent:
+        sys.exit(run_agent_cli(args))
+
+    if args.stdin:
+        sys.exit(run_stdin_cli(args))
+
+    if args.manifest and args.agents:
+        sys.exit(dispatch_manifest_cli(args))
+
+    if args.manifest:
+        sys.exit(run_manifest_cli(args))
+
+    sys.exit(run_gui())
 
 
 if __name__ == "__main__":
+    # Background render processes re-run this module in frozen builds
+    multiprocessing.freeze_support()
     main()
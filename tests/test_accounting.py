@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from core import pdfinfo
+from core.accounting import AccountingStore, JobRecord
+
+
+_PDF = (b"%PDF-1.4\n1 0 obj << /Type /Pages /Kids [2 0 R 3 0 R] /Count 2 >> endobj\n"
+        b"2 0 obj << /Type /Page /Parent 1 0 R >> endobj\n"
+        b"3 0 obj << /Type /Page /Parent 1 0 R >> endobj\n%%EOF\n")
+
+
+def _record(path: str, submit_ms: float | None, outcome: str = "done", pages=None) -> JobRecord:
+    return JobRecord(batch_id="b", seq=0, path=path, printer="p", pages=pages, bytes=1,
+                     submitted=time.time(), submit_ms=submit_ms, attempts=1, outcome=outcome)
+
+
+class AccountingStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, "accounting.db")
+        self.pdf = os.path.join(self.tmp.name, "a.pdf")
+        with open(self.pdf, "wb") as f:
+            f.write(_PDF)
+
+    def _store(self) -> AccountingStore:
+        store = AccountingStore(self.db_path, flush_interval=0.05)
+        self.addCleanup(store.close)
+        return store
+
+    def test_pages_counted_for_printed_files_only(self):
+        store = self._store()
+        with mock.patch.object(pdfinfo, "_pdfinfo_command", return_value=None):
+            store.record_job(_record(self.pdf, 10.0))
+            store.record_job(_record(self.pdf, 10.0, outcome="error"))
+            store.record_job(_record(self.pdf, 10.0, pages=7))
+            store.flush()
+        rows = store.query("SELECT outcome, pages FROM jobs ORDER BY id")
+        self.assertEqual(rows, [("done", 2), ("error", None), ("done", 7)])
+
+    def test_unsubmitted_failures_excluded_from_percentile(self):
+        store = self._store()
+        for ms in (100.0, 200.0):
+            store.record_job(_record(self.pdf, ms, pages=1))
+        for _ in range(5):
+            store.record_job(_record(self.pdf, None, outcome="error"))
+        store.flush()
+        self.assertEqual(store.submit_latency_percentile(50), 100.0)
+        self.assertEqual(store.submit_latency_percentile(95), 200.0)
+
+    def test_migrates_not_null_submit_ms(self):
+        db = sqlite3.connect(self.db_path)
+        db.executescript("""
+            CREATE TABLE jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, batch_id TEXT NOT NULL,
+                seq INTEGER NOT NULL, path TEXT NOT NULL, printer TEXT NOT NULL,
+                pages INTEGER, bytes INTEGER, submitted REAL NOT NULL,
+                submit_ms REAL NOT NULL, attempts INTEGER NOT NULL,
+                outcome TEXT NOT NULL, error TEXT NOT NULL DEFAULT '');
+            CREATE VIEW old_view AS SELECT AVG(submit_ms) FROM jobs;
+            INSERT INTO jobs VALUES (1, 'b', 0, 'a.pdf', 'p', 1, 1, 0, 50, 1, 'done', '');
+            INSERT INTO jobs VALUES (2, 'b', 1, 'b.pdf', 'p', NULL, 1, 0, 0, 1, 'error', 'x');
+        """)
+        db.close()
+
+        store = self._store()
+        self.assertEqual(store.query("SELECT id, submit_ms FROM jobs ORDER BY id"),
+                         [(1, 50.0), (2, None)])
+        self.assertEqual(store.submit_latency_percentile(95), 50.0)
+        self.assertEqual(store.throughput()[0][-1], 50.0)
+
+
+class CountPagesTest(unittest.TestCase):
+
+    def test_prefers_pdfinfo(self):
+        result = mock.Mock(returncode=0, stdout=b"Title: x\nPages:          3\n")
+        with mock.patch.object(pdfinfo, "_pdfinfo_command", return_value="pdfinfo"), \
+                mock.patch.object(pdfinfo.subprocess, "run", return_value=result):
+            self.assertEqual(pdfinfo.count_pages("any.pdf"), 3)
+
+    def test_falls_back_to_scan(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(_PDF)
+        self.addCleanup(os.unlink, f.name)
+        with mock.patch.object(pdfinfo, "_pdfinfo_command", return_value=None):
+            self.assertEqual(pdfinfo.count_pages(f.name), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
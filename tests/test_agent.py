@@ -0,0 +1,166 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+
+import main
+from core.agent import (AgentClient, AgentError, Controller, PrintAgent, STATUS_DONE,
+                        parse_options, split_uploads)
+from core.options import DUPLEX_LONG, JobOptions
+from core.printer import PrintResult
+
+
+class RecordingPrinter:
+    """Stands in for core.printer.print_pdf; remembers what it printed"""
+
+    def __init__(self):
+        self.printed = []
+        self._lock = threading.Lock()
+
+    def __call__(self, path: str, options: JobOptions) -> PrintResult:
+        with open(path, "rb") as f:
+            data = f.read()
+        with self._lock:
+            self.printed.append((os.path.basename(path), data, options))
+        return PrintResult(True, job_id=f"job-{len(self.printed)}")
+
+
+class AgentEndToEndTest(unittest.TestCase):
+    """Two agents on localhost driven by a controller"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.printers = []
+        self.agents = []
+        for n in range(2):
+            printer = RecordingPrinter()
+            agent = PrintAgent(os.path.join(self.tmp.name, f"agent{n}"), port=0,
+                               token="gizli", printer=printer, max_request_bytes=64 * 1024)
+            agent.start()
+            self.printers.append(printer)
+            self.agents.append(agent)
+
+        self.files = []
+        for n in range(4):
+            path = os.path.join(self.tmp.name, f"{n}.pdf")
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4\n" + bytes([n]) * 10)
+            self.files.append(path)
+
+    def tearDown(self):
+        for agent in self.agents:
+            agent.stop()
+        self.tmp.cleanup()
+
+    def test_fan_out_and_wait(self):
+        controller = Controller([AgentClient(a.url, "gizli") for a in self.agents])
+        options = JobOptions(copies=2, duplex=DUPLEX_LONG)
+        handles = controller.fan_out([self.files[:2], self.files[2:]], options)
+        statuses = controller.wait(handles, poll_interval=0.05, timeout=10)
+
+        self.assertEqual([[f["status"] for f in files] for files in statuses],
+                         [[STATUS_DONE] * 2, [STATUS_DONE] * 2])
+        printed = [p for printer in self.printers for p in printer.printed]
+        self.assertEqual(len(printed), 4)
+        self.assertTrue(all(p[2] == options for p in printed))
+
+        # A batch stays on one agent, in order (both may land on the same agent)
+        for (agent, _), paths in zip(handles, [self.files[:2], self.files[2:]]):
+            printer = self.printers[[a.url for a in self.agents].index(agent.url)]
+            expected = [os.path.basename(p) for p in paths]
+            names = [name.split("_", 1)[1] for name, _, _ in printer.printed]
+            self.assertEqual([n for n in names if n in expected], expected)
+
+        # Printed documents are removed from the spool
+        for agent in self.agents:
+            files_dir = os.path.join(agent.queue.spool_dir, "files")
+            self.assertEqual(os.listdir(files_dir), [])
+
+    def test_token_required(self):
+        with self.assertRaises(AgentError):
+            AgentClient(self.agents[0].url, "yanlis").health()
+
+    def _post(self, payload: bytes) -> int:
+        request = urllib.request.Request(self.agents[0].url + "/batches", data=payload, method="POST")
+        request.add_header("X-Agent-Token", "gizli")
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except (ConnectionError, urllib.error.URLError):
+            return -1
+
+    def test_invalid_options_are_rejected(self):
+        for options in ({"copies": "çok"}, {"colour": True}, ["copies"], {"nup": 3}):
+            with self.subTest(options=options):
+                body = {"files": [{"name": "a.pdf", "data": "JVBERg==", "options": options}]}
+                self.assertEqual(self._post(json.dumps(body).encode()), 400)
+
+    def test_oversized_request_is_rejected(self):
+        data = "A" * (128 * 1024)
+        body = json.dumps({"files": [{"name": "a.pdf", "data": data}]}).encode()
+        # The agent may close the connection before the upload completes
+        self.assertIn(self._post(body), (413, -1))
+        self.assertEqual(self.agents[0].queue.pending_count(), 0)
+
+    def test_large_batch_is_split_into_uploads(self):
+        for n, path in enumerate(self.files):
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4\n" + bytes([n]) * 20 * 1024)
+        controller = Controller([AgentClient(self.agents[0].url, "gizli")],
+                                max_upload_bytes=40 * 1024)
+        handles = controller.fan_out([self.files])
+        self.assertEqual(len(handles), 4)
+        controller.wait(handles, poll_interval=0.05, timeout=10)
+        self.assertEqual([data for _, data, _ in self.printers[0].printed],
+                         [open(p, "rb").read() for p in self.files])
+
+    def test_rejected_upload_does_not_stop_dispatch(self):
+        with open(self.files[1], "wb") as f:
+            f.write(b"%PDF-1.4\n" + b"x" * 100 * 1024)  # Over the agents' 64 KB limit
+        manifest = os.path.join(self.tmp.name, "liste.csv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("path,copies\n")
+            for n, path in enumerate(self.files):
+                f.write(f"{path},{n + 1}\n")  # One group per file
+        args = main.parse_args(["--manifest", manifest, "--agent-token", "gizli",
+                                "--agents"] + [a.url for a in self.agents])
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(main.dispatch_manifest_cli(args), 1)
+        self.assertIn("Tamamlandı: 3 başarılı, 1 hatalı", output.getvalue())
+        self.assertEqual(sum(len(p.printed) for p in self.printers), 3)
+
+
+class SplitUploadsTest(unittest.TestCase):
+
+    def test_budget(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for n, size in enumerate((3000, 3000, 6000, 10)):
+                paths.append(os.path.join(tmp, f"{n}.pdf"))
+                with open(paths[-1], "wb") as f:
+                    f.write(b"x" * size)
+            uploads = split_uploads(paths, max_bytes=10 * 1024)
+        self.assertEqual([len(u) for u in uploads], [2, 2])
+
+
+class ParseOptionsTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        from dataclasses import asdict
+        options = JobOptions(printer="ofis", copies=3, collate=False, number_up=4,
+                             page_ranges="1-3", media="A4")
+        self.assertEqual(parse_options(json.loads(json.dumps(asdict(options)))), options)
+
+    def test_missing_options_use_defaults(self):
+        self.assertEqual(parse_options(None), JobOptions())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import contextlib
+import os
+import signal
+import tempfile
+import time
+import unittest
+
+from core.backend_host import BACKEND_LOST_MESSAGE, BackendHost, BackendHostError
+from core.config import Settings
+from core.retry import ErrorKind, classify_error
+
+
+class BackendHostTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.marker = os.path.join(tmp.name, "crashed")
+        self.host = BackendHost(heartbeat_interval=0.1, heartbeat_timeout=1.0, call_timeout=1.0,
+                                settings=Settings(backend="virtual", virtual_speed=0))
+        self.addCleanup(self.host.stop)
+
+    def test_lost_call_is_reported_ambiguous(self):
+        with self.assertRaises(BackendHostError) as caught:
+            self.host._call("_test_crash", {"marker": self.marker}, 5)
+        self.assertEqual(str(caught.exception), BACKEND_LOST_MESSAGE)
+        self.assertIs(classify_error(str(caught.exception)), ErrorKind.AMBIGUOUS)
+        self.assertEqual(self.host.restarts, 1)
+        self.assertEqual(self.host.active_jobs(), set())  # The new host works
+
+    def test_idempotent_call_is_replayed(self):
+        self.assertEqual(self.host._call("_test_crash_idempotent", {"marker": self.marker}, 5), "ok")
+        self.assertEqual(self.host.restarts, 1)
+
+    def test_hung_call_times_out(self):
+        with self.assertRaises(BackendHostError) as caught:
+            self.host._call("_test_hang", {}, 0.5)
+        self.assertIs(classify_error(str(caught.exception)), ErrorKind.AMBIGUOUS)
+        self.assertEqual(self.host.restarts, 1)
+
+    @unittest.skipUnless(hasattr(signal, "SIGSTOP"), "needs SIGSTOP")
+    def test_host_hung_between_calls_is_replaced(self):
+        self.assertEqual(self.host.active_jobs(), set())
+        pid = self.host._process.pid
+        os.kill(pid, signal.SIGSTOP)  # No heartbeats from now on
+        try:
+            deadline = time.monotonic() + 10
+            while self.host.restarts == 0 and time.monotonic() < deadline:
+                time.sleep(0.1)
+        finally:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGCONT)
+        self.assertEqual(self.host.restarts, 1)
+        self.assertNotEqual(self.host._process.pid, pid)
+        self.assertEqual(self.host.active_jobs(), set())
+
+    def test_heartbeats_are_read_between_calls(self):
+        self.host.active_jobs()
+        time.sleep(1.5)  # Longer than the heartbeat timeout, no call running
+        self.assertLess(time.monotonic() - self.host._last_heartbeat, 0.5)
+        self.assertEqual(self.host.restarts, 0)
+        self.assertEqual(self.host.active_jobs(), set())
+
+if __name__ == "__main__":
+    unittest.main()
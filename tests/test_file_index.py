@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from core.file_index import FileIndex, SORT_NAME, SORT_NATURAL, collation_key, natural_key
+
+
+class CollationTest(unittest.TestCase):
+
+    def test_turkish_alphabet_order(self):
+        names = ["da", "ça", "ca", "ğa", "ha", "ga", "ia", "Ia", "şa", "sa", "üa", "ua"]
+        self.assertEqual(sorted(names, key=collation_key),
+                         ["ca", "ça", "da", "ga", "ğa", "ha", "Ia", "ia", "sa", "şa", "ua", "üa"])
+
+    def test_other_letters_do_not_collide_with_turkish_ones(self):
+        # Ā (U+0100) and friends used to share code points with remapped letters
+        self.assertLess(collation_key("Āz"), collation_key("a"))
+        self.assertLess(collation_key("ğ"), collation_key("h"))
+        self.assertNotEqual(collation_key("ġ"), collation_key("ğ"))
+
+    def test_natural_order(self):
+        names = ["10.pdf", "2.pdf", "1.pdf", "a2.pdf", "a10.pdf"]
+        self.assertEqual(sorted(names, key=natural_key),
+                         ["1.pdf", "2.pdf", "10.pdf", "a2.pdf", "a10.pdf"])
+
+
+class ScanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        os.makedirs(os.path.join(root, "alt"))
+        for name in ("10.pdf", "2.pdf", "not.txt", os.path.join("alt", "1.pdf")):
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(b"%PDF-1.4\n")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scan_and_order(self):
+        index = FileIndex.scan([self.tmp.name])
+        labels = [index.labels[i] for i in index.order(SORT_NATURAL)]
+        self.assertEqual(labels, ["2.pdf", "10.pdf"])
+
+        index = FileIndex.scan([self.tmp.name], recursive=True)
+        labels = [index.labels[i] for i in index.order(SORT_NAME)]
+        self.assertEqual(labels, ["10.pdf", "2.pdf", "alt/1.pdf"])
+
+    def test_cancelled_scan_stops(self):
+        index = FileIndex.scan([self.tmp.name], recursive=True, should_cancel=lambda: True)
+        self.assertEqual(len(index), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
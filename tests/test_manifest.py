@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from core import manifest
+from core.manifest import group_entries, iter_manifest, run_manifest
+from core.options import JobOptions, SEPARATE_COLLATED, SEPARATE_UNCOLLATED
+from core.printer import PrintResult
+
+
+class GroupEntriesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        for name in ("a.pdf", "b.pdf", "c.pdf"):
+            with open(os.path.join(self.tmp.name, name), "wb") as f:
+                f.write(b"%PDF-1.4\n%%EOF\n")
+
+    def _manifest(self, text: str) -> str:
+        path = os.path.join(self.tmp.name, "liste.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_files_with_copies_share_a_job(self):
+        path = self._manifest(
+            "path,copies,collate\n"
+            "a.pdf,2,evet\n"
+            "b.pdf,2,evet\n"
+            "eksik.pdf,2,evet\n"
+            "c.pdf,1,\n"
+        )
+        groups = list(group_entries(iter_manifest(path)))
+        self.assertEqual([[os.path.basename(e.path) for e in g.entries] for g in groups],
+                         [["a.pdf", "b.pdf"], ["eksik.pdf"], ["c.pdf"]])
+        self.assertTrue(groups[1].entries[0].error)
+        self.assertEqual(groups[0].options.copies, 2)
+
+    def test_max_files(self):
+        path = self._manifest("path\na.pdf\nb.pdf\nc.pdf\n")
+        sizes = [len(g.entries) for g in group_entries(iter_manifest(path), max_files=2)]
+        self.assertEqual(sizes, [2, 1])
+
+    def test_one_file_per_submission_on_windows(self):
+        path = self._manifest("path\na.pdf\nb.pdf\nc.pdf\n")
+        calls = []
+
+        def printer(paths, options):
+            calls.append(len(paths))
+            return PrintResult(True)
+
+        with mock.patch.object(manifest, "get_platform", return_value="windows"):
+            self.assertEqual(run_manifest(path, printer=printer), (3, 0))
+        self.assertEqual(calls, [1, 1, 1])
+        with mock.patch.object(manifest, "get_platform", return_value="linux"):
+            run_manifest(path, printer=printer)
+        self.assertEqual(calls[3:], [3])
+
+    def test_rejected_group_is_split(self):
+        path = self._manifest("path\na.pdf\nb.pdf\nc.pdf\n")
+        calls = []
+
+        def printer(paths, options):
+            calls.append([os.path.basename(p) for p in paths])
+            if "b.pdf" in calls[-1]:
+                return PrintResult(False, "lp: Unsupported document-format")
+            return PrintResult(True)
+
+        outcomes = []
+        with mock.patch.object(manifest, "get_platform", return_value="linux"):
+            counts = run_manifest(path, printer=printer,
+                                  on_result=lambda e, r: outcomes.append(r.success))
+        self.assertEqual(counts, (2, 1))
+        self.assertEqual(outcomes, [True, False, True])
+        self.assertEqual(calls, [["a.pdf", "b.pdf", "c.pdf"], ["a.pdf"], ["b.pdf"], ["c.pdf"]])
+
+    def test_transient_group_failure_is_not_split(self):
+        path = self._manifest("path\na.pdf\nb.pdf\n")
+        calls = []
+
+        def printer(paths, options):
+            calls.append(paths)
+            return PrintResult(False, "lp: Error - server-error-busy")
+
+        with mock.patch.object(manifest, "get_platform", return_value="linux"):
+            self.assertEqual(run_manifest(path, printer=printer), (0, 2))
+        self.assertEqual(len(calls), 1)
+
+
+class MultipleDocumentHandlingTest(unittest.TestCase):
+
+    def test_collated_copies_of_several_files(self):
+        args = JobOptions(copies=2, collate=True).lp_args(files=3)
+        self.assertIn(f"multiple-document-handling={SEPARATE_COLLATED}", args)
+        self.assertIn("collate=true", args)
+
+    def test_uncollated_copies_of_several_files(self):
+        for collate in (False, None):
+            args = JobOptions(copies=2, collate=collate).lpr_args(files=3)
+            self.assertIn(f"multiple-document-handling={SEPARATE_UNCOLLATED}", args)
+        self.assertIn("collate=false", JobOptions(copies=2, collate=False).lpr_args(files=3))
+
+    def test_not_set_for_single_files_or_copies(self):
+        self.assertFalse(any("multiple-document" in a for a in JobOptions(copies=2).lp_args()))
+        self.assertFalse(any("multiple-document" in a for a in JobOptions().lp_args(files=3)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import random
+import threading
+import time
+import unittest
+
+from core.pipeline import Pipeline, ReorderBuffer, Stage
+
+
+class ReorderBufferTest(unittest.TestCase):
+
+    def test_releases_in_sequence(self):
+        buffer = ReorderBuffer()
+        self.assertEqual(buffer.push(2, "c"), [])
+        self.assertEqual(buffer.push(1, "b"), [])
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(buffer.push(0, "a"), ["a", "b", "c"])
+        self.assertEqual(buffer.push(3, "d"), ["d"])
+        self.assertEqual(len(buffer), 0)
+
+
+def _jittered(func):
+    rng = random.Random(7)
+    lock = threading.Lock()
+
+    def run(value):
+        with lock:
+            delay = rng.random() / 500
+        time.sleep(delay)
+        return func(value)
+    return run
+
+
+class PipelineTest(unittest.TestCase):
+
+    def test_output_keeps_input_order(self):
+        pipeline = Pipeline([
+            Stage("double", _jittered(lambda x: x * 2), workers=4, queue_size=4),
+            Stage("inc", _jittered(lambda x: x + 1), workers=3, queue_size=2),
+        ])
+        results = list(pipeline.run(range(200)))
+        self.assertEqual([r.value for r in results], [x * 2 + 1 for x in range(200)])
+        self.assertEqual([r.seq for r in results], list(range(200)))
+
+    def test_failing_item_is_delivered_in_place(self):
+        def check(x):
+            if x == 3:
+                raise ValueError("bozuk")
+            return x * 10
+
+        results = list(Pipeline([Stage("check", check, workers=2),
+                                 Stage("after", lambda x: x + 1)]).run(range(6)))
+        self.assertEqual([r.input for r in results], list(range(6)))
+        failed = results[3]
+        self.assertIsInstance(failed.error, ValueError)
+        self.assertEqual(failed.stage, "check")
+        self.assertIsNone(failed.value)
+        self.assertEqual(results[4].value, 41)
+
+    def test_cancel_before_run(self):
+        pipeline = Pipeline([Stage("id", lambda x: x)])
+        pipeline.cancel()
+        self.assertEqual(list(pipeline.run(range(10))), [])
+
+    def test_cancel_while_running_stops_threads(self):
+        before = threading.active_count()
+        pipeline = Pipeline([Stage("slow", _jittered(lambda x: x), workers=2)])
+        results = pipeline.run(range(10_000))
+        consumed = []
+        for item in results:
+            consumed.append(item.value)
+            if len(consumed) == 5:
+                pipeline.cancel()
+                break
+        results.close()
+        self.assertEqual(consumed, [0, 1, 2, 3, 4])
+        self.assertEqual(threading.active_count(), before)
+
+
+if __name__ == "__main__":
+    unittest.main()
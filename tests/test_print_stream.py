@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from core import printer
+from core.printer import print_stream
+
+
+# Stands in for lp: reports how many bytes arrived and how they start
+_FAKE_LP = f"""#!{sys.executable}
+import sys
+data = sys.stdin.buffer.read()
+print(f"request id is test-{{len(data)}}-{{data[:4].decode('latin-1')}} (1 file(s))")
+"""
+
+_SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "lp is only used on Linux")
+class PrintStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        lp = os.path.join(self.tmp.name, "lp")
+        with open(lp, "w") as f:
+            f.write(_FAKE_LP)
+        os.chmod(lp, 0o755)
+        self.env = {**os.environ, "PATH": self.tmp.name + os.pathsep + os.environ.get("PATH", "")}
+        patcher = mock.patch.dict(os.environ, self.env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(printer.set_backend, None)
+        printer.set_backend(None)
+
+        self.pdf = os.path.join(self.tmp.name, "a.pdf")
+        with open(self.pdf, "wb") as f:
+            f.write(b"%PDF-1.4\n" + b"x" * 100_000 + b"\n%%EOF\n")
+        self.size = os.path.getsize(self.pdf)
+
+    def test_buffer(self):
+        with open(self.pdf, "rb") as f:
+            data = f.read()
+        result = print_stream(data)
+        self.assertTrue(result.success, result.error_message)
+        self.assertEqual(result.job_id, f"test-{self.size}-%PDF")
+
+    def test_file_starts_at_offset_wherever_it_was_left(self):
+        with open(self.pdf, "rb") as f:
+            f.read(50)  # Caller already looked at the header
+            self.assertEqual(print_stream(f).job_id, f"test-{self.size}-%PDF")
+            self.assertEqual(print_stream(f, offset=1).job_id, f"test-{self.size - 1}-PDF-")
+
+    def test_byte_range(self):
+        fd = os.open(self.pdf, os.O_RDONLY)
+        self.addCleanup(os.close, fd)
+        self.assertEqual(print_stream(fd, offset=1, length=3).job_id, "test-3-PDF")
+
+    def test_pipe(self):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"..%PDF-1.4")
+        os.close(write_fd)
+        self.addCleanup(os.close, read_fd)
+        self.assertEqual(print_stream(read_fd, offset=2).job_id, "test-8-%PDF")
+
+    def test_pipe_closed_when_command_cannot_start(self):
+        open_fds = len(os.listdir("/proc/self/fd"))
+        with mock.patch.object(printer.subprocess, "Popen", side_effect=OSError("çalıştırılamadı")):
+            result = print_stream(b"%PDF-1.4")
+        self.assertFalse(result.success)
+        self.assertEqual(len(os.listdir("/proc/self/fd")), open_fds)
+
+    def test_stdin_cli(self):
+        with open(self.pdf, "rb") as f:
+            proc = subprocess.run(
+                [sys.executable, os.path.join(_SRC, "main.py"), "--stdin", "--copies", "2"],
+                stdin=f, capture_output=True, text=True, timeout=60,
+                env={**self.env, "PDFBP_BACKEND": "system"}
+            )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertIn(f"test-{self.size}-%PDF", proc.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
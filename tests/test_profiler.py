@@ -0,0 +1,49 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from core.profiler import Profiler
+
+
+class ProfilerTest(unittest.TestCase):
+
+    def test_dump_while_sampling(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        profiler = Profiler(tmp.name, interval=0.001)
+        stop = threading.Event()
+
+        def busy():
+            with profiler.stage("worker"):
+                while not stop.is_set():
+                    sum(range(1000))
+
+        thread = threading.Thread(target=busy)
+        thread.start()
+        profiler.start()
+        try:
+            time.sleep(0.05)
+            first = profiler.dump("ilk")
+            time.sleep(0.05)
+            second = profiler.dump("ikinci")
+        finally:
+            stop.set()
+            thread.join()
+            profiler.stop()
+
+        for path in (first, second):
+            self.assertIsNotNone(path)
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            self.assertTrue(lines)
+            self.assertTrue(all(line.startswith("worker;") for line in lines))
+            with open(os.path.splitext(path)[0] + ".txt", encoding="utf-8") as f:
+                self.assertIn("worker", f.read())
+        profiler.dump("son")  # Samples taken before the thread stopped
+        self.assertIsNone(profiler.dump("boş"))
+
+
+if __name__ == "__main__":
+    unittest.main()
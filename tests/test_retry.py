@@ -0,0 +1,84 @@
+import random
+import subprocess
+import unittest
+
+from core.retry import ErrorKind, RetryPolicy, RetryQueue, classify_error, classify_exception
+
+
+class ClassifyErrorTest(unittest.TestCase):
+
+    def test_lp_messages(self):
+        cases = {
+            "lp: Error - server-error-busy": ErrorKind.TRANSIENT,
+            "lp: unable to connect to server: Connection refused": ErrorKind.TRANSIENT,
+            "lp: Error - The printer or class does not exist.": ErrorKind.PRINTER_DOWN,
+            "lp: Error - printer-stopped": ErrorKind.PRINTER_DOWN,
+            "lp: Error - unable to access \"x.pdf\" - No such file or directory": ErrorKind.PERMANENT,
+            "Dosya bulunamadı: x.pdf": ErrorKind.PERMANENT,
+        }
+        for message, kind in cases.items():
+            with self.subTest(message=message):
+                self.assertIs(classify_error(message), kind)
+
+    def test_unknown_message_is_permanent(self):
+        self.assertIs(classify_error("something odd happened"), ErrorKind.PERMANENT)
+
+    def test_submit_timeout_is_ambiguous(self):
+        # lp may already have spooled the job; retrying could print it twice
+        self.assertIs(classify_error("Yazdırma zaman aşımına uğradı"), ErrorKind.AMBIGUOUS)
+        self.assertIs(classify_exception(subprocess.TimeoutExpired(["lp"], 60)), ErrorKind.AMBIGUOUS)
+
+    def test_exceptions(self):
+        self.assertIs(classify_exception(ConnectionResetError()), ErrorKind.TRANSIENT)
+        self.assertIs(classify_exception(FileNotFoundError("x.pdf")), ErrorKind.PERMANENT)
+        self.assertIs(classify_exception(ValueError("not a PDF")), ErrorKind.PERMANENT)
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def test_only_transient_failures_are_retried(self):
+        policy = RetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry(ErrorKind.TRANSIENT, 1))
+        self.assertTrue(policy.should_retry(ErrorKind.TRANSIENT, 2))
+        self.assertFalse(policy.should_retry(ErrorKind.TRANSIENT, 3))
+        for kind in (ErrorKind.PERMANENT, ErrorKind.PRINTER_DOWN, ErrorKind.AMBIGUOUS):
+            self.assertFalse(policy.should_retry(kind, 1))
+
+    def test_backoff_doubles_and_is_capped(self):
+        policy = RetryPolicy(base_delay=2.0, max_delay=10.0, jitter=0.0)
+        self.assertEqual([policy.delay(n) for n in range(1, 6)], [2.0, 4.0, 8.0, 10.0, 10.0])
+
+    def test_jitter_stays_within_bounds(self):
+        policy = RetryPolicy(base_delay=4.0, jitter=0.5)
+        rng = random.Random(1)
+        for _ in range(200):
+            self.assertTrue(2.0 <= policy.delay(1, rng) <= 4.0)
+
+
+class RetryQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.queue = RetryQueue(RetryPolicy(base_delay=1.0, jitter=0.0), clock=lambda: self.now)
+
+    def test_pop_due_in_time_order(self):
+        self.queue.schedule(7, 2)  # Due after 2 s
+        self.queue.schedule(3, 1)  # Due after 1 s
+        self.assertEqual(self.queue.pop_due(), [])
+        self.assertEqual(self.queue.time_until_next(), 1.0)
+
+        self.now = 1.0
+        self.assertEqual(self.queue.pop_due(), [(3, 2)])
+        self.now = 5.0
+        self.assertEqual(self.queue.pop_due(), [(7, 3)])
+        self.assertIsNone(self.queue.time_until_next())
+
+    def test_drain_returns_everything(self):
+        self.queue.schedule(1, 1)
+        self.queue.schedule(2, 3)
+        self.assertEqual(self.queue.drain(), [(1, 2), (2, 4)])
+        self.assertEqual(len(self.queue), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import struct
+import tempfile
+import time
+import unittest
+
+from core.file_index import FileIndex, SORT_NAME, SORT_NATURAL
+from core.session import (FILE_CHANGED, FILE_MISSING, FILE_OK, SessionDamaged, SessionSaver,
+                          _HEADER, _layout, load_session, revalidate, save_session)
+
+
+class SessionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, "pdf")
+        os.makedirs(os.path.join(self.root, "alt"))
+        # Includes a Turkish name and an undecodable one
+        names = ["10.pdf", "2.pdf", "çizim.pdf", os.path.join("alt", "1.pdf")]
+        if os.name != "nt":
+            names.append(os.fsdecode(b"bozuk-\xff.pdf"))
+        for name in names:
+            with open(os.path.join(self.root, name), "wb") as f:
+                f.write(b"%PDF-1.4\n" + name.encode("utf-8", "surrogateescape"))
+        self.index = FileIndex.scan([self.root], recursive=True)
+        self.index.order(SORT_NAME)
+        self.path = os.path.join(self.tmp.name, "session.pdfbps")
+
+    def _save(self, status=None):
+        status = status or bytes(range(len(self.index)))
+        save_session(self.path, self.index, status, recursive=True, sort_mode=SORT_NATURAL,
+                     reverse=True, filter_text="çiz")
+        return status
+
+    def test_round_trip(self):
+        status = self._save()
+        session = load_session(self.path)
+
+        self.assertEqual(list(session.index.paths), list(self.index.paths))
+        self.assertEqual(list(session.index.labels), list(self.index.labels))
+        self.assertEqual(list(session.index.sizes), list(self.index.sizes))
+        self.assertEqual(list(session.index.mtimes), list(self.index.mtimes))
+        self.assertEqual(session.index.roots, [self.root])
+        for mode in (SORT_NATURAL, SORT_NAME):
+            self.assertEqual(list(session.index.order(mode)), list(self.index.order(mode)))
+        self.assertEqual(bytes(session.status), status)
+        self.assertEqual((session.recursive, session.sort_mode, session.reverse, session.filter_text),
+                         (True, SORT_NATURAL, True, "çiz"))
+        self.assertLessEqual(session.saved, time.time())
+
+    def test_revalidate(self):
+        self._save()
+        session = load_session(self.path)
+        paths = list(session.index.paths)
+        changed = paths.index(os.path.join(self.root, "2.pdf"))
+        missing = paths.index(os.path.join(self.root, "10.pdf"))
+        with open(paths[changed], "ab") as f:
+            f.write(b"daha uzun")
+        os.unlink(paths[missing])
+
+        self.assertEqual(revalidate(session.index, changed), FILE_CHANGED)
+        self.assertEqual(revalidate(session.index, changed), FILE_OK)
+        self.assertEqual(revalidate(session.index, missing), FILE_MISSING)
+        # Copy-on-write: the snapshot itself is unchanged
+        self.assertEqual(load_session(self.path).index.sizes[changed], self.index.sizes[changed])
+
+    def test_out_of_range_order_is_rejected(self):
+        self._save()
+        with open(self.path, "rb") as f:
+            data = bytearray(f.read())
+        _, _, count, order_count, meta_len, _ = _HEADER.unpack_from(data)
+        struct.pack_into("<I", data, _layout(count, order_count, meta_len)["orders"], count + 7)
+        with open(self.path, "wb") as f:
+            f.write(data)
+
+        with self.assertRaises(SessionDamaged) as caught:
+            load_session(self.path)
+        # The settings survive, so the caller can rescan the same folders
+        self.assertEqual(caught.exception.session.index.roots, [self.root])
+        self.assertTrue(caught.exception.session.recursive)
+
+    def test_not_a_snapshot(self):
+        with open(self.path, "wb") as f:
+            f.write(b"x" * 100)
+        with self.assertRaises(ValueError):
+            load_session(self.path)
+
+    def test_saver_writes_newest_in_background(self):
+        saver = SessionSaver()
+        saver.save(self.path, self.index, bytes(len(self.index)))
+        saver.save(self.path, self.index, bytes([2]) * len(self.index), sort_mode=SORT_NAME)
+        saver.wait()
+        session = load_session(self.path)
+        self.assertEqual(session.sort_mode, SORT_NAME)
+        self.assertEqual(set(session.status), {2})
+
+
+if __name__ == "__main__":
+    unittest.main()
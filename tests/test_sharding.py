@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from core.sharding import ShardedPreparation
+
+
+_PAGE = b"1 0 obj << /Type /Page >> endobj\n"
+
+
+class ShardedPreparationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.paths = []
+        for i in range(12):
+            path = os.path.join(self.tmp.name, f"{i:02d}.pdf")
+            with open(path, "wb") as f:
+                f.write(b"bozuk" if i % 5 == 3 else b"%PDF-1.4\n" + _PAGE * (i + 1) + b"%%EOF\n")
+            self.paths.append(path)
+
+    def test_files_are_readable_while_shards_run(self):
+        progress = []
+        preparation = ShardedPreparation(self.paths, 3)
+        preparation.start(lambda done, total: progress.append((done, total)))
+        try:
+            for pos in range(len(self.paths)):
+                self.assertTrue(preparation.wait(pos))
+                self.assertTrue(preparation.prepared(pos))
+                if pos % 5 == 3:
+                    with self.assertRaises(ValueError):
+                        preparation.check(pos)
+                    self.assertIsNone(preparation.pages(pos))
+                else:
+                    preparation.check(pos)
+                    self.assertEqual(preparation.pages(pos), pos + 1)
+                    self.assertEqual(preparation.size(pos), os.path.getsize(self.paths[pos]))
+        finally:
+            preparation.close()
+        self.assertEqual(progress[-1], (12, 12))
+        self.assertFalse(preparation.prepared(0))
+        self.assertIsNone(preparation.size(0))
+        self.assertFalse(preparation.wait(0))
+
+    def test_cancel_and_close(self):
+        preparation = ShardedPreparation(self.paths, 2).start()
+        preparation.cancel()
+        self.assertTrue(preparation.wait(11))  # Its shard stopped, prepared or not
+        preparation.close()
+        preparation.close()  # Idempotent
+        with self.assertRaises(ValueError):
+            preparation.check(3)  # Falls back to checking the file itself
+
+
+if __name__ == "__main__":
+    unittest.main()
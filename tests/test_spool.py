@@ -0,0 +1,140 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from core import pdfinfo
+from core.backend_host import BackendHost
+from core.config import Settings
+from core.manifest import run_manifest
+from core.printer import set_backend
+from core.spool import SpoolMonitor
+from core.virtual_printer import VirtualPrinter
+
+
+class FakeLister:
+
+    def __init__(self):
+        self.active: set[str] | None = set()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return None if self.active is None else set(self.active)
+
+
+class SpoolMonitorTest(unittest.TestCase):
+
+    def _monitor(self, lister, refresh_interval=0.0) -> SpoolMonitor:
+        return SpoolMonitor("/tmp", high_watermark=100, low_watermark=50,
+                            job_lister=lister, free_space=lambda path: None,
+                            refresh_interval=refresh_interval)
+
+    def test_tracked_jobs_drain(self):
+        lister = FakeLister()
+        monitor = self._monitor(lister)
+        monitor.register("p-1", 30)
+        monitor.register("p-2", 40)
+        lister.active = {"p-1", "p-2"}
+        self.assertEqual(monitor.outstanding_bytes(), 70)
+        lister.active = {"p-2"}
+        self.assertEqual(monitor.outstanding_bytes(), 40)
+
+    def test_jobs_without_id_drain_in_order(self):
+        lister = FakeLister()
+        monitor = self._monitor(lister)
+        for nbytes in (10, 20, 30):
+            monitor.register("", nbytes)
+        lister.active = {"p-7", "p-8", "p-9"}
+        self.assertEqual(monitor.outstanding_bytes(), 60)
+        self.assertFalse(monitor.wait_for_capacity(50, should_cancel=lambda: True))
+        lister.active = {"p-9"}  # Only the newest is left
+        self.assertEqual(monitor.outstanding_bytes(), 30)
+        self.assertTrue(monitor.wait_for_capacity(50))
+
+    def test_unknown_job_list_keeps_bytes(self):
+        lister = FakeLister()
+        monitor = self._monitor(lister)
+        monitor.register("", 10)
+        monitor.register("p-1", 20)
+        lister.active = None
+        self.assertEqual(monitor.outstanding_bytes(), 30)
+
+    def test_job_list_is_cached(self):
+        lister = FakeLister()
+        monitor = self._monitor(lister, refresh_interval=60.0)
+        self.assertEqual(monitor.outstanding_bytes(), 0)
+        self.assertEqual(lister.calls, 0)  # Nothing submitted yet
+        monitor.register("p-1", 10)
+        lister.active = {"p-1"}
+        for _ in range(5):
+            monitor.wait_for_capacity(10)
+        self.assertEqual(lister.calls, 1)
+
+
+class VirtualBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = Settings(backend="virtual", spool_high_mb=1, spool_low_mb=1,
+                                 virtual_speed=1, virtual_pages_per_minute=1)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.pdf = os.path.join(self.tmp.name, "a.pdf")
+        with open(self.pdf, "wb") as f:
+            f.write(b"%PDF-1.4\n1 0 obj << /Type /Page >> endobj\n%%EOF\n")
+
+    def test_in_process_printer_queue(self):
+        now = [0.0]
+        printer = VirtualPrinter(speed=1, pages_per_minute=1, accept_ms=0,
+                                 clock=lambda: now[0], sleep=lambda s: None)
+        set_backend(printer)
+        self.addCleanup(set_backend, None)
+        monitor = SpoolMonitor.from_settings(self.settings)
+        monitor.refresh_interval = 0
+        result = printer.print_pdfs([self.pdf])
+        monitor.register(result.job_id, 10)
+        self.assertEqual(monitor.outstanding_bytes(), 10)
+        now[0] += 3600  # Device has printed everything since
+        self.assertEqual(monitor.outstanding_bytes(), 0)
+
+    def test_host_process_printer_queue(self):
+        host = BackendHost(settings=self.settings)
+        self.addCleanup(host.stop)
+        monitor = SpoolMonitor.from_settings(self.settings, host.active_jobs)
+        self.assertEqual(host.active_jobs(), set())
+        result = host.print_pdfs([self.pdf])
+        self.assertTrue(result.success)
+        self.assertEqual(host.active_jobs(), {result.job_id})
+        monitor.register(result.job_id, 10)
+        self.assertEqual(monitor.outstanding_bytes(), 10)
+
+    def test_no_flow_control_without_virtual_clock(self):
+        # Regression: with speed 0 the queue never drained while throttled
+        settings = Settings(backend="virtual", spool_high_mb=1, spool_low_mb=1, virtual_speed=0)
+        self.assertIsNone(SpoolMonitor.from_settings(settings))
+
+        set_backend(VirtualPrinter(speed=0))
+        self.addCleanup(set_backend, None)
+        manifest = os.path.join(self.tmp.name, "liste.csv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("path\n")
+            for name in ("b.pdf", "c.pdf", "d.pdf"):
+                with open(os.path.join(self.tmp.name, name), "wb") as pdf:
+                    pdf.write(b"%PDF-1.4\n" + b"0" * 700 * 1024 + b"\n%%EOF\n")
+                f.write(f"{name}\n")
+        done = []
+        thread = threading.Thread(target=lambda: done.append(run_manifest(
+            manifest, max_group_files=1, spool=SpoolMonitor.from_settings(settings))))
+        thread.start()
+        thread.join(10)
+        self.assertEqual(done, [(3, 0)])
+
+    def test_pages_counted_without_pdfinfo(self):
+        printer = VirtualPrinter(speed=0)
+        with mock.patch.object(pdfinfo.subprocess, "run", side_effect=AssertionError):
+            self.assertTrue(printer.print_pdfs([self.pdf]).success)
+
+
+if __name__ == "__main__":
+    unittest.main()
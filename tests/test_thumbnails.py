@@ -0,0 +1,75 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from core.thumbnails import ThumbnailCache, cache_key
+
+
+class ThumbnailCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+
+    def _cache(self, **kwargs) -> ThumbnailCache:
+        cache = ThumbnailCache(self.cache_dir, processes=1, **kwargs)
+        self.addCleanup(cache.shutdown)
+        return cache
+
+    def _key(self, cache: ThumbnailCache, name: str, mtime: float = 1.0) -> str:
+        return cache_key(name, 100, mtime, cache.size)
+
+    def test_memory_lru_stays_within_budget(self):
+        cache = self._cache(max_memory=100)
+        for name in ("a", "b", "c"):
+            cache._remember(self._key(cache, name), b"x" * 40)
+        self.assertIsNone(cache.get("a", 100, 1.0))  # Oldest evicted
+        self.assertEqual(cache.get("b", 100, 1.0), b"x" * 40)  # Now most recent
+        cache._remember(self._key(cache, "d"), b"x" * 40)
+        self.assertIsNone(cache.get("c", 100, 1.0))
+        self.assertIsNotNone(cache.get("b", 100, 1.0))
+        self.assertLessEqual(cache._memory_bytes, 100)
+
+    def test_disk_cache_is_keyed_by_size_and_mtime(self):
+        cache = self._cache()
+        cache._store(self._key(cache, "a.pdf"), b"png")
+        fresh = self._cache()  # Nothing in memory
+        self.assertEqual(fresh.get("a.pdf", 100, 1.0), b"png")
+        self.assertIsNone(fresh.get("a.pdf", 100, 2.0))  # File modified since
+        self.assertIsNone(fresh.get("a.pdf", 101, 1.0))
+        self.assertNotEqual(cache_key("a.pdf", 100, 1.0, 96), cache_key("a.pdf", 100, 1.0, 128))
+
+    def test_disk_cache_is_pruned_oldest_first(self):
+        cache = self._cache(max_disk=1000)
+        for n in range(4):
+            key = self._key(cache, f"{n}.pdf")
+            cache._store(key, b"x" * 300)
+            os.utime(cache._disk_path(key), (n, n))
+        cache._store(self._key(cache, "4.pdf"), b"x" * 300)
+        fresh = self._cache()
+        kept = [n for n in range(5) if fresh.get(f"{n}.pdf", 100, 1.0) is not None]
+        self.assertEqual(kept, [2, 3, 4])
+
+    def test_cancel_pending_drops_queued_renders(self):
+        cache = self._cache()
+        called = []
+        lock = threading.Lock()
+
+        def callback(path, data):
+            with lock:
+                called.append(path)
+
+        paths = [os.path.join(self.tmp.name, f"{n}.pdf") for n in range(10)]
+        for n, path in enumerate(paths):
+            cache.request(path, 100, float(n), callback)
+        cache.cancel_pending()
+        cache._pool.shutdown(wait=True)
+        # Only renders already handed to the single process can still finish
+        self.assertLessEqual(len(called), 2)
+        self.assertEqual(cache._pending, {})
+
+
+if __name__ == "__main__":
+    unittest.main()